@@ -0,0 +1,186 @@
+"""
+Allergen screening
+
+AllergenIndex inverts data/allergens.json into {allergen key: medicines} at
+load time. Keys are normalized phrases: lowercase words with punctuation,
+filler words ('allergy', 'allergic to', ...) and plural 's' removed, so
+'NSAIDs', 'nsaid allergy' and 'Allergic to NSAID' are the same key.
+
+A medicine is reachable from its own name, the allergens listed for it, and,
+through each drug class it belongs to, the class name, its aliases and every
+other member (cross-reactivity: an ibuprofen allergy flags diclofenac).
+
+Screening resolves each allergy in the patient's profile to a set of
+medicines once, then checks every recommended medicine against those sets.
+An allergy that names no known allergen is tried as the start of one, from
+any word onwards ('h2', 'erythro' and 'blockers' flag the same medicines
+as 'H2 blockers' and 'erythromycin'), like the old substring check.
+
+    {
+      "version": 1,
+      "medicines": {"diclofenac": ["NSAIDs", "aspirin", ...], ...},
+      "classes": {"NSAIDs": {"aliases": [...], "members": ["diclofenac", ...]}, ...}
+    }
+
+Usage:
+    python allergies.py check diclofenac azithromycin --allergies "ibuprofen, macrolides"
+"""
+
+import argparse
+import bisect
+import json
+import re
+
+_WORDS = re.compile(r'[a-z0-9]+')
+
+FILLER_WORDS = frozenset(['allergy', 'allergies', 'allergic', 'to', 'reaction', 'reactions',
+                          'intolerance', 'sensitivity', 'hypersensitivity'])
+
+# Shortest allergy that is matched as the start of an allergen
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize_allergen(text):
+    """Canonical key for an allergen phrase"""
+    words = []
+    for word in _WORDS.findall(text.lower()):
+        if word in FILLER_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        words.append(word)
+    return ' '.join(words)
+
+
+class AllergenIndex:
+    """Allergen key -> medicines that may cause a reaction"""
+
+    def __init__(self, medicines, classes=None, display_names=None, version=None):
+        """
+        medicines     -- {medicine: [allergen, ...]}
+        classes       -- {class name: {'aliases': [...], 'members': [...]}}
+        display_names -- {medicine: name shown in warnings}
+        """
+        self.version = version
+        self.medicines = [medicine.lower() for medicine in medicines]
+        self.display_names = {medicine: (display_names or {}).get(medicine, medicine.title())
+                              for medicine in self.medicines}
+
+        index = {}
+
+        def link(phrase, medicine, source):
+            key = normalize_allergen(phrase)
+            if key:
+                index.setdefault(key, {}).setdefault(medicine, source)
+
+        for medicine, allergens in medicines.items():
+            medicine = medicine.lower()
+            link(medicine, medicine, medicine)
+            for allergen in allergens:
+                link(allergen, medicine, allergen)
+
+        self.classes = {}
+        for class_name, spec in (classes or {}).items():
+            members = [member.lower() for member in spec.get('members', [])]
+            self.classes[class_name] = members
+            for medicine in members:
+                if medicine not in self.display_names:
+                    continue
+                for phrase in [class_name] + list(spec.get('aliases', [])) + members:
+                    link(phrase, medicine, class_name)
+
+        # Frozen after load: {key: ((medicine, source), ...)}
+        self.index = {key: tuple(hits.items()) for key, hits in index.items()}
+        self.max_words = max((len(key.split()) for key in self.index), default=1)
+
+        # Every key from each of its words onwards, sorted for prefix search
+        self._tails = sorted((' '.join(words[i:]), key) for key, words in
+                             ((key, key.split()) for key in self.index) for i in range(len(words)))
+
+    @classmethod
+    def load(cls, path, display_names=None):
+        with open(path, 'r', encoding='utf8') as f:
+            data = json.load(f)
+        return cls(data['medicines'], data.get('classes'), display_names, data.get('version'))
+
+    def resolve(self, allergy):
+        """(medicine, source) pairs an allergy rules out
+
+        The whole phrase is tried first; otherwise any known allergen named
+        inside it counts ('severe aspirin reaction' -> aspirin). Failing
+        both, the phrase may be the start of an allergen ('h2' -> H2 blockers).
+        """
+        key = normalize_allergen(allergy)
+        if key in self.index:
+            return self.index[key]
+        words = key.split()
+        hits = {}
+        for size in range(min(len(words), self.max_words), 0, -1):
+            for start in range(len(words) - size + 1):
+                for medicine, source in self.index.get(' '.join(words[start:start + size]), ()):
+                    hits.setdefault(medicine, source)
+        if not hits and len(key) >= MIN_PREFIX_LENGTH:
+            for _, match in self._tails[bisect.bisect_left(self._tails, (key,)):
+                                        bisect.bisect_left(self._tails, (key + '\uffff',))]:
+                for medicine, source in self.index[match]:
+                    hits.setdefault(medicine, source)
+        return tuple(hits.items())
+
+    def screen(self, medicines, allergies):
+        """Screen a recommendation list against an allergy profile in one call
+
+        Returns (conflicts, safe): conflict dicts in medicine then allergy
+        order, and the medicines with no conflict.
+        """
+        allergies = [a.lower().strip() for a in allergies if a and a.strip()]
+        flagged = {}
+        for allergy in allergies:
+            for medicine, source in self.resolve(allergy):
+                flagged.setdefault(medicine, []).append((allergy, source))
+
+        conflicts = []
+        safe = []
+        for medicine in medicines:
+            hits = flagged.get(medicine.lower())
+            if not hits:
+                safe.append(medicine)
+                continue
+            name = self.display_names.get(medicine.lower(), medicine)
+            for allergy, source in hits:
+                conflicts.append({
+                    'medicine': name,
+                    'allergy': allergy,
+                    'allergen': source,
+                    'warning': f'You may be allergic to {name} due to {allergy} allergy'
+                })
+        return conflicts, safe
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'medicines': len(self.medicines),
+            'classes': len(self.classes),
+            'keys': len(self.index)
+        }
+
+
+def main():
+    from knowledge_base import data_path
+
+    parser = argparse.ArgumentParser(description='Screen medicines against an allergy profile')
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('medicines', nargs='+')
+    parser.add_argument('--allergies', required=True, help='Comma-separated allergies')
+    parser.add_argument('--data', help='Allergens file (default: from the knowledge base manifest)')
+    args = parser.parse_args()
+
+    index = AllergenIndex.load(args.data or data_path('allergens'))
+    print(f"[INFO] {index.stats()}")
+    conflicts, safe = index.screen(args.medicines, args.allergies.split(','))
+    for conflict in conflicts:
+        print(f"[WARNING] {conflict['warning']} ({conflict['allergen']})")
+    print(f"[INFO] No conflicts: {', '.join(safe) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
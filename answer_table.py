@@ -0,0 +1,214 @@
+"""
+Precomputed answer table for the closed symptom vocabulary
+
+The tokenizer only emits ids 1..V-1 and pad_sequences left-pads with zeros,
+so every input the model can see is a run of k <= maxlen vocabulary ids
+right-aligned behind zeros. For the shipped vocabulary (18 words, maxlen 5)
+that is 2,000,719 sequences, small enough to score once offline and serve
+from a memory-mapped array.
+
+Row layout: sequences with k tokens start at offset(k) = sum(W**j, j < k)
+where W is the number of word ids, followed by the tokens read as a base-W
+number (most significant first).
+
+Usage:
+    python answer_table.py build           # score every sequence -> answer_table.npy
+    python answer_table.py check           # compare random rows with the model
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from vocabulary import load_vocabulary
+
+# Refuse to build tables that would not comfortably fit on disk / in page cache
+MAX_TABLE_ROWS = 50_000_000
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def vocabulary_fingerprint(vocabulary):
+    payload = json.dumps([sorted(vocabulary.word_index.items()), vocabulary.maxlen])
+    return hashlib.sha256(payload.encode('utf8')).hexdigest()
+
+
+class AnswerTable:
+    """Memory-mapped probabilities for every reachable padded sequence"""
+
+    def __init__(self, probabilities, word_count, maxlen):
+        self.probabilities = probabilities
+        self.word_count = word_count
+        self.maxlen = maxlen
+
+        # offsets[k] is the first row of the k-token block
+        self.offsets = np.zeros(maxlen + 2, dtype=np.int64)
+        for k in range(maxlen + 1):
+            self.offsets[k + 1] = self.offsets[k] + word_count ** k
+        self.place_values = word_count ** np.arange(maxlen - 1, -1, -1, dtype=np.int64)
+
+    @staticmethod
+    def row_count(word_count, maxlen):
+        return sum(word_count ** k for k in range(maxlen + 1))
+
+    @classmethod
+    def load(cls, path, vocabulary, source_path=None):
+        """Open a built table, returning None if it was built from other artifacts"""
+        with open(path + '.json', 'r', encoding='utf8') as f:
+            meta = json.load(f)
+
+        if meta['vocabulary_sha256'] != vocabulary_fingerprint(vocabulary):
+            print("[WARNING] Answer table was built for a different vocabulary; ignoring it")
+            return None
+        # The source model lives next to the table (root or a model version directory)
+        source_path = source_path or os.path.join(os.path.dirname(path), os.path.basename(meta['source']))
+        if not os.path.exists(source_path) or file_sha256(source_path) != meta['source_sha256']:
+            print("[WARNING] Answer table was built from a different model; ignoring it")
+            return None
+
+        probabilities = np.load(path, mmap_mode='r')
+        if len(probabilities) != cls.row_count(meta['word_count'], meta['maxlen']):
+            print("[WARNING] Answer table is truncated; ignoring it")
+            return None
+        return cls(probabilities, meta['word_count'], meta['maxlen'])
+
+    def indices(self, padded):
+        """Table rows for an (n, maxlen) array, -1 where a row is out of table"""
+        padded = np.asarray(padded, dtype=np.int64)
+        nonzero = padded != 0
+        lengths = nonzero.sum(axis=1)
+
+        # In-table rows are zeros followed only by ids 1..word_count
+        leading_zeros = (np.cumsum(nonzero, axis=1) == 0).sum(axis=1)
+        valid = ((leading_zeros + lengths == self.maxlen)
+                 & (padded <= self.word_count).all(axis=1)
+                 & (padded >= 0).all(axis=1))
+
+        digits = np.where(nonzero, padded - 1, 0)
+        # Right-aligned tokens: the last k place values belong to the k-token block
+        rows = self.offsets[lengths] + (digits * self.place_values).sum(axis=1)
+        return np.where(valid, rows, -1)
+
+    def lookup(self, padded_sequence):
+        """Probabilities for one padded sequence, or None if it is out of table"""
+        row = self.indices(np.atleast_2d(padded_sequence))[0]
+        if row < 0:
+            return None
+        return np.asarray(self.probabilities[row])
+
+    def sequences(self, start, stop):
+        """Reconstruct the padded sequences for table rows [start, stop)"""
+        return self.sequences_for_rows(np.arange(start, stop, dtype=np.int64))
+
+    def sequences_for_rows(self, rows):
+        """Reconstruct the padded sequences for arbitrary table rows"""
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = np.searchsorted(self.offsets, rows, side='right') - 1
+        remainder = rows - self.offsets[lengths]
+        digits = (remainder[:, None] // self.place_values) % self.word_count
+        positions = np.arange(self.maxlen)
+        tokens = np.where(positions >= self.maxlen - lengths[:, None], digits + 1, 0)
+        return tokens.astype(np.int32)
+
+
+def load_reference_model(model_path):
+    if model_path.endswith('.npz'):
+        from numpy_engine import NumpyModel
+        return NumpyModel.load(model_path)
+    from tensorflow.keras.models import load_model
+    return load_model(model_path, compile=False)
+
+
+def build(out_path='answer_table.npy', model_path='medicine_model.npz', vocabulary=None,
+          batch_size=65536, dtype='float32'):
+    """Score every reachable sequence and write the table plus its metadata"""
+    vocabulary = vocabulary or load_vocabulary()
+    word_count = vocabulary.size - 1
+    maxlen = vocabulary.maxlen
+    rows = AnswerTable.row_count(word_count, maxlen)
+    if rows > MAX_TABLE_ROWS:
+        raise ValueError(f"{rows} sequences exceed MAX_TABLE_ROWS ({MAX_TABLE_ROWS})")
+
+    model = load_reference_model(model_path)
+    probe = model.predict(np.zeros((1, maxlen), dtype=np.int32), verbose=0)
+    output = np.lib.format.open_memmap(out_path, mode='w+', dtype=dtype,
+                                       shape=(rows, probe.shape[1]))
+    table = AnswerTable(output, word_count, maxlen)
+
+    start_time = time.perf_counter()
+    for start in range(0, rows, batch_size):
+        stop = min(start + batch_size, rows)
+        batch = table.sequences(start, stop)
+        output[start:stop] = model.predict(batch, batch_size=len(batch), verbose=0)
+    output.flush()
+    del output
+
+    meta = {
+        'rows': rows,
+        'word_count': word_count,
+        'maxlen': maxlen,
+        'dtype': dtype,
+        'source': model_path,
+        'source_sha256': file_sha256(model_path),
+        'vocabulary_sha256': vocabulary_fingerprint(vocabulary)
+    }
+    with open(out_path + '.json', 'w', encoding='utf8') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"[SUCCESS] Scored {rows} sequences in {time.perf_counter() - start_time:.1f}s -> {out_path}")
+    return out_path
+
+
+def check(path='answer_table.npy', model_path='medicine_model.h5', samples=20000, seed=0):
+    """Compare random table rows with a fresh forward pass of model_path"""
+    table = AnswerTable.load(path, load_vocabulary())
+    if table is None:
+        return False
+    model = load_reference_model(model_path)
+
+    rows = np.random.default_rng(seed).integers(0, len(table.probabilities), samples)
+    sequences = table.sequences_for_rows(rows)
+    if not (table.indices(sequences) == rows).all():
+        print("[ERROR] Row indexing is not a bijection")
+        return False
+
+    expected = model.predict(sequences, batch_size=len(sequences), verbose=0)
+    max_error = float(np.abs(np.asarray(table.probabilities[rows], dtype=np.float32) - expected).max())
+    print(f"Compared {samples} rows, max abs difference {max_error:.2e}")
+    tolerance = 1e-3 if table.probabilities.dtype == np.float16 else 1e-5
+    return max_error <= tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and verify the precomputed answer table')
+    parser.add_argument('command', choices=['build', 'check'])
+    parser.add_argument('--output', default='answer_table.npy')
+    parser.add_argument('--model', default=None,
+                        help='medicine_model.npz or medicine_model.h5 (default: .npz to build, .h5 to check)')
+    parser.add_argument('--dtype', default='float32', choices=['float16', 'float32'])
+    parser.add_argument('--batch-size', type=int, default=65536)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build(args.output, args.model or 'medicine_model.npz',
+              batch_size=args.batch_size, dtype=args.dtype)
+    elif not check(args.output, args.model or 'medicine_model.h5'):
+        print("[ERROR] Answer table does not match the model")
+        sys.exit(1)
+    else:
+        print("[SUCCESS] Answer table matches the model")
+
+
+if __name__ == '__main__':
+    main()
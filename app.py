@@ -3,29 +3,25 @@ MediFlex - Smart Medication System
 AI-Powered Healthcare Application
 """
 
-from flask import Flask, render_template, request, jsonify, session
+import atexit
+import time
+_import_started = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, session
 from flask_mail import Mail
 import numpy as np
-import pickle
 import os
 from datetime import datetime
 import json
+from bson import json_util
 from config import Config
 from auth import auth_bp
-from models import User
-
-# Try to import TensorFlow (optional for basic operation)
-try:
-    import tensorflow as tf
-    from tensorflow.keras.models import load_model
-    from tensorflow.keras.preprocessing.sequence import pad_sequences
-    TF_AVAILABLE = True
-except ImportError as e:
-    print(f"[WARNING] TensorFlow not available: {e}")
-    print("The app will run without ML model predictions.")
-    TF_AVAILABLE = False
-    load_model = None
-    pad_sequences = None
+from models import Consultation, Database, User, db_round_trips
+from prediction_cache import PredictionCache
+from model_registry import ModelRegistry, set_active_version
+from knowledge_base import KnowledgeBaseStore
+from rules import rule_set
+from write_behind import WriteBehindQueue
 
 app = Flask(__name__)
 app.config.from_object(Config)
@@ -37,148 +33,120 @@ mail = Mail(app)
 # Register authentication blueprint
 app.register_blueprint(auth_bp, url_prefix='/auth')
 
-# Load ML Model and Preprocessing Objects
-try:
-    if TF_AVAILABLE and load_model is not None:
-        model = load_model('medicine_model.h5', compile=False)
-        with open('tokenizer.pkl', 'rb') as f:
-            tokenizer = pickle.load(f)
-        with open('medicine_labels.pkl', 'rb') as f:
-            medicine_list = pickle.load(f)
-        print("[SUCCESS] Model and artifacts loaded successfully!")
-    else:
-        raise Exception("TensorFlow not available")
-except Exception as e:
-    print(f"[ERROR] Error loading model: {e}")
-    model = None
-    tokenizer = None
-    medicine_list = None
-
-# Medicine Information Database
-MEDICINE_INFO = {
-    'paracetamol': {
-        'name': 'Paracetamol',
-        'category': 'Analgesic & Antipyretic',
-        'usage': 'Used to treat fever, headache, and body pain',
-        'dosage': 'Adults: 500-1000mg every 4-6 hours (max 4g/day)',
-        'precautions': [
-            'Do not exceed recommended dose',
-            'Avoid alcohol consumption',
-            'Consult doctor if pregnant or breastfeeding',
-            'Not recommended for liver disease patients'
-        ],
-        'side_effects': ['Nausea', 'Allergic reactions (rare)', 'Liver damage (overdose)']
-    },
-    'cetirizine': {
-        'name': 'Cetirizine',
-        'category': 'Antihistamine',
-        'usage': 'Used to treat allergies, cold, sneezing, and runny nose',
-        'dosage': 'Adults: 10mg once daily',
-        'precautions': [
-            'May cause drowsiness',
-            'Avoid driving after consumption',
-            'Consult doctor if pregnant',
-            'Reduce dose in kidney disease'
-        ],
-        'side_effects': ['Drowsiness', 'Dry mouth', 'Headache', 'Fatigue']
-    },
-    'azithromycin': {
-        'name': 'Azithromycin',
-        'category': 'Antibiotic',
-        'usage': 'Used to treat bacterial infections, cough, and sore throat',
-        'dosage': 'Adults: 500mg once daily for 3-5 days',
-        'precautions': [
-            'Complete the full course',
-            'Take on empty stomach',
-            'Avoid if allergic to macrolides',
-            'Consult doctor for heart conditions'
-        ],
-        'side_effects': ['Diarrhea', 'Nausea', 'Abdominal pain', 'Vomiting']
-    },
-    'diclofenac': {
-        'name': 'Diclofenac',
-        'category': 'NSAID (Anti-inflammatory)',
-        'usage': 'Used to treat swelling, inflammation, and body pain',
-        'dosage': 'Adults: 50mg 2-3 times daily',
-        'precautions': [
-            'Take with food',
-            'Avoid in stomach ulcers',
-            'Not for long-term use without supervision',
-            'Risk of cardiovascular events'
-        ],
-        'side_effects': ['Stomach upset', 'Heartburn', 'Dizziness', 'Headache']
-    },
-    'aciloc': {
-        'name': 'Aciloc (Ranitidine)',
-        'category': 'Antacid',
-        'usage': 'Used to treat acidity and stomach pain',
-        'dosage': 'Adults: 150mg twice daily or 300mg at bedtime',
-        'precautions': [
-            'Take before meals',
-            'Avoid smoking and alcohol',
-            'Consult doctor for kidney disease',
-            'May interact with other medications'
-        ],
-        'side_effects': ['Headache', 'Dizziness', 'Constipation', 'Diarrhea']
-    }
-}
-
-# Drug Interaction Database
-DRUG_INTERACTIONS = {
-    ('paracetamol', 'diclofenac'): {
-        'severity': 'moderate',
-        'warning': 'Both are pain relievers. Combination may increase risk of liver damage.',
-        'recommendation': 'Consult doctor before combining these medications'
-    },
-    ('azithromycin', 'aciloc'): {
-        'severity': 'mild',
-        'warning': 'Antacids may reduce absorption of azithromycin.',
-        'recommendation': 'Take azithromycin 1 hour before or 2 hours after antacid'
-    },
-    ('diclofenac', 'aciloc'): {
-        'severity': 'low',
-        'warning': 'Aciloc can help protect stomach from NSAID side effects.',
-        'recommendation': 'This combination is often prescribed together'
-    },
-    ('cetirizine', 'paracetamol'): {
-        'severity': 'low',
-        'warning': 'Generally safe to take together for cold and flu symptoms.',
-        'recommendation': 'No significant interaction, can be taken as prescribed'
-    }
-}
-
-# Severity Assessment Database
-SEVERITY_INDICATORS = {
-    'severe': ['high fever', 'severe pain', 'chest pain', 'difficulty breathing', 
-               'persistent vomiting', 'blood in stool', 'severe headache', 'confusion'],
-    'moderate': ['moderate fever', 'persistent cough', 'body aches', 'diarrhea', 
-                 'stomach pain', 'swelling', 'inflammation'],
-    'mild': ['mild headache', 'slight fever', 'runny nose', 'sneezing', 
-             'minor allergy', 'mild acidity']
-}
-
-# Common Allergies Database
-COMMON_ALLERGIES = {
-    'paracetamol': ['acetaminophen', 'paracetamol allergy'],
-    'cetirizine': ['antihistamine allergy', 'hydroxyzine allergy'],
-    'azithromycin': ['macrolide antibiotics', 'erythromycin', 'clarithromycin'],
-    'diclofenac': ['NSAIDs', 'aspirin', 'ibuprofen', 'naproxen'],
-    'aciloc': ['ranitidine', 'H2 blockers']
-}
-
-# Symptom Database
-SYMPTOM_DATABASE = [
-    'fever', 'headache', 'body pain', 'cold', 'allergy', 'sneezing',
-    'runny nose', 'cough', 'sore throat', 'bacterial infection',
-    'swelling', 'inflammation', 'stomach pain', 'acidity'
-]
+# MongoDB commands per request, for tests and profiling
+if Config.DB_ROUND_TRIP_HEADER:
+    @app.after_request
+    def report_db_round_trips(response):
+        """Expose how many MongoDB commands this request sent"""
+        response.headers['X-DB-Round-Trips'] = str(db_round_trips())
+        return response
+
+
+# ML model, vocabulary and labels are loaded on first use (or preloaded in
+# the gunicorn master when the engine is fork-safe). Each loaded version
+# micro-batches concurrent /predict calls into one forward pass.
+registry = ModelRegistry(Config, warmup=Config.MODEL_WARMUP)
+
+
+# Memoize predictions per served model load; a registry swap clears the cache
+if Config.PREDICTION_CACHE:
+    prediction_cache = PredictionCache(
+        max_size=Config.PREDICTION_CACHE_SIZE,
+        ttl=Config.PREDICTION_CACHE_TTL,
+        order_insensitive=Config.PREDICTION_CACHE_ORDER_INSENSITIVE
+    )
+    registry.on_swap(lambda artifacts: prediction_cache.clear())
+else:
+    prediction_cache = None
+
+
+# Log consultations off the /predict hot path, batched into bulk writes
+if Config.WRITE_BEHIND:
+    consultation_writer = WriteBehindQueue(
+        Consultation.insert_documents,
+        max_size=Config.WRITE_BEHIND_QUEUE_SIZE,
+        flush_size=Config.WRITE_BEHIND_FLUSH_SIZE,
+        flush_interval_ms=Config.WRITE_BEHIND_FLUSH_INTERVAL_MS,
+        full_policy=Config.WRITE_BEHIND_FULL_POLICY,
+        drain_timeout=Config.WRITE_BEHIND_DRAIN_TIMEOUT,
+        spill_path=Config.WRITE_BEHIND_SPILL_PATH or None,
+        dumps=json_util.dumps,
+        loads=json_util.loads
+    )
+    # gunicorn's worker_exit hook drains too; stop() is a no-op the second time
+    atexit.register(consultation_writer.stop)
+else:
+    consultation_writer = None
+
+
+def predict_probabilities(artifacts, padded_sequence):
+    """Medicine probabilities for one padded sequence, via table, cache and batcher"""
+    if artifacts.answer_table is not None:
+        row = artifacts.answer_table.lookup(padded_sequence)
+        if row is not None:
+            return row
+
+    def infer():
+        # Cached rows are shared between requests
+        row = np.array(artifacts.predict(padded_sequence)[0])
+        row.flags.writeable = False
+        return row
+
+    if prediction_cache is None:
+        return infer()
+    # The load id keeps a reloaded 'default' from reusing the previous model's entries
+    key = (artifacts.version, artifacts.load_id) + prediction_cache.key(padded_sequence[0])
+    return prediction_cache.get_or_compute(key, infer)
+
+
+def postprocessing_options(options, postprocessor=None):
+    """Per-request threshold / top_k overrides for PostProcessor.select
+    
+    Raises ValueError for out-of-range values or, given the postprocessor,
+    medicines it does not know, so callers can reject the request up front.
+    """
+    threshold = options.get('threshold')
+    if isinstance(threshold, dict):
+        values = [float(value) for value in threshold.values()]
+        if not all(0.0 <= value <= 1.0 for value in values):
+            raise ValueError('thresholds must be between 0 and 1')
+        if postprocessor is not None:
+            threshold = postprocessor.threshold_vector(threshold, base=postprocessor.thresholds)
+    elif threshold is not None:
+        threshold = float(threshold)
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError('threshold must be between 0 and 1')
+    top_k = options.get('top_k')
+    if top_k is not None:
+        top_k = int(top_k)
+        if top_k < 0:
+            raise ValueError('top_k must be non-negative')
+    return {'threshold': threshold, 'top_k': top_k}
+
+# Version reported for recommendations served by the rule engine
+RULES_VERSION = 'rules'
+
+
+def rule_based_medicines(symptom_texts):
+    """Rule-engine recommendations for many symptom strings, shaped like model output"""
+    medicines = knowledge_base.get().medicines
+    return [
+        [{'name': name.lower(), 'confidence': 100.0, 'info': medicines.get(name.lower(), {})}
+         for name in names]
+        for names in rule_set.recommend_texts(symptom_texts)
+    ]
 
+# Medicine information, drug interactions, severity keywords, allergens and
+# symptom terms (data files listed in data/manifest.json, see knowledge_base.py).
+# Loaded at import so gunicorn workers share the master's copy.
+knowledge_base = KnowledgeBaseStore(Config.KNOWLEDGE_BASE_DIR, Config.KNOWLEDGE_BASE_WATCH_INTERVAL)
+knowledge_base.get()
 
 
 @app.route('/')
 def home():
     """Render the home page"""
-    return render_template('index.html', symptoms=SYMPTOM_DATABASE)
+    return render_template('index.html', symptoms=knowledge_base.get().featured_symptoms)
 
 @app.route('/test')
 def test():
@@ -208,11 +176,12 @@ def calculate_dosage():
         age = int(data.get('age', 0))
         weight = float(data.get('weight', 0))
         
-        if medicine not in MEDICINE_INFO:
+        medicine_info = knowledge_base.get().medicine(medicine)
+        if medicine_info is None:
             return jsonify({'success': False, 'error': 'Medicine not found'})
         
         # Dosage calculation logic
-        dosage_info = {'medicine': MEDICINE_INFO[medicine]['name']}
+        dosage_info = {'medicine': medicine_info['name']}
         
         if age < 2:
             dosage_info['recommendation'] = 'Consult pediatrician - Not recommended for infants'
@@ -228,15 +197,15 @@ def calculate_dosage():
             dosage_info['suitable'] = True
             dosage_info['age_group'] = 'child'
         elif age < 18:
-            dosage_info['recommendation'] = MEDICINE_INFO[medicine]['dosage']
+            dosage_info['recommendation'] = medicine_info['dosage']
             dosage_info['suitable'] = True
             dosage_info['age_group'] = 'teenager'
         elif age < 65:
-            dosage_info['recommendation'] = MEDICINE_INFO[medicine]['dosage']
+            dosage_info['recommendation'] = medicine_info['dosage']
             dosage_info['suitable'] = True
             dosage_info['age_group'] = 'adult'
         else:
-            dosage_info['recommendation'] = MEDICINE_INFO[medicine]['dosage'] + ' (May need adjustment for elderly)'
+            dosage_info['recommendation'] = medicine_info['dosage'] + ' (May need adjustment for elderly)'
             dosage_info['suitable'] = True
             dosage_info['age_group'] = 'elderly'
             dosage_info['note'] = 'Consult doctor for elderly-specific dosing'
@@ -260,14 +229,7 @@ def check_interactions():
         if len(medicines) < 2:
             return jsonify({'success': True, 'interactions': []})
         
-        interactions = []
-        for i in range(len(medicines)):
-            for j in range(i + 1, len(medicines)):
-                pair = tuple(sorted([medicines[i], medicines[j]]))
-                if pair in DRUG_INTERACTIONS:
-                    interaction = DRUG_INTERACTIONS[pair].copy()
-                    interaction['medicines'] = [medicines[i], medicines[j]]
-                    interactions.append(interaction)
+        interactions = knowledge_base.get().interactions.check(medicines)
         
         return jsonify({'success': True, 'interactions': interactions})
     except Exception as e:
@@ -285,12 +247,7 @@ def assess_severity():
         data = request.get_json()
         symptoms = data.get('symptoms', '').lower()
         
-        severity_score = {'severe': 0, 'moderate': 0, 'mild': 0}
-        
-        for severity, keywords in SEVERITY_INDICATORS.items():
-            for keyword in keywords:
-                if keyword in symptoms:
-                    severity_score[severity] += 1
+        severity_score = knowledge_base.get().severity.score(symptoms)
         
         # Determine overall severity
         if severity_score['severe'] > 0:
@@ -327,25 +284,19 @@ def check_allergies():
     try:
         data = request.get_json()
         medicines = [m.lower() for m in data.get('medicines', [])]
-        allergies = [a.lower().strip() for a in data.get('allergies', [])]
-        
-        conflicts = []
-        for medicine in medicines:
-            if medicine in COMMON_ALLERGIES:
-                med_allergens = COMMON_ALLERGIES[medicine]
-                for allergen in med_allergens:
-                    for allergy in allergies:
-                        if allergen.lower() in allergy or allergy in allergen.lower():
-                            conflicts.append({
-                                'medicine': MEDICINE_INFO[medicine]['name'],
-                                'allergy': allergy,
-                                'warning': f'You may be allergic to {MEDICINE_INFO[medicine]["name"]} due to {allergy} allergy'
-                            })
+        allergies = data.get('allergies')
+        if allergies is None:
+            # No allergies sent: screen against the allergy profile saved with the account
+            user = User.find_by_email(session['user_email']) or {}
+            allergies = (user.get('profile') or {}).get('allergies', [])
+        
+        conflicts, safe = knowledge_base.get().allergens.screen(medicines, allergies)
         
         return jsonify({
             'success': True,
             'has_conflicts': len(conflicts) > 0,
-            'conflicts': conflicts
+            'conflicts': conflicts,
+            'safe': safe
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -363,7 +314,8 @@ def predict():
         }), 401
     
     try:
-        if model is None or tokenizer is None or medicine_list is None:
+        artifacts = registry.get()
+        if artifacts is None and not Config.RULES_FALLBACK:
             return jsonify({
                 'success': False,
                 'error': 'Model not loaded. Please ensure all model files are present.'
@@ -382,28 +334,29 @@ def predict():
         # Preprocess symptoms
         symptoms_lower = symptoms.lower().strip()
         
-        # Tokenize and pad
-        sequence = tokenizer.texts_to_sequences([symptoms_lower])
-        padded_sequence = pad_sequences(sequence, maxlen=5)
-        
-        # Predict
-        predictions = model.predict(padded_sequence, verbose=0)
-        
-        # Get predictions with threshold
-        threshold = 0.5
-        predicted_medicines = []
-        
-        for idx, prob in enumerate(predictions[0]):
-            if prob > threshold:
-                medicine_name = medicine_list[idx].lower()
-                predicted_medicines.append({
-                    'name': medicine_name,
-                    'confidence': float(prob * 100),
-                    'info': MEDICINE_INFO.get(medicine_name, {})
-                })
-        
-        # Sort by confidence
-        predicted_medicines.sort(key=lambda x: x['confidence'], reverse=True)
+        if artifacts is None:
+            # Model unavailable: fall back to the rule engine (no TensorFlow needed)
+            model_version = RULES_VERSION
+            predicted_medicines = rule_based_medicines([symptoms_lower])[0]
+        else:
+            model_version = artifacts.version
+            
+            # Tokenize and pad
+            padded_sequence = artifacts.vocabulary.encode_one(symptoms_lower)
+            
+            # Predict
+            probabilities = predict_probabilities(artifacts, padded_sequence)
+            
+            # Get predictions above threshold, sorted by confidence
+            try:
+                options = postprocessing_options(data, artifacts.postprocessor)
+            except (TypeError, ValueError) as e:
+                return jsonify({'success': False, 'error': str(e)})
+            medicines = knowledge_base.get().medicines
+            predicted_medicines = [
+                {'name': name, 'confidence': confidence, 'info': medicines.get(name, {})}
+                for name, confidence in artifacts.postprocessor.select(probabilities, **options)[0]
+            ]
         
         # Store in session for history
         if 'history' not in session:
@@ -419,7 +372,10 @@ def predict():
         
         # Save to user's MongoDB record
         try:
-            User.add_consultation(session['user_email'], consultation_data)
+            if consultation_writer is not None:
+                consultation_writer.submit(Consultation.document(session['user_email'], consultation_data))
+            else:
+                User.add_consultation(session['user_email'], consultation_data)
         except Exception as db_error:
             print(f"Failed to save consultation to database: {db_error}")
         
@@ -427,13 +383,15 @@ def predict():
             return jsonify({
                 'success': True,
                 'medicines': [],
-                'message': 'No specific medicine recommendation. Please consult a healthcare professional.'
+                'message': 'No specific medicine recommendation. Please consult a healthcare professional.',
+                'model_version': model_version
             })
         
         return jsonify({
             'success': True,
             'medicines': predicted_medicines,
-            'symptoms_analyzed': symptoms
+            'symptoms_analyzed': symptoms,
+            'model_version': model_version
         })
         
     except Exception as e:
@@ -443,6 +401,130 @@ def predict():
         })
 
 
+def parse_bulk_request():
+    """Symptom strings and options from a JSON or NDJSON bulk upload
+    
+    Raises ValueError unless every row is a symptom string (or, in NDJSON,
+    an object with one), so bad uploads are rejected before streaming.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        symptoms_list = []
+        for number, line in enumerate(request.get_data(as_text=True).splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, dict):
+                item = item.get('symptoms', '')
+            if not isinstance(item, str):
+                raise ValueError(f'line {number} must be a string or an object with a "symptoms" string')
+            symptoms_list.append(item)
+        options = request.args
+    else:
+        data = request.get_json()
+        if isinstance(data, list):
+            symptoms_list, options = data, request.args
+        elif isinstance(data, dict):
+            symptoms_list, options = data.get('symptoms', []), data
+        else:
+            raise ValueError('body must be a list of symptom strings or an object with "symptoms"')
+        if not isinstance(symptoms_list, list) or not all(isinstance(s, str) for s in symptoms_list):
+            raise ValueError('"symptoms" must be a list of strings')
+    
+    record = options.get('record', False)
+    if isinstance(record, str):
+        record = record.lower() == 'true'
+    return symptoms_list, bool(record), options
+
+
+@app.route('/predict-bulk', methods=['POST'])
+def predict_bulk():
+    """Score many symptom strings at once, streaming NDJSON results - Requires login"""
+    if 'user_email' not in session:
+        return jsonify({
+            'success': False,
+            'error': 'Please login to get medicine recommendations.',
+            'require_login': True
+        }), 401
+    
+    artifacts = registry.get()
+    if artifacts is None and not Config.RULES_FALLBACK:
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded. Please ensure all model files are present.'
+        })
+    
+    try:
+        symptoms_list, record, options = parse_bulk_request()
+        options = postprocessing_options(options, artifacts.postprocessor if artifacts is not None else None)
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Invalid bulk request: {str(e)}'}), 400
+    
+    if len(symptoms_list) > Config.BULK_PREDICT_MAX_ROWS:
+        return jsonify({
+            'success': False,
+            'error': f'Too many rows (max {Config.BULK_PREDICT_MAX_ROWS})'
+        }), 413
+    
+    user_email = session['user_email']
+    chunk_size = Config.BULK_PREDICT_CHUNK_SIZE
+    
+    def generate():
+        consultations = []
+        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        for start in range(0, len(symptoms_list), chunk_size):
+            chunk = symptoms_list[start:start + chunk_size]
+            
+            if artifacts is None:
+                selections = [
+                    [(m['name'], m['confidence']) for m in medicines]
+                    for medicines in rule_based_medicines(chunk)
+                ]
+            else:
+                # Vectorized tokenization and one batched inference per chunk
+                padded = artifacts.vocabulary.encode([s.lower().strip() for s in chunk])
+                probabilities = artifacts.predict_batch(padded)
+                selections = artifacts.postprocessor.select(probabilities, **options)
+            
+            lines = []
+            for offset, symptoms in enumerate(chunk):
+                if not symptoms.strip():
+                    lines.append(json.dumps({'index': start + offset, 'error': 'Please enter symptoms'}))
+                    continue
+                
+                medicines = selections[offset]
+                lines.append(json.dumps({
+                    'index': start + offset,
+                    'symptoms': symptoms,
+                    'medicines': [{'name': name, 'confidence': confidence} for name, confidence in medicines]
+                }))
+                if record:
+                    consultations.append({
+                        'symptoms': symptoms,
+                        'medicines': [name for name, _ in medicines],
+                        'timestamp': timestamp
+                    })
+            yield '\n'.join(lines) + '\n'
+        
+        # One bulk write for the whole upload
+        recorded = 0
+        if record and consultations:
+            try:
+                User.add_consultations(user_email, consultations)
+                recorded = len(consultations)
+            except Exception as db_error:
+                print(f"Failed to save bulk consultations to database: {db_error}")
+        
+        yield json.dumps({'summary': {
+            'rows': len(symptoms_list),
+            'recorded': recorded,
+            'model_version': artifacts.version if artifacts is not None else RULES_VERSION
+        }}) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+
 @app.route('/about')
 def about():
     """About page with research paper information"""
@@ -455,22 +537,78 @@ def health_tips():
     return render_template('health_tips.html')
 
 
+def serialize_consultation(consultation):
+    """JSON-safe view of a consultation document"""
+    timestamp = consultation.get('timestamp')
+    return {
+        'symptoms': consultation.get('symptoms', ''),
+        'medicines': consultation.get('medicines', []),
+        'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S') if isinstance(timestamp, datetime) else timestamp
+    }
+
+
+def history_page(email, limit=None, before=None, after=None):
+    """One page of consultations plus the cursors for its neighbours"""
+    limit = min(int(limit or Config.HISTORY_PAGE_SIZE), Config.HISTORY_MAX_PAGE_SIZE)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    if before and after:
+        raise ValueError('Use either before or after, not both')
+    
+    consultations, older, newer = Consultation.find_page(
+        email, limit=limit, before=before, after=after,
+        projection=Consultation.summary_fields
+    )
+    return {
+        'consultations': [serialize_consultation(c) for c in consultations],
+        'next_cursor': older,
+        'prev_cursor': newer
+    }
+
+
 @app.route('/history')
 def history():
     """Show user's consultation history - Requires login"""
     if 'user_email' not in session:
         return render_template('login.html')
     
-    # Get user's consultation history from database
-    user = User.find_by_email(session['user_email'])
-    user_history = user.get('consultations', []) if user else []
-    return render_template('history.html', history=user_history)
+    # First page is rendered here; older pages come from /api/history
+    page = history_page(session['user_email'])
+    return render_template('history.html', history=page['consultations'],
+                           next_cursor=page['next_cursor'], page_size=Config.HISTORY_PAGE_SIZE)
+
+
+@app.route('/api/history')
+def api_history():
+    """Paginated consultation history, newest first - Requires login
+    
+    Query: limit, and at most one of before / after (cursors from a
+    previous response's next_cursor / prev_cursor)
+    """
+    if 'user_email' not in session:
+        return jsonify({
+            'success': False,
+            'error': 'Please login',
+            'require_login': True
+        }), 401
+    
+    try:
+        page = history_page(
+            session['user_email'],
+            limit=request.args.get('limit'),
+            before=request.args.get('before'),
+            after=request.args.get('after')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    return jsonify(dict(page, success=True))
 
 
 @app.route('/api/medicine-info/<medicine_name>')
 def get_medicine_info(medicine_name):
     """API endpoint to get detailed medicine information"""
-    medicine_data = MEDICINE_INFO.get(medicine_name.lower())
+    medicine_data = knowledge_base.get().medicine(medicine_name)
     if medicine_data:
         return jsonify({
             'success': True,
@@ -483,6 +621,73 @@ def get_medicine_info(medicine_name):
         })
 
 
+@app.route('/api/inference-stats')
+def inference_stats():
+    """API endpoint exposing startup timings, prediction cache and batching counters"""
+    artifacts = registry.get()
+    answer_table = artifacts.answer_table if artifacts is not None else None
+    batcher = artifacts.batcher if artifacts is not None else None
+    return jsonify({
+        'success': True,
+        'startup': registry.report(),
+        'answer_table_rows': len(answer_table.probabilities) if answer_table is not None else 0,
+        'cache': prediction_cache.stats() if prediction_cache is not None else None,
+        'batching': batcher.stats() if batcher is not None else None
+    })
+
+
+@app.route('/api/db-stats')
+def db_stats():
+    """API endpoint exposing this worker's MongoDB pool and write-behind counters"""
+    return jsonify({
+        'success': True,
+        'database': Database().stats(),
+        'write_behind': consultation_writer.stats() if consultation_writer is not None else None
+    })
+
+
+@app.route('/admin/model/reload', methods=['POST'])
+def reload_model():
+    """Load, warm up and swap in a model version without restarting workers"""
+    if not Config.ADMIN_TOKEN or request.headers.get('X-Admin-Token') != Config.ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version')
+        artifacts = registry.reload(version)
+        
+        # Pin the version (including 'default') so the other workers' watchers switch to it too
+        if version and os.path.isdir(Config.MODEL_VERSIONS_DIR):
+            set_active_version(Config.MODEL_VERSIONS_DIR, version)
+        
+        return jsonify({'success': True, 'model_version': artifacts.version, 'startup': registry.report()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+
+@app.route('/api/knowledge-base')
+def knowledge_base_stats():
+    """API endpoint exposing the knowledge base version, sizes and load timings"""
+    return jsonify({'success': True, 'knowledge_base': knowledge_base.get().stats()})
+
+
+@app.route('/admin/knowledge-base/reload', methods=['POST'])
+def reload_knowledge_base():
+    """Re-read the knowledge base data files and swap them in atomically
+    
+    Other workers follow within KNOWLEDGE_BASE_WATCH_INTERVAL, when their
+    stores see the manifest touched by the reload.
+    """
+    if not Config.ADMIN_TOKEN or request.headers.get('X-Admin-Token') != Config.ADMIN_TOKEN:
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    
+    try:
+        return jsonify({'success': True, 'knowledge_base': knowledge_base.reload().stats()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+
 @app.route('/clear-history', methods=['POST'])
 def clear_history():
     """Clear user consultation history"""
@@ -538,8 +743,7 @@ def get_reminders():
         }), 401
     
     try:
-        user = User.find_by_email(session['user_email'])
-        reminders = user.get('reminders', []) if user else []
+        reminders = User.get_reminders(session['user_email'])
         
         return jsonify({
             'success': True,
@@ -558,19 +762,8 @@ def symptom_suggestions():
     if not query or len(query) < 2:
         return jsonify({'suggestions': []})
     
-    # Common symptoms database
-    common_symptoms = [
-        'fever', 'headache', 'cough', 'cold', 'sore throat', 'body ache', 'fatigue',
-        'nausea', 'vomiting', 'diarrhea', 'stomach pain', 'chest pain', 'back pain',
-        'dizziness', 'shortness of breath', 'runny nose', 'sneezing', 'watery eyes',
-        'muscle pain', 'joint pain', 'chills', 'sweating', 'loss of appetite',
-        'constipation', 'bloating', 'heartburn', 'rash', 'itching', 'swelling',
-        'ear ache', 'toothache', 'jaw pain', 'neck pain', 'shoulder pain',
-        'weakness', 'confusion', 'insomnia', 'anxiety', 'depression'
-    ]
-    
-    # Filter symptoms that match query
-    suggestions = [s for s in common_symptoms if query in s][:10]
+    # Ranked prefix, infix and misspelling matches from the prebuilt index
+    suggestions = knowledge_base.get().autocomplete.suggest(query, limit=10)
     
     return jsonify({'suggestions': suggestions})
 
@@ -592,6 +785,14 @@ def emergency_contacts():
     return jsonify({'success': True, 'contacts': contacts})
 
 
+# Load now when workers can share the result; otherwise each worker loads lazily
+if Config.MODEL_PRELOAD:
+    registry.preload()
+
+registry.timings['import_seconds'] = round(time.perf_counter() - _import_started, 4)
+print(f"[INFO] Application imported in {registry.timings['import_seconds']}s")
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found(e):
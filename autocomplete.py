@@ -0,0 +1,267 @@
+"""
+Symptom autocomplete index
+
+SymptomIndex is built once from data/symptom_terms.json (terms with a
+popularity weight and synonyms; a synonym suggests its term) and answers
+/symptom-suggestions lookups in three tiers:
+
+    prefix  -- the term or a synonym starts with the query
+    infix   -- the query occurs anywhere else in a term or synonym
+    fuzzy   -- after correcting misspelled query words (edit distance 1-2)
+
+Within a tier, more popular terms come first. Every key gets an id in order
+of decreasing popularity, so walking any id list in order visits the most
+popular keys first and can stop as soon as enough results are found.
+
+    prefixes  -- keys in sorted order (a flattened trie, searched with
+                 bisect), plus the top ids for every prefix of up to
+                 SHORT_PREFIX characters, where the bisect range is large
+    grams     -- 2- and 3-character substrings -> key ids (infix)
+    deletes   -- SymSpell index: every word of the vocabulary with up to
+                 one or two characters deleted -> words
+
+Usage:
+    python autocomplete.py "stomch pa"
+"""
+
+import argparse
+import bisect
+import itertools
+import json
+
+SHORT_PREFIX = 3
+MAX_RESULTS = 50
+MAX_CORRECTIONS = 10
+
+
+def edit_distance(first, second, limit):
+    """Optimal string alignment distance, or limit + 1 once it exceeds limit"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    previous_previous = None
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i] + [0] * len(second)
+        for j, b in enumerate(second, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a == second[j - 2] and first[i - 2] == b):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def max_distance(word):
+    return 1 if len(word) < 6 else 2
+
+
+def deletes(word, distance):
+    """Every string obtained by deleting up to `distance` characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {candidate[:i] + candidate[i + 1:] for candidate in frontier
+                    for i in range(len(candidate))} - results
+        results |= frontier
+    return results
+
+
+def normalize(text):
+    return ' '.join(text.lower().split())
+
+
+class SymptomIndex:
+    """Ranked prefix / infix / fuzzy lookups over symptom terms and synonyms"""
+
+    def __init__(self, entries, version=None):
+        """entries -- [{'term': ..., 'popularity': ..., 'synonyms': [...]}, ...]"""
+        self.version = version
+
+        # One key per distinct normalized term or synonym; the most popular owner wins
+        owners = {}
+        self.terms = []
+        for entry in sorted(entries, key=lambda e: -float(e.get('popularity', 0))):
+            term = normalize(entry['term'])
+            if not term or term in owners:
+                continue
+            term_id = len(self.terms)
+            self.terms.append(term)
+            for key in [term] + [normalize(s) for s in entry.get('synonyms', [])]:
+                if key and key not in owners:
+                    owners[key] = (term_id, term)
+
+        # Key ids follow term popularity (a term before its synonyms)
+        ordered = sorted(owners.items(), key=lambda item: (item[1][0], item[0] != item[1][1], item[0]))
+        self.keys = [key for key, _ in ordered]
+        self.key_terms = [term_id for _, (term_id, _) in ordered]
+
+        self._build_prefixes()
+        self._build_grams()
+        self._build_deletes()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf8') as f:
+            data = json.load(f)
+        return cls(data['terms'], data.get('version'))
+
+    def _build_prefixes(self):
+        order = sorted(range(len(self.keys)), key=self.keys.__getitem__)
+        self._sorted_keys = [self.keys[i] for i in order]
+        self._sorted_ids = order
+        self._short = {}
+        for key_id, key in enumerate(self.keys):
+            for length in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                ids = self._short.setdefault(key[:length], [])
+                if len(ids) < MAX_RESULTS:
+                    ids.append(key_id)
+
+    def _build_grams(self):
+        grams = {}
+        for key_id, key in enumerate(self.keys):
+            for size in (2, 3):
+                for gram in {key[i:i + size] for i in range(len(key) - size + 1)}:
+                    grams.setdefault(gram, []).append(key_id)
+        self._grams = grams
+
+    def _build_deletes(self):
+        self.words = {}
+        for key_id, key in enumerate(self.keys):
+            for word in key.split():
+                self.words.setdefault(word, key_id)
+        self._deletes = {}
+        for word in self.words:
+            for variant in deletes(word, max_distance(word)):
+                self._deletes.setdefault(variant, []).append(word)
+
+    def _prefix_ids(self, query):
+        """Key ids starting with query, most popular first"""
+        if len(query) <= SHORT_PREFIX:
+            return self._short.get(query, [])
+        low = bisect.bisect_left(self._sorted_keys, query)
+        high = bisect.bisect_left(self._sorted_keys, query + '\uffff', low)
+        return sorted(self._sorted_ids[low:high])
+
+    def _infix_ids(self, query):
+        """Key ids containing query (checked against the rarest gram's ids)"""
+        size = min(3, len(query))
+        candidates = None
+        for i in range(len(query) - size + 1):
+            ids = self._grams.get(query[i:i + size])
+            if ids is None:
+                return
+            if candidates is None or len(ids) < len(candidates):
+                candidates = ids
+        for key_id in candidates or ():
+            if query in self.keys[key_id]:
+                yield key_id
+
+    def corrections(self, word):
+        """Vocabulary words within edit distance of word, closest then most popular"""
+        if word in self.words:
+            return [(0, word)]
+        limit = max_distance(word)
+        found = {}
+        for variant in deletes(word, limit):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate not in found:
+                    found[candidate] = edit_distance(word, candidate, limit)
+        return sorted(((distance, candidate) for candidate, distance in found.items() if distance <= limit),
+                      key=lambda item: (item[0], self.words[item[1]]))
+
+    def _fuzzy(self, query, limit):
+        """(distance, term id) for queries with misspelled words corrected"""
+        words = query.split()
+        if not words:
+            return []
+        # A partly typed last word may already be a prefix; correct it only when not
+        last = words[-1]
+        options = []
+        for i, word in enumerate(words):
+            if i == len(words) - 1 and self._prefix_ids(last) or len(word) < 3:
+                options.append([(0, word)])
+            else:
+                options.append(self.corrections(word)[:3] or [(0, word)])
+
+        # Closest corrected queries first, pruned so long queries stay cheap
+        candidates = [(0, [])]
+        for choices in options:
+            candidates = sorted(((distance + d, parts + [w]) for distance, parts in candidates
+                                 for d, w in choices), key=lambda item: item[0])[:MAX_CORRECTIONS]
+
+        results = {}
+        for distance, parts in candidates:
+            if distance == 0:
+                continue
+            corrected = ' '.join(parts)
+            for key_id in itertools.chain(self._prefix_ids(corrected), self._infix_ids(corrected)):
+                results.setdefault(self.key_terms[key_id], distance)
+                if len(results) >= limit:
+                    return sorted((d, term_id) for term_id, d in results.items())
+        return sorted((d, term_id) for term_id, d in results.items())
+
+    def suggest(self, query, limit=10):
+        """Up to `limit` terms: prefix matches, then infix, then fuzzy"""
+        query = normalize(query)
+        limit = max(0, min(int(limit), MAX_RESULTS))
+        if not query or not limit:
+            return []
+
+        seen = set()
+        results = []
+
+        def add(key_ids):
+            for key_id in key_ids:
+                term_id = self.key_terms[key_id]
+                if term_id not in seen:
+                    seen.add(term_id)
+                    results.append(self.terms[term_id])
+                    if len(results) >= limit:
+                        return True
+            return False
+
+        if add(self._prefix_ids(query)):
+            return results
+
+        # Infix candidates arrive most popular first, but prefix results rank above them
+        if add(key_id for key_id in self._infix_ids(query) if not self.keys[key_id].startswith(query)):
+            return results
+
+        for _, term_id in self._fuzzy(query, limit):
+            if term_id not in seen:
+                seen.add(term_id)
+                results.append(self.terms[term_id])
+                if len(results) >= limit:
+                    break
+        return results
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'terms': len(self.terms),
+            'keys': len(self.keys),
+            'words': len(self.words),
+            'grams': len(self._grams),
+            'deletes': len(self._deletes)
+        }
+
+
+def main():
+    from knowledge_base import data_path
+
+    parser = argparse.ArgumentParser(description='Show autocomplete suggestions for a query')
+    parser.add_argument('query')
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--data', help='Symptom terms file (default: from the knowledge base manifest)')
+    args = parser.parse_args()
+
+    index = SymptomIndex.load(args.data or data_path('symptoms'))
+    print(f"[INFO] {index.stats()}")
+    for suggestion in index.suggest(args.query, args.limit):
+        print(suggestion)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Micro-batching for model inference
+
+Concurrent /predict requests each carry a single padded sequence. Instead of
+running one forward pass per request, requests are queued and a background
+thread coalesces whatever arrives within a short window into one batch.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class PredictionBatcher:
+    """Coalesce concurrent predictions into batched forward passes"""
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=2.0, timeout=10.0):
+        """
+        predict_fn     -- callable taking an (n, maxlen) array, returning (n, labels)
+        max_batch_size -- maximum number of rows sent to predict_fn at once
+        max_wait_ms    -- how long the first queued request waits for company
+        timeout        -- seconds a caller waits for its result before giving up
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+
+        # Counters for monitoring
+        self.batches = 0
+        self.rows = 0
+
+    def _ensure_worker(self):
+        """Start the worker thread, restarting it after a fork"""
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._pid == pid and self._worker.is_alive():
+                return
+            # Threads do not survive fork(), so each process gets its own queue
+            self._queue = queue.Queue()
+            self._pid = pid
+            self._worker = threading.Thread(
+                target=self._run, args=(self._queue,),
+                name='prediction-batcher', daemon=True
+            )
+            self._worker.start()
+
+    def submit(self, sequences):
+        """Queue padded sequences and block until their predictions are ready"""
+        sequences = np.asarray(sequences)
+        if sequences.ndim == 1:
+            sequences = sequences[np.newaxis, :]
+
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((sequences, future))
+        return future.result(timeout=self.timeout)
+
+    def _collect(self, pending):
+        """Gather queued requests until the batch is full or the window closes"""
+        first = pending.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown requested; finish this batch first
+                pending.put(None)
+                break
+            batch.append(item)
+            size += len(item[0])
+
+        return batch
+
+    def _run(self, pending):
+        """Worker loop: one forward pass per collected batch"""
+        while True:
+            batch = self._collect(pending)
+            if batch is None:
+                return
+
+            futures = [future for _, future in batch]
+            try:
+                inputs = np.concatenate([sequences for sequences, _ in batch], axis=0)
+                outputs = np.asarray(self.predict_fn(inputs))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.rows += len(inputs)
+
+            # Fan results back out in submission order
+            offset = 0
+            for sequences, future in batch:
+                count = len(sequences)
+                future.set_result(outputs[offset:offset + count])
+                offset += count
+
+    def stop(self):
+        """Stop the worker thread after it drains the queue"""
+        if self._worker is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._worker.join(timeout=self.timeout)
+        self._worker = None
+
+    def stats(self):
+        """Batching statistics for monitoring"""
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch_size': (self.rows / self.batches) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0
+        }
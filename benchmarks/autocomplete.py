@@ -0,0 +1,123 @@
+"""
+Benchmark for symptom autocomplete
+
+Builds SymptomIndex over a synthetic vocabulary (multi-word terms with
+synonyms and skewed popularity) and replays keystroke-style queries: growing
+prefixes, mid-word fragments and misspellings. Reports build time and lookup
+latency percentiles next to the old linear `query in term` scan.
+
+Usage:
+    python benchmarks/autocomplete.py --terms 50000 --queries 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from autocomplete import SymptomIndex  # noqa: E402
+
+
+def synthetic_entries(terms, words=4000, seed=0):
+    rng = random.Random(seed)
+    vocabulary = sorted({''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+                         for _ in range(words)})
+    seen = set()
+    entries = []
+    while len(entries) < terms:
+        term = ' '.join(rng.choices(vocabulary, k=rng.choice([1, 2, 2, 3])))
+        if term in seen:
+            continue
+        seen.add(term)
+        synonyms = [' '.join(rng.choices(vocabulary, k=2)) for _ in range(rng.choice([0, 0, 1, 2]))]
+        entries.append({'term': term, 'popularity': rng.paretovariate(1.2), 'synonyms': synonyms})
+    return entries
+
+
+def misspell(word, rng):
+    i = rng.randrange(len(word))
+    edit = rng.choice(['delete', 'replace', 'transpose'])
+    if edit == 'delete' and len(word) > 3:
+        return word[:i] + word[i + 1:]
+    if edit == 'transpose' and i + 1 < len(word):
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    return word[:i] + rng.choice(string.ascii_lowercase) + word[i + 1:]
+
+
+def synthetic_queries(entries, count, seed=1):
+    rng = random.Random(seed)
+    queries = []
+    while len(queries) < count:
+        term = rng.choice(entries)['term']
+        kind = rng.random()
+        if kind < 0.6:
+            queries.append(term[:rng.randint(2, len(term))])
+        elif kind < 0.8:
+            start = rng.randrange(max(1, len(term) - 3))
+            queries.append(term[start:start + rng.randint(3, 6)])
+        else:
+            queries.append(' '.join(misspell(word, rng) for word in term.split()))
+    return queries
+
+
+def latencies(fn, queries):
+    times = np.empty(len(queries))
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        fn(query)
+        times[i] = time.perf_counter() - start
+    times *= 1000.0
+    return {
+        'p50_ms': round(float(np.percentile(times, 50)), 4),
+        'p99_ms': round(float(np.percentile(times, 99)), 4),
+        'max_ms': round(float(times.max()), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark symptom autocomplete lookups')
+    parser.add_argument('--terms', type=int, default=50000)
+    parser.add_argument('--queries', type=int, default=5000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON only')
+    args = parser.parse_args()
+
+    entries = synthetic_entries(args.terms)
+    queries = synthetic_queries(entries, args.queries)
+
+    start = time.perf_counter()
+    index = SymptomIndex(entries)
+    build_seconds = time.perf_counter() - start
+
+    terms = [entry['term'] for entry in entries]
+    results = {
+        'build_seconds': round(build_seconds, 2),
+        'index': latencies(lambda q: index.suggest(q, args.limit), queries),
+        'linear_scan': latencies(lambda q: [t for t in terms if q in t][:args.limit], queries[:500])
+    }
+    results['index_stats'] = index.stats()
+    answered = sum(1 for q in queries if index.suggest(q, args.limit))
+    results['answered'] = round(answered / len(queries), 3)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"[INFO] {results['index_stats']}")
+    print(f"build {results['build_seconds']}s, {results['answered']:.1%} of queries answered")
+    print(f"{'path':<14}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in ('index', 'linear_scan'):
+        r = results[name]
+        print(f"{name:<14}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+
+
+if __name__ == '__main__':
+    main()
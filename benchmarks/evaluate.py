@@ -0,0 +1,229 @@
+"""
+Offline evaluation and throughput benchmark
+
+Runs every row of a symptoms dataset through each available engine and
+reports throughput, per-row latency percentiles, peak memory and (when the
+dataset has a Medicines column) multi-label precision / recall. Each engine
+runs in a fresh process so its peak RSS includes everything it had to
+import/load.
+
+The dataset is a CSV or a directory written by columnar_dataset.py; either
+way rows are encoded once up front (reported as encode_seconds), so
+throughput and latency measure the engines rather than CSV parsing.
+
+Engines:
+    keras         medicine_model.h5 through TensorFlow
+    numpy         medicine_model.npz through numpy_engine
+    answer_table  precomputed answer_table.npy with model fallback
+    rules         compiled rules from rules.py
+
+Usage:
+    python benchmarks/evaluate.py --csv medicines.csv --output results.json
+    python benchmarks/evaluate.py --csv medicines.columnar
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENGINES = ['keras', 'numpy', 'answer_table', 'rules']
+
+
+def build_engine(name, label_names):
+    """predict(tokens, symptoms) -> boolean (rows, label_names) recommendations"""
+    from config import Config
+
+    if name == 'rules':
+        from rules import MEDICINE_BITS, rule_set
+
+        bits = {medicine.lower(): bit for medicine, bit in MEDICINE_BITS.items()}
+        column_bits = np.array([bits[label] for label in label_names], dtype=np.int64)
+
+        def predict_rules(tokens, symptoms):
+            codes = rule_set.evaluate_masks(symptoms)
+            return (codes[:, None] & column_bits) != 0
+        return predict_rules
+
+    from model_registry import load_artifacts
+
+    class EngineConfig(Config):
+        INFERENCE_ENGINE = 'numpy' if name == 'answer_table' else name
+        # Only the answer_table engine may use the table
+        ANSWER_TABLE_PATH = Config.ANSWER_TABLE_PATH if name == 'answer_table' else ''
+
+    artifacts = load_artifacts(EngineConfig)
+    if name == 'answer_table' and artifacts.answer_table is None:
+        raise RuntimeError('answer table not built (python answer_table.py build)')
+
+    # Model outputs follow medicine_labels.pkl; reorder to the dataset's labels
+    columns = [artifacts.postprocessor.index[label] for label in label_names]
+
+    def predict_model(tokens, symptoms):
+        probabilities = artifacts.predict_batch(np.asarray(tokens))
+        return artifacts.postprocessor.multi_hot(probabilities)[:, columns]
+    return predict_model
+
+
+def multilabel_metrics(predicted, expected, label_names):
+    """Micro / macro precision and recall plus exact-match ratio"""
+    predicted = np.asarray(predicted, dtype=bool)
+    expected = np.asarray(expected, dtype=bool)
+
+    tp = (predicted & expected).sum(axis=0)
+    fp = (predicted & ~expected).sum(axis=0)
+    fn = (~predicted & expected).sum(axis=0)
+
+    # Only labels that were predicted or expected at least once
+    seen = [i for i in np.argsort(label_names) if predicted[:, i].any() or expected[:, i].any()]
+
+    def ratio(a, b):
+        return round(float(a) / float(b), 6) if b else 0.0
+
+    precisions = [ratio(tp[i], tp[i] + fp[i]) for i in seen]
+    recalls = [ratio(tp[i], tp[i] + fn[i]) for i in seen]
+    return {
+        'micro_precision': ratio(tp.sum(), tp.sum() + fp.sum()),
+        'micro_recall': ratio(tp.sum(), tp.sum() + fn.sum()),
+        'macro_precision': round(sum(precisions) / len(precisions), 6) if precisions else 0.0,
+        'macro_recall': round(sum(recalls) / len(recalls), 6) if recalls else 0.0,
+        'exact_match': ratio((predicted == expected).all(axis=1).sum(), len(expected)),
+        'per_label': {
+            label_names[i]: {'precision': ratio(tp[i], tp[i] + fp[i]),
+                             'recall': ratio(tp[i], tp[i] + fn[i])}
+            for i in seen
+        }
+    }
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(q / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def evaluate_engine(name, data_path, batch_size, latency_rows):
+    """Benchmark one engine (runs inside its own process)"""
+    os.chdir(ROOT)
+    from columnar_dataset import ColumnarDataset, load_label_names
+
+    started = time.perf_counter()
+    dataset = ColumnarDataset.load(data_path)
+    encode_seconds = time.perf_counter() - started
+    label_names = dataset.label_names or load_label_names()
+    tokens, symptoms = dataset.tokens, dataset.symptoms
+
+    started = time.perf_counter()
+    predict = build_engine(name, label_names)
+    load_seconds = time.perf_counter() - started
+
+    # Warm-up so one-off tracing is not counted as throughput
+    predict(tokens[:1], symptoms[:1])
+
+    # Throughput: every row, in batches
+    predicted = np.zeros((len(dataset), len(label_names)), dtype=bool)
+    started = time.perf_counter()
+    for start in range(0, len(dataset), batch_size):
+        stop = start + batch_size
+        predicted[start:stop] = predict(tokens[start:stop], symptoms[start:stop])
+    elapsed = time.perf_counter() - started
+
+    # Per-row latency: one call per row, as /predict would make
+    latencies = []
+    for row in range(min(latency_rows, len(dataset))):
+        call_started = time.perf_counter()
+        predict(tokens[row:row + 1], symptoms[row:row + 1])
+        latencies.append((time.perf_counter() - call_started) * 1000.0)
+    latencies.sort()
+
+    result = {
+        'rows': len(dataset),
+        'encode_seconds': round(encode_seconds, 4),
+        'load_seconds': round(load_seconds, 4),
+        'seconds': round(elapsed, 4),
+        'rows_per_second': round(len(dataset) / elapsed, 1) if elapsed else None,
+        'latency_ms': {
+            'rows': len(latencies),
+            'p50': round(percentile(latencies, 50), 4),
+            'p95': round(percentile(latencies, 95), 4),
+            'p99': round(percentile(latencies, 99), 4),
+            'max': round(latencies[-1], 4) if latencies else 0.0
+        },
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                             / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+    }
+    if dataset.labels is not None:
+        result['accuracy'] = multilabel_metrics(predicted, dataset.labels, label_names)
+    return result
+
+
+def _run_isolated(args):
+    name, csv_path, batch_size, latency_rows = args
+    try:
+        return name, evaluate_engine(name, csv_path, batch_size, latency_rows)
+    except Exception as e:
+        return name, {'error': f'{type(e).__name__}: {e}'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate accuracy and speed of every engine')
+    parser.add_argument('--csv', default='medicines.csv',
+                        help='Symptoms CSV or columnar_dataset.py directory')
+    parser.add_argument('--engines', nargs='+', default=ENGINES, choices=ENGINES)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--latency-rows', type=int, default=1000,
+                        help='Rows timed one at a time for latency percentiles')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args()
+
+    csv_path = os.path.abspath(os.path.join(ROOT, args.csv)) if not os.path.isabs(args.csv) else args.csv
+
+    results = {
+        'dataset': os.path.relpath(csv_path, ROOT),
+        'batch_size': args.batch_size,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'engines': {}
+    }
+
+    # A fresh process per engine keeps peak memory attributable
+    context = multiprocessing.get_context('spawn')
+    for name in args.engines:
+        with context.Pool(1) as pool:
+            engine, result = pool.map(
+                _run_isolated, [(name, csv_path, args.batch_size, args.latency_rows)]
+            )[0]
+        results['engines'][engine] = result
+
+        if 'error' in result:
+            print(f"{engine:<14}skipped ({result['error']})", file=sys.stderr)
+        else:
+            accuracy = result.get('accuracy', {})
+            print(f"{engine:<14}{result['rows_per_second']:>12} rows/s  "
+                  f"p99 {result['latency_ms']['p99']:>8} ms  "
+                  f"rss {result['peak_rss_mb']:>7} MB  "
+                  f"P {accuracy.get('micro_precision', '-')}  R {accuracy.get('micro_recall', '-')}",
+                  file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf8') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark for drug-interaction checks
+
+Builds synthetic formularies (random interaction pairs) and times regimen
+checks with the old pairwise loop (every pair sorted into a tuple and looked
+up in a dict) against InteractionGraph. Both must report the same pairs.
+
+Usage:
+    python benchmarks/interactions.py --drugs 1000 10000 --regimen 50
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from interactions import InteractionGraph  # noqa: E402
+
+
+def synthetic_formulary(drugs, degree, seed=0):
+    """Interaction records giving each drug about `degree` neighbours"""
+    rng = random.Random(seed)
+    names = [f"drug{i:05d}" for i in range(drugs)]
+    pairs = set()
+    while len(pairs) < drugs * degree // 2:
+        first, second = rng.sample(range(drugs), 2)
+        pairs.add((min(first, second), max(first, second)))
+    records = [
+        {'drugs': [names[a], names[b]], 'severity': rng.choice(['low', 'mild', 'moderate', 'severe']),
+         'warning': f"{names[a]} interacts with {names[b]}", 'recommendation': 'Consult doctor'}
+        for a, b in sorted(pairs)
+    ]
+    return names, records
+
+
+def pairwise_check(table, medicines):
+    """The original check_interactions loop"""
+    interactions = []
+    for i in range(len(medicines)):
+        for j in range(i + 1, len(medicines)):
+            pair = tuple(sorted([medicines[i], medicines[j]]))
+            if pair in table:
+                interaction = table[pair].copy()
+                interaction['medicines'] = [medicines[i], medicines[j]]
+                interactions.append(interaction)
+    return interactions
+
+
+def time_checks(check, regimens, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for regimen in regimens:
+            check(regimen)
+    return (time.perf_counter() - start) / (repeat * len(regimens)) * 1e6
+
+
+def run(drugs, degree, regimen_size, regimens, repeat):
+    names, records = synthetic_formulary(drugs, degree)
+    table = {tuple(sorted(r['drugs'])): {k: v for k, v in r.items() if k != 'drugs'} for r in records}
+
+    start = time.perf_counter()
+    graph = InteractionGraph.from_records(records, names)
+    build_ms = (time.perf_counter() - start) * 1000.0
+
+    rng = random.Random(1)
+    samples = [rng.sample(names, regimen_size) for _ in range(regimens)]
+    for regimen in samples:
+        expected = sorted(tuple(i['medicines']) for i in pairwise_check(table, regimen))
+        actual = sorted(tuple(i['medicines']) for i in graph.check(regimen))
+        if expected != actual:
+            raise AssertionError(f"Graph and pairwise checks disagree for {regimen}")
+
+    pairwise_us = time_checks(lambda r: pairwise_check(table, r), samples, repeat)
+    graph_us = time_checks(graph.check, samples, repeat)
+    return {
+        'drugs': drugs,
+        'interactions': len(records),
+        'regimen': regimen_size,
+        'build_ms': round(build_ms, 1),
+        'pairwise_us': round(pairwise_us, 1),
+        'graph_us': round(graph_us, 1),
+        'speedup': round(pairwise_us / graph_us, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pairwise vs graph interaction checks')
+    parser.add_argument('--drugs', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--degree', type=int, default=20, help='Average interactions per drug')
+    parser.add_argument('--regimen', type=int, default=50, help='Drugs per patient regimen')
+    parser.add_argument('--regimens', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON only')
+    args = parser.parse_args()
+
+    results = [run(drugs, args.degree, args.regimen, args.regimens, args.repeat) for drugs in args.drugs]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'drugs':>8}{'pairs':>10}{'regimen':>9}{'build ms':>10}{'pairwise us':>13}{'graph us':>10}{'speedup':>9}")
+    for r in results:
+        print(f"{r['drugs']:>8}{r['interactions']:>10}{r['regimen']:>9}{r['build_ms']:>10}"
+              f"{r['pairwise_us']:>13}{r['graph_us']:>10}{r['speedup']:>8}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+"""
+Benchmark for loading the knowledge base
+
+Writes a synthetic formulary (medicines, interactions, allergen classes,
+severity keywords and symptom terms, plus a manifest) to a temporary
+directory, then loads it the way the gunicorn master does and reports
+per-component build time and the peak RSS it added.
+
+With --fork, the knowledge base is frozen (gc.freeze(), as in
+gunicorn.conf.py) and a forked child runs lookups against it; the child's
+private memory shows how much of the snapshot was copied instead of shared.
+
+Usage:
+    python benchmarks/knowledge_base.py --drugs 10000 --fork
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import string
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from knowledge_base import MANIFEST_FILE, load_knowledge_base, max_rss_mb  # noqa: E402
+
+
+def synthetic_name(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12)))
+
+
+def write_formulary(directory, drugs, degree, symptoms, keywords, seed=0):
+    """Write every data file and the manifest for a formulary of `drugs` medicines"""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < drugs:
+        names.add(synthetic_name(rng))
+    names = sorted(names)
+    categories = [f'{synthetic_name(rng).title()} agent' for _ in range(200)]
+    words = sorted({synthetic_name(rng) for _ in range(4000)})
+
+    medicines = {name: {
+        'name': name.title(),
+        'category': rng.choice(categories),
+        'usage': f'Used to treat {" and ".join(rng.sample(words, 2))}',
+        'dosage': f'Adults: {rng.choice([50, 100, 250, 500])}mg every {rng.choice([4, 6, 8, 12])} hours',
+        'precautions': [f'Avoid with {rng.choice(words)}' for _ in range(rng.randint(2, 4))],
+        'side_effects': [rng.choice(words).title() for _ in range(rng.randint(2, 5))]
+    } for name in names}
+
+    pairs = set()
+    while len(pairs) < drugs * degree // 2:
+        first, second = rng.sample(names, 2)
+        pairs.add(frozenset((first, second)))
+    interactions = [{
+        'drugs': sorted(pair),
+        'severity': rng.choice(['mild', 'moderate', 'severe']),
+        'warning': f'May increase {rng.choice(words)} risk.',
+        'recommendation': 'Consult doctor before combining these medications'
+    } for pair in pairs]
+
+    classes = {}
+    for i in range(drugs // 50):
+        members = rng.sample(names, rng.randint(3, 15))
+        classes[f'{synthetic_name(rng)} class {i}'] = {'aliases': [synthetic_name(rng)], 'members': members}
+    allergens = {name: [rng.choice(words) for _ in range(rng.randint(0, 2))] for name in names}
+
+    phrases = sorted({' '.join(rng.choices(words, k=rng.randint(1, 3))) for _ in range(keywords)})
+    tiers = {tier: phrases[i::3] for i, tier in enumerate(['severe', 'moderate', 'mild'])}
+
+    terms = {}
+    while len(terms) < symptoms:
+        term = ' '.join(rng.choices(words, k=rng.choice([1, 2, 2, 3])))
+        terms[term] = {'term': term, 'popularity': round(rng.paretovariate(1.2), 3),
+                       'synonyms': [' '.join(rng.choices(words, k=2)) for _ in range(rng.choice([0, 0, 1]))]}
+
+    files = {
+        'medicines': ('medicines.json', {'version': 1, 'medicines': medicines}),
+        'interactions': ('drug_interactions.json', {'version': 1, 'drugs': names, 'interactions': interactions}),
+        'severity': ('severity_indicators.json', {'version': 1, 'tiers': tiers}),
+        'allergens': ('allergens.json', {'version': 1, 'medicines': allergens, 'classes': classes}),
+        'symptoms': ('symptom_terms.json', {'version': 1, 'terms': list(terms.values()),
+                                            'featured': list(terms)[:20]})
+    }
+    for filename, data in files.values():
+        with open(os.path.join(directory, filename), 'w', encoding='utf8') as f:
+            json.dump(data, f)
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf8') as f:
+        json.dump({'version': 'benchmark', 'files': {kind: filename for kind, (filename, _) in files.items()}}, f)
+
+    return {
+        'medicines': drugs,
+        'interactions': len(interactions),
+        'severity_keywords': len(phrases),
+        'symptom_terms': len(terms),
+        'bytes': sum(os.path.getsize(os.path.join(directory, filename)) for filename, _ in files.values())
+    }
+
+
+def private_dirty_mb():
+    """Memory this process has written to and no longer shares (Linux only)"""
+    try:
+        with open('/proc/self/smaps_rollup', 'r') as f:
+            for line in f:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def forked_lookups(knowledge_base, lookups):
+    """Private memory a forked child dirties while serving lookups, in MB"""
+    reader, writer = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(reader)
+        before = private_dirty_mb()
+        names = list(knowledge_base.medicines)
+        rng = random.Random(2)
+        for _ in range(lookups):
+            regimen = rng.sample(names, 10)
+            knowledge_base.interactions.check(regimen)
+            knowledge_base.allergens.screen(regimen, [rng.choice(names)])
+            knowledge_base.medicine(regimen[0])
+            knowledge_base.autocomplete.suggest(regimen[0][:3])
+        after = private_dirty_mb()
+        os.write(writer, json.dumps([before, after]).encode())
+        os._exit(0)
+
+    os.close(writer)
+    with os.fdopen(reader, 'r') as f:
+        before, after = json.loads(f.read() or '[null, null]')
+    os.waitpid(pid, 0)
+    if before is None or after is None:
+        return None
+    return round(after - before, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark knowledge base load time and memory')
+    parser.add_argument('--drugs', type=int, default=10000)
+    parser.add_argument('--degree', type=int, default=20, help='Average interactions per drug')
+    parser.add_argument('--symptoms', type=int, default=20000)
+    parser.add_argument('--keywords', type=int, default=2000)
+    parser.add_argument('--fork', action='store_true', help='Measure memory copied by a forked worker')
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON only')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        formulary = write_formulary(directory, args.drugs, args.degree, args.symptoms, args.keywords)
+        rss_before = max_rss_mb()
+        knowledge_base = load_knowledge_base(directory)
+        results = {
+            'formulary': formulary,
+            'timings': dict(knowledge_base.timings),
+            'rss_mb': round(max_rss_mb() - rss_before, 1)
+        }
+
+    if args.fork and hasattr(os, 'fork'):
+        gc.collect()
+        gc.freeze()
+        results['child_private_mb'] = forked_lookups(knowledge_base, args.lookups)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"[INFO] {results['formulary']}")
+    for name, seconds in results['timings'].items():
+        print(f"{name:<24}{seconds:>10.3f}s")
+    print(f"peak RSS added          {results['rss_mb']:>10} MB")
+    if 'child_private_mb' in results:
+        print(f"worker private memory   {results['child_private_mb']:>10} MB after {args.lookups} lookups")
+
+
+if __name__ == '__main__':
+    main()
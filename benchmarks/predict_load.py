@@ -0,0 +1,131 @@
+"""
+Load benchmark for /predict inference
+
+Drives the model from many concurrent client threads and compares the
+per-request path (one forward pass per request) with the micro-batching
+path, for each inference engine. keras/per_request is the original
+/predict path (one Keras model.predict per request) and the baseline the
+other rows are compared with. Reports throughput and latency percentiles.
+
+Usage:
+    python benchmarks/predict_load.py --requests 2000 --concurrency 32
+    python benchmarks/predict_load.py --engines numpy      # without TensorFlow
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from batching import PredictionBatcher  # noqa: E402
+from config import Config  # noqa: E402
+from model_registry import load_artifacts  # noqa: E402
+
+
+def load_engine(engine):
+    """Artifacts from the project root, loaded with a specific inference engine"""
+    config = type('BenchmarkConfig', (Config,), {'INFERENCE_ENGINE': engine})
+    return load_artifacts(config)
+
+
+def load_inputs(vocabulary, count):
+    """Padded sequences for the first `count` symptom strings in medicines.csv"""
+    with open('medicines.csv', newline='') as f:
+        symptoms = [row['Symptoms'].lower().strip() for row in csv.DictReader(f)]
+    symptoms = (symptoms * (count // len(symptoms) + 1))[:count]
+    return vocabulary.encode(symptoms)
+
+
+def run_load(predict_one, inputs, concurrency):
+    """Send every input through predict_one from `concurrency` threads"""
+    latencies = np.empty(len(inputs))
+
+    def call(i):
+        start = time.perf_counter()
+        predict_one(inputs[i:i + 1])
+        latencies[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(len(inputs))))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = latencies * 1000.0
+    return {
+        'requests': len(inputs),
+        'concurrency': concurrency,
+        'seconds': round(elapsed, 3),
+        'throughput_rps': round(len(inputs) / elapsed, 1),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 3),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark per-request vs micro-batched inference')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--engines', nargs='+', choices=['keras', 'numpy'], default=['keras', 'numpy'])
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON only')
+    args = parser.parse_args()
+
+    results = {}
+    for engine in args.engines:
+        try:
+            artifacts = load_engine(engine)
+        except Exception as e:
+            print(f"[WARNING] Skipping {engine} engine: {e}")
+            continue
+        inputs = load_inputs(artifacts.vocabulary, args.requests)
+
+        # Warm up graph tracing so neither path pays it inside the measurement
+        artifacts.run_model(inputs[:1])
+        artifacts.run_model(inputs[:args.max_batch_size])
+
+        results[f'{engine}/per_request'] = run_load(artifacts.run_model, inputs, args.concurrency)
+
+        batcher = PredictionBatcher(
+            artifacts.run_model,
+            max_batch_size=args.max_batch_size,
+            max_wait_ms=args.max_wait_ms
+        )
+        results[f'{engine}/batched'] = run_load(batcher.submit, inputs, args.concurrency)
+        results[f'{engine}/batched'].update(batcher.stats())
+        batcher.stop()
+
+    if not results:
+        sys.exit('No inference engine could be loaded; cannot benchmark.')
+
+    baseline = results.get('keras/per_request')
+    for r in results.values():
+        r['speedup_vs_keras_per_request'] = (
+            round(r['throughput_rps'] / baseline['throughput_rps'], 2) if baseline else None)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'path':<22}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'speedup':>10}")
+    for name, r in results.items():
+        speedup = r['speedup_vs_keras_per_request']
+        print(f"{name:<22}{r['throughput_rps']:>10}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{(str(speedup) + 'x') if speedup else 'n/a':>10}")
+    for name, r in results.items():
+        if 'avg_batch_size' in r:
+            print(f"{name} average batch size: {r['avg_batch_size']:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark for severity keyword matching
+
+Times the old scan (`keyword in text` for every keyword) against
+SeverityMatcher over synthetic keyword lists and free-text notes of growing
+size. The matcher's time should grow with the text length only; the scan's
+grows with text length times keyword count.
+
+Usage:
+    python benchmarks/severity.py --keywords 20 1000 10000 --lengths 1000 10000 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from severity import SeverityMatcher  # noqa: E402
+
+
+def synthetic_words(count, seed=0):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))))
+    return sorted(words)
+
+
+def synthetic_indicators(words, keywords, seed=0):
+    """{tier: keywords} with one- to three-word phrases spread over three tiers"""
+    rng = random.Random(seed)
+    phrases = set()
+    while len(phrases) < keywords:
+        phrases.add(' '.join(rng.choices(words, k=rng.randint(1, 3))))
+    phrases = sorted(phrases)
+    return {tier: phrases[i::3] for i, tier in enumerate(['severe', 'moderate', 'mild'])}
+
+
+def synthetic_text(words, length, seed=1):
+    rng = random.Random(seed)
+    parts, size = [], 0
+    while size < length:
+        word = rng.choice(words) + rng.choice([' ', ' ', ' ', ', ', '. '])
+        parts.append(word)
+        size += len(word)
+    return ''.join(parts)[:length]
+
+
+def substring_scan(indicators, symptoms):
+    """The original assess_severity loop"""
+    severity_score = {tier: 0 for tier in indicators}
+    for severity, keywords in indicators.items():
+        for keyword in keywords:
+            if keyword in symptoms:
+                severity_score[severity] += 1
+    return severity_score
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark substring scan vs Aho-Corasick severity matching')
+    parser.add_argument('--keywords', type=int, nargs='+', default=[20, 1000, 10000])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--vocabulary', type=int, default=3000, help='Distinct words in keywords and text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='Print machine-readable JSON only')
+    args = parser.parse_args()
+
+    words = synthetic_words(args.vocabulary)
+    results = []
+    for keywords in args.keywords:
+        indicators = synthetic_indicators(words, keywords)
+        start = time.perf_counter()
+        matcher = SeverityMatcher(indicators)
+        build_ms = (time.perf_counter() - start) * 1000.0
+        for length in args.lengths:
+            text = synthetic_text(words, length)
+            results.append({
+                'keywords': keywords,
+                'text_chars': length,
+                'build_ms': round(build_ms, 1),
+                'scan_ms': round(best_of(lambda: substring_scan(indicators, text), args.repeat), 3),
+                'matcher_ms': round(best_of(lambda: matcher.score(text), args.repeat), 3),
+                'matches': sum(matcher.score(text).values())
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'keywords':>9}{'chars':>9}{'build ms':>10}{'scan ms':>10}{'matcher ms':>12}{'us/char':>9}{'matches':>9}")
+    for r in results:
+        print(f"{r['keywords']:>9}{r['text_chars']:>9}{r['build_ms']:>10}{r['scan_ms']:>10}"
+              f"{r['matcher_ms']:>12}{r['matcher_ms'] * 1000 / r['text_chars']:>9.3f}{r['matches']:>9}")
+
+
+if __name__ == '__main__':
+    main()
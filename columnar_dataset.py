@@ -0,0 +1,256 @@
+"""
+Columnar, memory-mapped symptom datasets
+
+Converts a symptoms CSV (Symptoms plus an optional comma-joined Medicines
+column) once into fixed-width NumPy arrays:
+
+    medicines.columnar/
+        tokens.npy      # int32 (rows, maxlen) padded token ids
+        symptoms.npy    # int32 (rows,) rules.py symptom bitmasks
+        labels.npy      # uint8 (rows, medicines) multi-hot, if Medicines exists
+        meta.json       # written last; marks the conversion complete
+
+Opening a converted dataset memory-maps the arrays, so load time does not
+grow with the row count and batches are slices rather than Python objects.
+The CSV is read in chunks and each distinct symptom / medicine string is
+parsed once, so conversion runs in bounded memory.
+
+Usage:
+    python columnar_dataset.py convert medicines.csv      # -> medicines.columnar/
+    python columnar_dataset.py check medicines.columnar   # compare with the CSV
+"""
+
+import argparse
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from answer_table import vocabulary_fingerprint
+from rules import text_mask
+from vocabulary import load_vocabulary
+
+META_FILE = 'meta.json'
+COLUMNS = {'tokens': np.int32, 'symptoms': np.int32, 'labels': np.uint8}
+
+
+def load_label_names(path='medicine_labels.pkl'):
+    """Medicine names in model output order"""
+    with open(path, 'rb') as f:
+        return [str(name).lower() for name in pickle.load(f)]
+
+
+def default_output(csv_path):
+    return os.path.splitext(csv_path)[0] + '.columnar'
+
+
+def encode_frame(frame, vocabulary, label_names, symptoms_column='Symptoms',
+                 medicines_column='Medicines'):
+    """Column arrays for one chunk of a symptoms CSV"""
+    texts = frame[symptoms_column].fillna('').astype(str).str.lower().str.strip()
+
+    # Repeated strings are tokenized once and broadcast back with take()
+    codes, uniques = pd.factorize(texts)
+    uniques = list(uniques)
+    arrays = {
+        'tokens': vocabulary.encode(uniques)[codes],
+        'symptoms': np.array([text_mask(text) for text in uniques], dtype=np.int32)[codes]
+    }
+
+    if medicines_column in frame.columns:
+        index = {name: i for i, name in enumerate(label_names)}
+        codes, uniques = pd.factorize(frame[medicines_column].fillna('').astype(str))
+        multi_hot = np.zeros((len(uniques), len(label_names)), dtype=np.uint8)
+        for row, value in enumerate(uniques):
+            for name in value.split(','):
+                name = name.strip().lower()
+                if not name:
+                    continue
+                if name not in index:
+                    raise ValueError(f"Unknown medicine in {medicines_column}: {name}")
+                multi_hot[row, index[name]] = 1
+        arrays['labels'] = multi_hot[codes]
+    return arrays
+
+
+def _write_npy(raw_path, npy_path, dtype, shape):
+    """Prepend an .npy header to raw row-major data"""
+    with open(npy_path, 'wb') as out:
+        np.lib.format.write_array_header_1_0(out, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+            'fortran_order': False,
+            'shape': shape
+        })
+        with open(raw_path, 'rb') as raw:
+            shutil.copyfileobj(raw, out, 1 << 20)
+    os.remove(raw_path)
+
+
+def convert(csv_path, out_dir=None, vocabulary=None, label_names=None, chunksize=100000):
+    """Stream csv_path into a columnar dataset directory"""
+    out_dir = out_dir or default_output(csv_path)
+    vocabulary = vocabulary or load_vocabulary()
+    label_names = label_names or load_label_names()
+    os.makedirs(out_dir, exist_ok=True)
+
+    # An old meta.json must not vouch for half-written arrays
+    meta_path = os.path.join(out_dir, META_FILE)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+
+    started = time.perf_counter()
+    raw_files = {}
+    widths = {}
+    rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            for name, array in encode_frame(chunk, vocabulary, label_names).items():
+                if name not in raw_files:
+                    raw_files[name] = open(os.path.join(out_dir, name + '.bin'), 'wb')
+                    widths[name] = array.shape[1:]
+                array.astype(COLUMNS[name], copy=False).tofile(raw_files[name])
+            rows += len(chunk)
+    finally:
+        for f in raw_files.values():
+            f.close()
+
+    for name in raw_files:
+        _write_npy(os.path.join(out_dir, name + '.bin'), os.path.join(out_dir, name + '.npy'),
+                   COLUMNS[name], (rows,) + widths[name])
+    stale_labels = os.path.join(out_dir, 'labels.npy')
+    if 'labels' not in raw_files and os.path.exists(stale_labels):
+        os.remove(stale_labels)
+
+    meta = {
+        'rows': rows,
+        'maxlen': vocabulary.maxlen,
+        'columns': sorted(raw_files),
+        'label_names': label_names if 'labels' in raw_files else None,
+        'source': os.path.basename(csv_path),
+        'vocabulary_sha256': vocabulary_fingerprint(vocabulary)
+    }
+    with open(meta_path, 'w', encoding='utf8') as f:
+        json.dump(meta, f, indent=2)
+
+    print(f"[SUCCESS] Converted {rows} rows in {time.perf_counter() - started:.1f}s -> {out_dir}")
+    return out_dir
+
+
+class ColumnarDataset:
+    """Token ids, symptom bitmasks and (optionally) multi-hot labels as arrays"""
+
+    def __init__(self, tokens, symptoms, labels=None, label_names=None, meta=None):
+        self.tokens = tokens
+        self.symptoms = symptoms
+        self.labels = labels
+        self.label_names = label_names
+        self.meta = meta or {}
+
+    @classmethod
+    def open(cls, path, vocabulary=None):
+        """Memory-map a converted dataset
+
+        Raises ValueError if it was tokenized with a different vocabulary
+        than the one given, since its token ids would be meaningless.
+        """
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf8') as f:
+            meta = json.load(f)
+        if vocabulary is not None and meta['vocabulary_sha256'] != vocabulary_fingerprint(vocabulary):
+            raise ValueError(f"{path} was tokenized with a different vocabulary; convert it again")
+
+        arrays = {
+            name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+            for name in meta['columns']
+        }
+        for name, array in arrays.items():
+            if len(array) != meta['rows']:
+                raise ValueError(f"{path}/{name}.npy has {len(array)} rows, expected {meta['rows']}")
+        return cls(arrays['tokens'], arrays['symptoms'], arrays.get('labels'),
+                   meta['label_names'], meta)
+
+    @classmethod
+    def from_csv(cls, csv_path, vocabulary=None, label_names=None):
+        """Encode a CSV in memory (for small files that were never converted)"""
+        vocabulary = vocabulary or load_vocabulary()
+        label_names = label_names or load_label_names()
+        arrays = encode_frame(pd.read_csv(csv_path), vocabulary, label_names)
+        labels = arrays.get('labels')
+        return cls(arrays['tokens'], arrays['symptoms'], labels,
+                   label_names if labels is not None else None,
+                   {'rows': len(arrays['tokens']), 'source': os.path.basename(csv_path)})
+
+    @classmethod
+    def load(cls, path, vocabulary=None, label_names=None):
+        """Open a converted directory, or encode a CSV in memory"""
+        if os.path.isdir(path):
+            return cls.open(path, vocabulary)
+        return cls.from_csv(path, vocabulary, label_names)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def take(self, indices):
+        """In-memory copy of the given rows"""
+        indices = np.asarray(indices)
+        return ColumnarDataset(
+            np.asarray(self.tokens[indices]),
+            np.asarray(self.symptoms[indices]),
+            np.asarray(self.labels[indices]) if self.labels is not None else None,
+            self.label_names,
+            dict(self.meta, rows=len(indices))
+        )
+
+    def split(self, holdout_fraction, seed=0):
+        """(train, holdout) row subsets, shuffled with a fixed seed"""
+        order = np.random.default_rng(seed).permutation(len(self))
+        holdout = int(round(len(self) * holdout_fraction))
+        return self.take(np.sort(order[holdout:])), self.take(np.sort(order[:holdout]))
+
+    def batches(self, batch_size):
+        """(tokens, labels) slices in row order; labels is None when unlabeled"""
+        for start in range(0, len(self), batch_size):
+            stop = start + batch_size
+            labels = self.labels[start:stop] if self.labels is not None else None
+            yield self.tokens[start:stop], labels
+
+
+def check(path, csv_path=None):
+    """Compare a converted dataset with a fresh in-memory encoding of its CSV"""
+    vocabulary = load_vocabulary()
+    dataset = ColumnarDataset.open(path, vocabulary)
+    csv_path = csv_path or os.path.join(os.path.dirname(os.path.abspath(path)), dataset.meta['source'])
+    expected = ColumnarDataset.from_csv(csv_path, vocabulary, dataset.label_names)
+
+    ok = len(dataset) == len(expected)
+    for name in dataset.meta['columns']:
+        same = ok and np.array_equal(getattr(dataset, name), getattr(expected, name))
+        print(f"{name:<10}{'ok' if same else 'MISMATCH'}")
+        ok = ok and same
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert symptom CSVs to memory-mapped arrays')
+    parser.add_argument('command', choices=['convert', 'check'])
+    parser.add_argument('path', help='CSV to convert, or converted directory to check')
+    parser.add_argument('--output', help='Output directory (default: <csv>.columnar)')
+    parser.add_argument('--csv', help='Source CSV for check (default: from meta.json)')
+    parser.add_argument('--chunksize', type=int, default=100000)
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args.path, args.output, chunksize=args.chunksize)
+    elif not check(args.path, args.csv):
+        print("[ERROR] Columnar dataset does not match its CSV")
+        sys.exit(1)
+    else:
+        print("[SUCCESS] Columnar dataset matches its CSV")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,25 @@
 import os
+import json
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
+def parse_thresholds(value):
+    """{medicine: threshold} from JSON; a malformed value is reported and ignored"""
+    try:
+        thresholds = json.loads(value)
+        if not isinstance(thresholds, dict):
+            raise ValueError('expected a JSON object of {medicine: threshold}')
+        thresholds = {str(name): float(threshold) for name, threshold in thresholds.items()}
+    except (TypeError, ValueError) as e:
+        print(f"[ERROR] Ignoring MEDICINE_THRESHOLDS ({e}); using PREDICTION_THRESHOLD for every medicine")
+        return {}
+    invalid = sorted(name for name, threshold in thresholds.items() if not 0.0 <= threshold <= 1.0)
+    if invalid:
+        print(f"[WARNING] Ignoring MEDICINE_THRESHOLDS outside 0-1 for: {', '.join(invalid)}")
+    return {name: threshold for name, threshold in thresholds.items() if name not in invalid}
+
 class Config:
     """Application configuration"""
     
@@ -15,6 +31,30 @@ class Config:
     MONGODB_URI = os.getenv('MONGODB_URI')
     MONGODB_DB_NAME = os.getenv('MONGODB_DB_NAME', 'mediflex')
     
+    # Connection pool per worker process (0 = pymongo default for the idle
+    # and wait-queue timeouts: keep idle connections, wait indefinitely)
+    MONGODB_MAX_POOL_SIZE = int(os.getenv('MONGODB_MAX_POOL_SIZE', 100))
+    MONGODB_MIN_POOL_SIZE = int(os.getenv('MONGODB_MIN_POOL_SIZE', 0))
+    MONGODB_MAX_IDLE_TIME_MS = int(os.getenv('MONGODB_MAX_IDLE_TIME_MS', 0))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv('MONGODB_WAIT_QUEUE_TIMEOUT_MS', 0))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000))
+    MONGODB_CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000))
+    
+    # Background reconnect backoff in seconds after a failed first connection
+    MONGODB_RECONNECT_MIN_DELAY = float(os.getenv('MONGODB_RECONNECT_MIN_DELAY', 1))
+    MONGODB_RECONNECT_MAX_DELAY = float(os.getenv('MONGODB_RECONNECT_MAX_DELAY', 60))
+    
+    # Create the indexes declared in indexes.py when connecting
+    ENSURE_INDEXES = os.getenv('ENSURE_INDEXES', 'True').lower() == 'true'
+    
+    # Cross-request user document cache in seconds (0 disables; per process,
+    # so other workers' writes show up only after the TTL)
+    USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', 0))
+    USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 1024))
+    
+    # Report MongoDB commands per request in an X-DB-Round-Trips header
+    DB_ROUND_TRIP_HEADER = os.getenv('DB_ROUND_TRIP_HEADER', 'False').lower() == 'true'
+    
     # Mail Configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
@@ -37,3 +77,76 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     PERMANENT_SESSION_LIFETIME = 86400  # 24 hours
+    
+    # Model loading: preload in the gunicorn master when fork-safe, warm up after load
+    MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'True').lower() == 'true'
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP', 'True').lower() == 'true'
+    
+    # Versioned models: one directory per version, polled for hot reload (0 disables)
+    MODEL_VERSIONS_DIR = os.getenv('MODEL_VERSIONS_DIR', 'model_versions')
+    MODEL_WATCH_INTERVAL = float(os.getenv('MODEL_WATCH_INTERVAL', 10))
+    
+    # Token required by /admin endpoints (admin endpoints are disabled when unset)
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    
+    # Inference engine: 'keras', 'numpy', or 'auto' (numpy when exported weights exist)
+    INFERENCE_ENGINE = os.getenv('INFERENCE_ENGINE', 'auto').lower()
+    NUMPY_WEIGHTS_PATH = os.getenv('NUMPY_WEIGHTS_PATH', 'medicine_model.npz')
+    VOCABULARY_PATH = os.getenv('VOCABULARY_PATH', 'vocabulary.json')
+    
+    # Medical knowledge base: directory with manifest.json and the data files it
+    # lists (see knowledge_base.py), re-read when the manifest changes (0 disables)
+    KNOWLEDGE_BASE_DIR = os.getenv('KNOWLEDGE_BASE_DIR', 'data')
+    KNOWLEDGE_BASE_WATCH_INTERVAL = float(os.getenv('KNOWLEDGE_BASE_WATCH_INTERVAL', 10))
+    
+    # Serve rule-based recommendations (rules.py) when the model cannot be loaded
+    RULES_FALLBACK = os.getenv('RULES_FALLBACK', 'True').lower() == 'true'
+    
+    # Precomputed answer table (built with `python answer_table.py build`)
+    ANSWER_TABLE_PATH = os.getenv('ANSWER_TABLE_PATH', 'answer_table.npy')
+    
+    # Post-processing: default threshold, per-medicine overrides (JSON), top-k cap (0 = none)
+    PREDICTION_THRESHOLD = float(os.getenv('PREDICTION_THRESHOLD', 0.5))
+    MEDICINE_THRESHOLDS = parse_thresholds(os.getenv('MEDICINE_THRESHOLDS', '{}'))
+    PREDICTION_TOP_K = int(os.getenv('PREDICTION_TOP_K', 0))
+    
+    # Consultations per history page (default and largest allowed)
+    HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 20))
+    HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 100))
+    
+    # Bulk prediction endpoint
+    BULK_PREDICT_MAX_ROWS = int(os.getenv('BULK_PREDICT_MAX_ROWS', 100000))
+    BULK_PREDICT_CHUNK_SIZE = int(os.getenv('BULK_PREDICT_CHUNK_SIZE', 2048))
+    
+    # Consultation write-behind queue (full policy: 'sync', 'block' or 'drop')
+    WRITE_BEHIND = os.getenv('WRITE_BEHIND', 'True').lower() == 'true'
+    WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', 10000))
+    WRITE_BEHIND_FLUSH_SIZE = int(os.getenv('WRITE_BEHIND_FLUSH_SIZE', 500))
+    WRITE_BEHIND_FLUSH_INTERVAL_MS = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL_MS', 200))
+    WRITE_BEHIND_FULL_POLICY = os.getenv('WRITE_BEHIND_FULL_POLICY', 'sync').lower()
+    WRITE_BEHIND_DRAIN_TIMEOUT = float(os.getenv('WRITE_BEHIND_DRAIN_TIMEOUT', 10))
+    # Batches that still fail after retries are kept here and replayed later
+    WRITE_BEHIND_SPILL_PATH = os.getenv('WRITE_BEHIND_SPILL_PATH', 'write_behind_spill.jsonl')
+    
+    # Prediction cache (keyed on padded token sequences)
+    PREDICTION_CACHE = os.getenv('PREDICTION_CACHE', 'True').lower() == 'true'
+    PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', 4096))
+    PREDICTION_CACHE_TTL = int(os.getenv('PREDICTION_CACHE_TTL', 3600))
+    PREDICTION_CACHE_ORDER_INSENSITIVE = os.getenv('PREDICTION_CACHE_ORDER_INSENSITIVE', 'False').lower() == 'true'
+    
+    # Prediction micro-batching
+    PREDICT_BATCHING = os.getenv('PREDICT_BATCHING', 'True').lower() == 'true'
+    PREDICT_BATCH_MAX_SIZE = int(os.getenv('PREDICT_BATCH_MAX_SIZE', 64))
+    PREDICT_BATCH_MAX_WAIT_MS = float(os.getenv('PREDICT_BATCH_MAX_WAIT_MS', 2))
+    
+    # Incremental retraining (python retrain.py)
+    RETRAIN_EPOCHS = int(os.getenv('RETRAIN_EPOCHS', 3))
+    RETRAIN_BATCH_SIZE = int(os.getenv('RETRAIN_BATCH_SIZE', 256))
+    RETRAIN_LEARNING_RATE = float(os.getenv('RETRAIN_LEARNING_RATE', 1e-4))
+    RETRAIN_MIN_CONSULTATIONS = int(os.getenv('RETRAIN_MIN_CONSULTATIONS', 100))
+    RETRAIN_REPLAY_ROWS = int(os.getenv('RETRAIN_REPLAY_ROWS', 5000))
+    RETRAIN_HOLDOUT_DATASET = os.getenv('RETRAIN_HOLDOUT_DATASET', 'medicines.csv')
+    RETRAIN_HOLDOUT_FRACTION = float(os.getenv('RETRAIN_HOLDOUT_FRACTION', 0.2))
+    RETRAIN_MAX_REGRESSION = float(os.getenv('RETRAIN_MAX_REGRESSION', 0.0))
+    # Consultations newer than this are left for the next run (still being written)
+    RETRAIN_SETTLE_SECONDS = float(os.getenv('RETRAIN_SETTLE_SECONDS', 60))
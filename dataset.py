@@ -1,69 +1,116 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import numpy as np
 import pandas as pd
 
-# Define symptoms and medicine mapping
-symptoms_list = [
-    "fever", "headache", "body pain", "cold", "allergy", "sneezing", "runny nose",
-    "cough", "sore throat", "bacterial infection", "inflammation", "swelling", "stomach pain", "acidity"
-]
+from rules import SYMPTOMS, rule_set, symptom_mask
 
-medicine_mapping = {
-    "Paracetamol": ["fever"],
-    "Cetirizine": ["cold", "allergy", "sneezing", "runny nose"],
-    "Azithromycin": ["cough", "sore throat", "bacterial infection"],
-    "Diclofenac": ["body pain", "inflammation", "swelling"],
-    "Aciloc": ["stomach pain", "acidity"]
-}
+# Symptoms and medicine rules are defined once, in rules.py
+symptoms_list = SYMPTOMS
 
-# Load dataset
-df = pd.read_csv("medicines - modified.csv")
 
 def recommend_medicine(symptoms):
-    symptoms = symptoms.split(", ")
-    recommended = set()
-    
-    # Fever-related conditions
-    if "fever" in symptoms:
-        if "body pain" in symptoms and len(symptoms) == 2:
-            recommended.add("Paracetamol")
-        elif "headache" in symptoms and len(symptoms) == 2:
-            recommended.add("Paracetamol")
-        elif "inflammation" in symptoms or "swelling" in symptoms:
-            recommended.add("Paracetamol")
-            recommended.add("Diclofenac")
-        else:
-            recommended.add("Paracetamol")
-    
-    # Pain conditions (when fever is absent)
-    if "fever" not in symptoms:
-        if "body pain" in symptoms or "headache" in symptoms or "inflammation" in symptoms or "swelling" in symptoms:
-            recommended.add("Diclofenac")
-    
-    # Cold symptoms
-    if any(sym in symptoms for sym in medicine_mapping["Cetirizine"]):
-        recommended.add("Cetirizine")
-    
-    # Acidity symptoms
-    if any(sym in symptoms for sym in medicine_mapping["Aciloc"]):
-        recommended.add("Aciloc")
-    
-    # Cough & bacterial infection
-    if "cough" in symptoms or "bacterial infection" in symptoms or "sore throat" in symptoms:
-        recommended.add("Azithromycin")
-    
-    return ", ".join(recommended)
-
-# Apply medicine recommendation
-df["Recommended Medicines"] = df["Symptoms"].apply(recommend_medicine)
-
-''' Save updated dataset
-output_file = "updated_medicines.xlsx"
-df.to_excel(output_file, index=False)
-
-# Return file path for download
-output_file'''
-# Save updated dataset as CSV
-output_file = "updated_medicines.csv"
-df.to_csv(output_file, index=False)
-
-# Return file path for download
-output_file
\ No newline at end of file
+    """Recommended medicines for one ", "-separated symptoms string"""
+    return ", ".join(rule_set.recommend(symptoms.split(", ")))
+
+
+def encode_symptoms(column):
+    """Bitmask over symptoms_list for each row of a Symptoms column"""
+    # Symptom logs repeat a small set of strings, so split each distinct one once
+    codes, uniques = pd.factorize(column.fillna("").astype(str))
+    masks = np.array([symptom_mask(text.split(", ")) for text in uniques], dtype=np.int64)
+    return masks[codes]
+
+
+def label_chunk(symptoms):
+    """Recommended Medicines strings for one chunk of the Symptoms column"""
+    codes = rule_set.evaluate_masks(encode_symptoms(symptoms))
+    return rule_set.strings[codes]
+
+
+def check_chunk(symptoms, labels):
+    """Rows where the vectorized labels disagree with recommend_medicine"""
+    mismatches = []
+    for i, (text, label) in enumerate(zip(symptoms.fillna(""), labels)):
+        expected = set(filter(None, recommend_medicine(text).split(", ")))
+        if expected != set(filter(None, label.split(", "))):
+            mismatches.append(i)
+    return mismatches
+
+
+def label_csv(input_path, output_path, column="Symptoms", chunksize=100000, workers=1, check=False):
+    """Stream input_path in chunks, label them across workers, append to output_path
+
+    Only the Symptoms column of each chunk is sent to the pool and at most
+    two chunks per worker are in flight, so memory stays bounded by the
+    chunk size rather than the file size. Returns (rows, mismatches).
+    """
+    pool = Pool(workers) if workers > 1 else None
+    pending = deque()
+    total = 0
+    mismatches = 0
+    written = 0
+    started = time.perf_counter()
+
+    def write(chunk, labels):
+        nonlocal total, mismatches, written
+        chunk["Recommended Medicines"] = labels
+        chunk.to_csv(output_path, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        written += 1
+
+        if check:
+            mismatches += len(check_chunk(chunk[column], labels))
+
+        total += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"Labeled {total} rows ({total / elapsed:,.0f} rows/s)", file=sys.stderr)
+
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            if pool is None:
+                write(chunk, label_chunk(chunk[column]))
+                continue
+
+            pending.append((chunk, pool.apply_async(label_chunk, (chunk[column],))))
+            if len(pending) >= 2 * workers:
+                chunk, result = pending.popleft()
+                write(chunk, result.get())
+
+        while pending:
+            chunk, result = pending.popleft()
+            write(chunk, result.get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return total, mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Label a symptoms CSV with recommended medicines")
+    parser.add_argument("--input", default="medicines - modified.csv")
+    parser.add_argument("--output", default="updated_medicines.csv")
+    parser.add_argument("--column", default="Symptoms")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Labeling processes (1 labels in this process)")
+    parser.add_argument("--check", action="store_true",
+                        help="Also compare every row with recommend_medicine()")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    rows, mismatches = label_csv(args.input, args.output, column=args.column,
+                                 chunksize=args.chunksize, workers=args.workers, check=args.check)
+    elapsed = time.perf_counter() - started
+
+    print(f"Saved {args.output} ({rows} rows in {elapsed:.1f}s)")
+    if args.check:
+        print(f"{mismatches} rows differ from recommend_medicine()")
+        if mismatches:
+            sys.exit(1)
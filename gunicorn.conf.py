@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for MediFlex
+
+The app is imported once in the master (preload_app) so fork-safe model
+artifacts are loaded before workers fork and shared copy-on-write. Engines
+that are not fork-safe (Keras) are loaded in each worker right after fork
+instead of on its first request. Objects built while importing the app
+(the knowledge base in particular) are frozen out of the garbage collector
+before forking, so collections in the workers do not touch, and copy, the
+shared pages. Workers drain the consultation write-behind queue before they
+exit.
+"""
+
+import gc
+import os
+
+preload_app = True
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+
+def when_ready(server):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import registry
+    registry.get()
+    server.log.info("Worker %s model startup: %s", worker.pid, registry.report())
+
+
+def worker_exit(server, worker):
+    from app import consultation_writer
+    if consultation_writer is not None:
+        consultation_writer.stop()
@@ -0,0 +1,163 @@
+"""
+MongoDB index declarations, bootstrap and query-plan verification
+
+Every index the application relies on is declared in INDEXES and created
+idempotently the first time a process connects. An existing index with the
+same keys and options counts as present whatever its name, so indexes
+built before they were declared here (under MongoDB's generated names) are
+kept rather than reported as conflicts. QUERY_SHAPES lists the filters and sorts the
+models issue; `explain` runs each through the query planner and fails if
+any would scan a whole collection.
+
+One-time passwords live in their own `otps` collection: a TTL index on
+the users collection would delete the user documents themselves.
+
+Usage:
+    python indexes.py ensure      # create missing indexes
+    python indexes.py explain     # exit 1 if any query shape is a COLLSCAN
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+
+INDEXES = {
+    'users': [
+        {'keys': [('email', ASCENDING)], 'name': 'email_unique', 'unique': True},
+        {'keys': [('google_id', ASCENDING)], 'name': 'google_id_sparse', 'sparse': True},
+    ],
+    'otps': [
+        {'keys': [('email', ASCENDING)], 'name': 'email_unique', 'unique': True},
+        # Expired codes are removed by the server's TTL monitor (about once a minute)
+        {'keys': [('expires_at', ASCENDING)], 'name': 'expires_at_ttl', 'expireAfterSeconds': 0},
+    ],
+    'consultations': [
+        # (email, timestamp, _id) serves per-user pages in either direction;
+        # _id breaks ties between documents written in the same instant
+        {'keys': [('email', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+         'name': 'email_timestamp'},
+        # Cross-user scans by time (retraining)
+        {'keys': [('timestamp', ASCENDING)], 'name': 'timestamp'},
+    ],
+    'reminders': [
+        {'keys': [('email', ASCENDING), ('timestamp', DESCENDING), ('_id', DESCENDING)],
+         'name': 'email_timestamp'},
+    ],
+}
+
+_PROBE_EMAIL = 'index-check@example.com'
+_PROBE_TIME = datetime(2000, 1, 1)
+_PROBE_ID = ObjectId.from_datetime(_PROBE_TIME)
+
+# Index options that must match for an existing index to stand in for a declared one
+_INDEX_OPTIONS = {'unique': False, 'sparse': False, 'expireAfterSeconds': None}
+
+# (description, collection, filter, sort) for every query the models issue
+QUERY_SHAPES = [
+    ('User.find_by_email', 'users', {'email': _PROBE_EMAIL}, None),
+    ('User.find_by_google_id', 'users', {'google_id': 'probe'}, None),
+    ('User.verify_otp', 'otps', {'email': _PROBE_EMAIL}, None),
+    ('Consultation.find_page', 'consultations', {'email': _PROBE_EMAIL},
+     [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('Consultation.find_page (before)', 'consultations', {
+        'email': _PROBE_EMAIL,
+        '$or': [{'timestamp': {'$lt': _PROBE_TIME}},
+                {'timestamp': _PROBE_TIME, '_id': {'$lt': _PROBE_ID}}]
+    }, [('timestamp', DESCENDING), ('_id', DESCENDING)]),
+    ('Consultation.count', 'consultations', {'email': _PROBE_EMAIL}, None),
+    ('Consultation.iter_range', 'consultations', {'timestamp': {'$gt': _PROBE_TIME}},
+     [('timestamp', ASCENDING)]),
+    ('Reminder.find_all', 'reminders', {'email': _PROBE_EMAIL},
+     [('timestamp', ASCENDING), ('_id', ASCENDING)]),
+]
+
+
+def equivalent_index(existing, spec):
+    """Name of an index in existing (index_information()) matching spec's keys and options"""
+    keys = [(field, int(direction)) for field, direction in spec['keys']]
+    for name, info in existing.items():
+        if [(field, int(direction)) for field, direction in info['key']] != keys:
+            continue
+        if all(info.get(option, default) == spec.get(option, default)
+               for option, default in _INDEX_OPTIONS.items()):
+            return name
+    return None
+
+
+def ensure_indexes(db):
+    """Create every declared index; returns the names that could not be built"""
+    failed = []
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        existing = collection.index_information()
+        for spec in indexes:
+            if equivalent_index(existing, spec):
+                continue
+            options = {key: value for key, value in spec.items() if key != 'keys'}
+            try:
+                collection.create_index(spec['keys'], **options)
+            except OperationFailure as e:
+                # e.g. duplicate emails block the unique index; the app keeps working
+                print(f"[ERROR] Could not create index {collection_name}.{spec['name']}: {e}")
+                failed.append(f"{collection_name}.{spec['name']}")
+    return failed
+
+
+def plan_stages(plan):
+    """Every stage name in an explain() plan tree"""
+    stages = [plan.get('stage')]
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            stages += plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        stages += plan_stages(child)
+    return [stage for stage in stages if stage]
+
+
+def explain_query_shapes(db):
+    """(description, stages) for each query shape's winning plan"""
+    results = []
+    for description, collection_name, query, sort in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = cursor.limit(1).explain()
+        results.append((description, plan_stages(explanation['queryPlanner']['winningPlan'])))
+    return results
+
+
+def main():
+    from models import Database
+
+    parser = argparse.ArgumentParser(description='Create and verify MongoDB indexes')
+    parser.add_argument('command', choices=['ensure', 'explain'])
+    args = parser.parse_args()
+
+    db = Database().db
+    if db is None:
+        print("[ERROR] Database not connected")
+        sys.exit(1)
+
+    if args.command == 'ensure':
+        if ensure_indexes(db):
+            sys.exit(1)
+        print("[SUCCESS] All indexes present")
+        return
+
+    collection_scans = 0
+    for description, stages in explain_query_shapes(db):
+        scan = 'COLLSCAN' in stages
+        collection_scans += scan
+        print(f"{description:<34}{' -> '.join(reversed(stages))}{'   <-- COLLSCAN' if scan else ''}")
+    if collection_scans:
+        print(f"[ERROR] {collection_scans} query shapes scan a whole collection")
+        sys.exit(1)
+    print("[SUCCESS] Every query shape uses an index")
+
+
+if __name__ == '__main__':
+    main()
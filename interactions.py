@@ -0,0 +1,141 @@
+"""
+Drug-interaction graph
+
+Interactions are loaded from a data file (data/drug_interactions.json) into
+an undirected graph: every drug gets an integer id, and each id has a set of
+neighbouring ids. Checking a regimen intersects the regimen's id set with
+each drug's neighbours, so the cost depends on the regimen and the drugs'
+degrees, not on the number of pairs in the regimen or the formulary size.
+
+    {
+      "version": 1,
+      "drugs": ["aciloc", "azithromycin", ...],          # optional extra names
+      "interactions": [
+        {"drugs": ["paracetamol", "diclofenac"], "severity": "moderate",
+         "warning": "...", "recommendation": "..."}
+      ]
+    }
+
+Usage:
+    python interactions.py check paracetamol diclofenac aciloc
+"""
+
+import argparse
+import json
+
+
+class InteractionGraph:
+    """Per-drug adjacency sets keyed by integer drug id"""
+
+    def __init__(self, names, neighbors, edges, version=None):
+        """
+        names     -- drug name for each id
+        neighbors -- frozenset of interacting ids for each id
+        edges     -- {(low id, high id): interaction details}
+        """
+        self.names = names
+        self.ids = {name: drug_id for drug_id, name in enumerate(names)}
+        self.neighbors = neighbors
+        self.edges = edges
+        self.version = version
+
+    @classmethod
+    def from_records(cls, interactions, drugs=(), version=None):
+        """Build from interaction records like those in the data file"""
+        ids = {}
+
+        def drug_id(name):
+            name = name.lower().strip()
+            if name not in ids:
+                ids[name] = len(ids)
+            return ids[name]
+
+        for name in drugs:
+            drug_id(name)
+
+        edges = {}
+        for record in interactions:
+            first, second = (drug_id(name) for name in record['drugs'])
+            if first == second:
+                raise ValueError(f"Interaction of {record['drugs'][0]} with itself")
+            details = {key: value for key, value in record.items() if key != 'drugs'}
+            edges[(min(first, second), max(first, second))] = details
+
+        adjacency = [set() for _ in ids]
+        for first, second in edges:
+            adjacency[first].add(second)
+            adjacency[second].add(first)
+
+        return cls(list(ids), [frozenset(n) for n in adjacency], edges, version)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf8') as f:
+            data = json.load(f)
+        return cls.from_records(data['interactions'], data.get('drugs', ()), data.get('version'))
+
+    def __len__(self):
+        return len(self.names)
+
+    def interaction(self, first, second):
+        """Interaction details for two drug names, or None"""
+        first, second = self.ids.get(first), self.ids.get(second)
+        if first is None or second is None:
+            return None
+        return self.edges.get((min(first, second), max(first, second)))
+
+    def check(self, medicines):
+        """Every interacting pair in a regimen, in the order the drugs were listed
+
+        Returns dicts with the interaction details plus 'medicines' (the two
+        names as given). Unknown names and repeats are ignored.
+        """
+        positions = {}
+        for position, medicine in enumerate(medicines):
+            drug_id = self.ids.get(medicine)
+            if drug_id is not None and drug_id not in positions:
+                positions[drug_id] = position
+        regimen = set(positions)
+
+        pairs = []
+        for drug_id, position in positions.items():
+            # Set intersection iterates over the smaller side
+            for other in self.neighbors[drug_id] & regimen:
+                if positions[other] > position:
+                    pairs.append((position, positions[other], drug_id, other))
+        pairs.sort()
+
+        return [
+            dict(self.edges[(min(first, second), max(first, second))],
+                 medicines=[medicines[i], medicines[j]])
+            for i, j, first, second in pairs
+        ]
+
+    def stats(self):
+        degrees = [len(n) for n in self.neighbors]
+        return {
+            'version': self.version,
+            'drugs': len(self.names),
+            'interactions': len(self.edges),
+            'max_degree': max(degrees, default=0),
+            'avg_degree': (sum(degrees) / len(degrees)) if degrees else 0.0
+        }
+
+
+def main():
+    from knowledge_base import data_path
+
+    parser = argparse.ArgumentParser(description='Check a regimen against the interaction graph')
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('medicines', nargs='+')
+    parser.add_argument('--data', help='Interactions file (default: from the knowledge base manifest)')
+    args = parser.parse_args()
+
+    graph = InteractionGraph.load(args.data or data_path('interactions'))
+    print(f"[INFO] {graph.stats()}")
+    for interaction in graph.check([m.lower() for m in args.medicines]):
+        print(f"{' + '.join(interaction['medicines'])}: {interaction['severity']} - {interaction['warning']}")
+
+
+if __name__ == '__main__':
+    main()
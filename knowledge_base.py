@@ -0,0 +1,273 @@
+"""
+Medical knowledge base
+
+Medicine information, drug interactions, severity keywords, allergens and
+symptom terms are data files under KNOWLEDGE_BASE_DIR, listed in a
+manifest with a version:
+
+    data/
+        manifest.json           # {"version": ..., "files": {"medicines": "medicines.json", ...}}
+        medicines.json
+        drug_interactions.json
+        severity_indicators.json
+        allergens.json
+        symptom_terms.json
+
+load_knowledge_base() compiles them into one immutable KnowledgeBase:
+frozen mappings and tuples with interned names, plus the indexes built from
+them (interaction graph, severity automaton, autocomplete and allergen
+indexes). Loaded in the gunicorn master, the snapshot is shared
+copy-on-write by every worker.
+
+KnowledgeBaseStore holds the current snapshot. A reload builds a complete
+new snapshot before swapping one reference, so a request sees either the old
+or the new knowledge base, never a mix. Stores also poll the manifest's
+modification time and reload when it changes; an explicit reload touches the
+manifest, so every worker's store follows within its watch interval.
+
+Usage:
+    python knowledge_base.py check          # load, validate and report
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+from allergies import AllergenIndex
+from autocomplete import SymptomIndex
+from interactions import InteractionGraph
+from severity import SeverityMatcher
+
+MANIFEST_FILE = 'manifest.json'
+DATA_FILES = ('medicines', 'interactions', 'severity', 'allergens', 'symptoms')
+
+# Tiers assess_severity reads; a severity file must define all of them
+SEVERITY_TIERS = ('severe', 'moderate', 'mild')
+
+# Strings up to this length (names, categories, severities) are interned
+INTERN_MAX_LENGTH = 64
+
+
+class FrozenDict(dict):
+    """A dict that cannot be modified after construction (still JSON-serializable)"""
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError('Knowledge base data is read-only')
+
+    __setitem__ = __delitem__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+    __ior__ = _immutable
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """Recursively convert parsed JSON into FrozenDicts, tuples and interned strings"""
+    if isinstance(value, dict):
+        return FrozenDict((sys.intern(key), freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def data_path(kind, directory=None):
+    """Path of one data file named in the manifest"""
+    if directory is None:
+        from config import Config
+        directory = Config.KNOWLEDGE_BASE_DIR
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf8') as f:
+        return os.path.join(directory, json.load(f)['files'][kind])
+
+
+class KnowledgeBase:
+    """One immutable, fully indexed snapshot of the data files"""
+
+    def __init__(self, version, file_versions, medicines, featured_symptoms, interactions,
+                 severity, autocomplete, allergens, timings):
+        self.version = version
+        self.file_versions = file_versions
+        self.medicines = medicines
+        self.featured_symptoms = featured_symptoms
+        self.interactions = interactions
+        self.severity = severity
+        self.autocomplete = autocomplete
+        self.allergens = allergens
+        self.timings = timings
+
+    def medicine(self, name):
+        """Information for a medicine (any case), or None"""
+        return self.medicines.get(name.lower())
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'files': dict(self.file_versions),
+            'medicines': len(self.medicines),
+            'interactions': self.interactions.stats(),
+            'severity': self.severity.stats(),
+            'autocomplete': self.autocomplete.stats(),
+            'allergens': self.allergens.stats(),
+            'timings': dict(self.timings)
+        }
+
+
+def load_knowledge_base(directory):
+    """Read the manifest and every data file, returning a compiled KnowledgeBase"""
+    started = time.perf_counter()
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf8') as f:
+        manifest = json.load(f)
+
+    data = {}
+    for kind in DATA_FILES:
+        with open(os.path.join(directory, manifest['files'][kind]), 'r', encoding='utf8') as f:
+            data[kind] = json.load(f)
+    missing = [tier for tier in SEVERITY_TIERS if tier not in data['severity'].get('tiers', {})]
+    if missing:
+        raise ValueError(f"Severity file has no {', '.join(missing)} tier")
+    timings = {'read_seconds': time.perf_counter() - started}
+
+    def timed(name, build):
+        start = time.perf_counter()
+        result = build()
+        timings[f'{name}_seconds'] = time.perf_counter() - start
+        return result
+
+    medicines = timed('medicines', lambda: freeze(
+        {name.lower(): info for name, info in data['medicines']['medicines'].items()}))
+    interactions = timed('interactions', lambda: InteractionGraph.from_records(
+        freeze(data['interactions']['interactions']),
+        freeze(data['interactions'].get('drugs', ())),
+        data['interactions'].get('version')))
+    severity = timed('severity', lambda: SeverityMatcher(data['severity']['tiers']))
+    autocomplete = timed('autocomplete', lambda: SymptomIndex(
+        data['symptoms']['terms'], data['symptoms'].get('version')))
+    allergens = timed('allergens', lambda: AllergenIndex(
+        data['allergens']['medicines'], data['allergens'].get('classes'),
+        {name: info.get('name', name) for name, info in medicines.items()},
+        data['allergens'].get('version')))
+
+    timings['total_seconds'] = time.perf_counter() - started
+    return KnowledgeBase(
+        version=manifest.get('version'),
+        file_versions=FrozenDict((kind, data[kind].get('version')) for kind in DATA_FILES),
+        medicines=medicines,
+        featured_symptoms=freeze(data['symptoms'].get('featured', [])),
+        interactions=interactions,
+        severity=severity,
+        autocomplete=autocomplete,
+        allergens=allergens,
+        timings=FrozenDict((name, round(seconds, 4)) for name, seconds in timings.items())
+    )
+
+
+class KnowledgeBaseStore:
+    """The current KnowledgeBase, swapped atomically on reload"""
+
+    def __init__(self, directory, watch_interval=0):
+        self.directory = directory
+        self.watch_interval = watch_interval
+        self._knowledge_base = None
+        self._mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _manifest_mtime(self):
+        try:
+            return os.stat(os.path.join(self.directory, MANIFEST_FILE)).st_mtime_ns
+        except OSError:
+            return None
+
+    def get(self):
+        """The current snapshot, loading it on first use"""
+        if self._knowledge_base is None:
+            with self._lock:
+                if self._knowledge_base is None:
+                    self._swap(self._mtime_and_load())
+        elif self.watch_interval and time.monotonic() - self._checked_at >= self.watch_interval:
+            self._check()
+        return self._knowledge_base
+
+    def _mtime_and_load(self):
+        mtime = self._manifest_mtime()
+        return mtime, load_knowledge_base(self.directory)
+
+    def _swap(self, loaded):
+        self._mtime, knowledge_base = loaded
+        self._knowledge_base = knowledge_base
+        self._checked_at = time.monotonic()
+
+    def _check(self):
+        """Reload if the manifest changed; other requests keep the old snapshot meanwhile"""
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            if self._manifest_mtime() == self._mtime:
+                return
+            try:
+                self._swap(self._mtime_and_load())
+                self.reloads += 1
+                print(f"[SUCCESS] Knowledge base {self._knowledge_base.version} reloaded")
+            except Exception as e:
+                # Keep serving the previous snapshot; retry after the next interval
+                print(f"[ERROR] Knowledge base reload failed: {e}")
+        finally:
+            self._lock.release()
+
+    def reload(self):
+        """Load and swap in the data files now; raises and keeps the old snapshot on error
+
+        The manifest is touched afterwards so stores in other worker
+        processes reload too.
+        """
+        loaded = self._mtime_and_load()
+        with self._lock:
+            self._swap(loaded)
+            self.reloads += 1
+            try:
+                os.utime(os.path.join(self.directory, MANIFEST_FILE))
+                self._mtime = self._manifest_mtime()
+            except OSError as e:
+                print(f"[WARNING] Could not touch knowledge base manifest, other workers keep their snapshot: {e}")
+        return self._knowledge_base
+
+
+def max_rss_mb():
+    """Peak resident set size of this process in MB"""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def main():
+    from config import Config
+
+    parser = argparse.ArgumentParser(description='Load and report on the knowledge base')
+    parser.add_argument('command', choices=['check'])
+    parser.add_argument('--data', default=Config.KNOWLEDGE_BASE_DIR, help='Knowledge base directory')
+    args = parser.parse_args()
+
+    rss_before = max_rss_mb()
+    try:
+        knowledge_base = load_knowledge_base(args.data)
+    except Exception as e:
+        print(f"[ERROR] Could not load knowledge base from {args.data}: {e}")
+        sys.exit(1)
+
+    missing = [name for name in knowledge_base.interactions.names if name not in knowledge_base.medicines]
+    if missing:
+        print(f"[WARNING] {len(missing)} interaction drugs have no medicine entry (e.g. {missing[0]})")
+    print(json.dumps(knowledge_base.stats(), indent=2))
+    print(f"[SUCCESS] Knowledge base {knowledge_base.version} loaded in "
+          f"{knowledge_base.timings['total_seconds']}s (peak RSS +{max_rss_mb() - rss_before:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Move consultation and reminder arrays out of user documents
+
+Older deployments $push'ed every consultation and reminder into the user
+document. This copies each array element into the `consultations` /
+`reminders` collection (one document per entry, with the user's email) and
+then removes the arrays from the user document.
+
+One-time passwords moved the same way, from `otp` / `otp_expires` fields on
+the user document to the `otps` collection. Codes that have not expired are
+copied over (unless the user already has a newer one there) and the old
+fields are removed from every user.
+
+Migrated documents get deterministic ObjectIds built from the entry's
+timestamp and its position in the user's array, so rerunning after an
+interruption skips entries that were already copied instead of duplicating
+them.
+
+Usage:
+    python migrate_history.py --dry-run     # count what would move
+    python migrate_history.py
+"""
+
+import argparse
+import hashlib
+import struct
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from models import Consultation, Reminder, User
+
+DUPLICATE_KEY = 11000
+
+
+def parse_timestamp(value, fallback):
+    """Entry timestamps were datetimes or '%Y-%m-%d %H:%M:%S' strings"""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            try:
+                return datetime.fromisoformat(value)
+            except ValueError:
+                pass
+    return fallback
+
+
+def migrated_id(user_id, kind, index, timestamp):
+    """ObjectId that is the same on every run for the same array entry"""
+    seconds = max(0, min(int(timestamp.timestamp()), 0xFFFFFFFF))
+    digest = hashlib.sha1(f"{user_id}:{kind}:{index}".encode('utf8')).digest()
+    return ObjectId(struct.pack('>I', seconds) + digest[:8])
+
+
+def entry_documents(user, kind, field, timestamp_field):
+    """Collection documents for one user's array"""
+    fallback = user.get('created_at') or datetime.utcnow()
+    documents = []
+    for index, entry in enumerate(user.get(field) or []):
+        document = dict(entry)
+        document['email'] = user['email']
+        document['timestamp'] = parse_timestamp(entry.get(timestamp_field), fallback)
+        document['_id'] = migrated_id(user['_id'], kind, index, document['timestamp'])
+        documents.append(document)
+    return documents
+
+
+def insert_idempotent(collection, documents):
+    """Insert, treating already-migrated documents as done"""
+    if not documents:
+        return 0
+    try:
+        return len(collection.insert_many(documents, ordered=False).inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY for error in errors):
+            raise
+        return e.details.get('nInserted', 0)
+
+
+def migrate(dry_run=False, batch_size=100):
+    users = User.get_collection()
+    consultations = Consultation.get_collection()
+    reminders = Reminder.get_collection()
+    if users is None or consultations is None or reminders is None:
+        raise Exception("Database not connected")
+
+    query = {'$or': [{'consultations': {'$exists': True}}, {'reminders': {'$exists': True}}]}
+    projection = {'email': 1, 'created_at': 1, 'consultations': 1, 'reminders': 1}
+    totals = {'users': 0, 'consultations': 0, 'reminders': 0, 'inserted': 0}
+    started = time.perf_counter()
+
+    for user in users.find(query, projection).batch_size(batch_size):
+        consultation_documents = entry_documents(user, 'consultation', 'consultations', 'timestamp')
+        reminder_documents = entry_documents(user, 'reminder', 'reminders', 'created_at')
+        totals['users'] += 1
+        totals['consultations'] += len(consultation_documents)
+        totals['reminders'] += len(reminder_documents)
+        if dry_run:
+            continue
+
+        totals['inserted'] += insert_idempotent(consultations, consultation_documents)
+        totals['inserted'] += insert_idempotent(reminders, reminder_documents)
+
+        # Only drop the arrays once every entry is safely in its collection
+        users.update_one({'_id': user['_id']}, {'$unset': {'consultations': '', 'reminders': ''}})
+
+    print(f"[INFO] {totals['users']} users, {totals['consultations']} consultations, "
+          f"{totals['reminders']} reminders ({time.perf_counter() - started:.1f}s)")
+    totals.update(migrate_otps(users, dry_run))
+    if not dry_run:
+        print(f"[SUCCESS] Migrated history; {totals['inserted']} new documents written")
+    return totals
+
+
+def migrate_otps(users, dry_run=False):
+    """Move pending one-time passwords from user documents to the otps collection"""
+    otps = User.get_otp_collection()
+    if otps is None:
+        raise Exception("Database not connected")
+
+    legacy = {'$or': [{'otp': {'$exists': True}}, {'otp_expires': {'$exists': True}}]}
+    pending = list(users.find(
+        {'otp': {'$nin': [None, '']}, 'otp_expires': {'$gt': datetime.utcnow()}},
+        {'email': 1, 'otp': 1, 'otp_expires': 1}
+    ))
+    totals = {'otp_users': users.count_documents(legacy), 'otps_copied': 0}
+    print(f"[INFO] {totals['otp_users']} users with legacy OTP fields, {len(pending)} codes still valid")
+    if dry_run:
+        return totals
+
+    for user in pending:
+        # A code issued since the switch to the otps collection is newer; keep it
+        result = otps.update_one(
+            {'email': user['email']},
+            {'$setOnInsert': {'otp': user['otp'], 'expires_at': user['otp_expires']}},
+            upsert=True
+        )
+        totals['otps_copied'] += result.upserted_id is not None
+    users.update_many(legacy, {'$unset': {'otp': '', 'otp_expires': ''}})
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move history arrays and OTPs into their own collections')
+    parser.add_argument('--dry-run', action='store_true', help='Count entries without writing')
+    parser.add_argument('--batch-size', type=int, default=100, help='Users fetched per round trip')
+    args = parser.parse_args()
+
+    try:
+        migrate(args.dry_run, args.batch_size)
+    except Exception as e:
+        print(f"[ERROR] Migration failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""
+Versioned model registry with lazy, fork-aware loading and hot reload
+
+app.py used to load the model, vocabulary and labels at import time, so
+every gunicorn worker paid the full load and TensorFlow created its thread
+pools before fork. The registry loads artifacts on first use instead, and
+lets the gunicorn master preload engines whose state is plain arrays
+(NumPy weights, memory-mapped answer table) so workers share those pages
+copy-on-write. Keras models are never carried across a fork.
+
+Model versions live in MODEL_VERSIONS_DIR, one directory per version:
+
+    model_versions/
+        ACTIVE                  # optional: name of the version to serve
+        20261017-1/
+            manifest.json       # written last; marks the version complete
+            medicine_model.npz  # and/or medicine_model.h5
+            vocabulary.json     # or tokenizer.pkl
+            medicine_labels.pkl
+            answer_table.npy    # optional
+
+Without an ACTIVE file the newest complete version is served. Without any
+versions, or with ACTIVE set to 'default', the artifacts in the project root
+are served as version 'default'.
+A new version is loaded and warmed up beside the active one and then
+swapped in with a single reference assignment, so requests never see a
+half-loaded model. A load that fails is retried with exponential backoff
+(and by the watcher), so a missing or broken artifact does not disable a
+worker until restart.
+"""
+
+import itertools
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+
+from answer_table import AnswerTable
+from batching import PredictionBatcher
+from numpy_engine import NumpyModel
+from postprocessing import PostProcessor
+from vocabulary import load_vocabulary
+
+# Engines whose loaded state is safe to inherit through fork()
+FORK_SAFE_ENGINES = {'numpy'}
+
+DEFAULT_VERSION = 'default'
+MANIFEST_FILE = 'manifest.json'
+ACTIVE_FILE = 'ACTIVE'
+
+# Distinguishes loads of the same version name (e.g. 'default' reloaded from new files)
+_load_ids = itertools.count(1)
+
+# Seconds before a failed load is retried in the same process (doubling up to the max)
+LOAD_RETRY_MIN_DELAY = 1.0
+LOAD_RETRY_MAX_DELAY = 60.0
+
+# Canned inputs run through a freshly loaded model before it takes traffic
+WARMUP_INPUTS = [
+    'fever', 'headache', 'fever, headache', 'body pain, swelling',
+    'cold, sneezing, runny nose', 'cough, sore throat', 'bacterial infection',
+    'stomach pain, acidity', 'fever, cough, cold, headache, body pain'
+]
+
+
+class ModelArtifacts:
+    """Everything /predict needs from one loaded model version"""
+
+    def __init__(self, model, vocabulary, medicine_list, engine, answer_table=None,
+                 version=DEFAULT_VERSION):
+        self.model = model
+        self.vocabulary = vocabulary
+        self.medicine_list = medicine_list
+        self.engine = engine
+        self.answer_table = answer_table
+        self.version = version
+        self.load_id = next(_load_ids)
+        self.batcher = None
+        self.postprocessor = PostProcessor(medicine_list)
+
+    @property
+    def fork_safe(self):
+        return self.engine in FORK_SAFE_ENGINES
+
+    def run_model(self, padded_sequences):
+        """Run one forward pass over a batch of padded sequences"""
+        return self.model.predict(padded_sequences, batch_size=len(padded_sequences), verbose=0)
+
+    def enable_batching(self, max_batch_size, max_wait_ms):
+        """Route predict() through a micro-batcher bound to this version"""
+        self.batcher = PredictionBatcher(
+            self.run_model,
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms
+        )
+
+    def predict(self, padded_sequences):
+        """Forward pass, coalesced with concurrent callers when batching is on"""
+        if self.batcher is not None:
+            return self.batcher.submit(padded_sequences)
+        return self.run_model(padded_sequences)
+
+    def predict_batch(self, padded_sequences):
+        """Probabilities for many rows: table lookups where possible, one forward pass for the rest"""
+        padded_sequences = np.asarray(padded_sequences)
+        if self.answer_table is None:
+            return np.asarray(self.run_model(padded_sequences))
+
+        rows = self.answer_table.indices(padded_sequences)
+        in_table = rows >= 0
+        probabilities = np.empty((len(padded_sequences), len(self.medicine_list)), dtype=np.float32)
+        probabilities[in_table] = self.answer_table.probabilities[rows[in_table]]
+        if not in_table.all():
+            probabilities[~in_table] = self.run_model(padded_sequences[~in_table])
+        return probabilities
+
+    def retire(self):
+        """Let in-flight batches finish after this version was swapped out"""
+        if self.batcher is not None:
+            self.batcher.stop()
+
+
+def resolve_engine(config, directory=None):
+    """Engine INFERENCE_ENGINE selects, resolving 'auto' without loading anything"""
+    engine = config.INFERENCE_ENGINE
+    if engine == 'auto':
+        weights_path = (os.path.join(directory, 'medicine_model.npz') if directory
+                        else config.NUMPY_WEIGHTS_PATH)
+        engine = 'numpy' if os.path.exists(weights_path) else 'keras'
+    return engine
+
+
+def load_artifacts(config, directory=None, version=DEFAULT_VERSION):
+    """Load model, vocabulary, labels and (optionally) the answer table"""
+    if directory:
+        paths = {name: os.path.join(directory, name) for name in (
+            'medicine_model.npz', 'medicine_model.h5', 'vocabulary.json',
+            'tokenizer.pkl', 'medicine_labels.pkl', 'answer_table.npy')}
+    else:
+        paths = {
+            'medicine_model.npz': config.NUMPY_WEIGHTS_PATH,
+            'medicine_model.h5': 'medicine_model.h5',
+            'vocabulary.json': config.VOCABULARY_PATH,
+            'tokenizer.pkl': 'tokenizer.pkl',
+            'medicine_labels.pkl': 'medicine_labels.pkl',
+            'answer_table.npy': config.ANSWER_TABLE_PATH
+        }
+
+    engine = resolve_engine(config, directory)
+    if engine == 'numpy':
+        print(f"[INFO] Using NumPy inference engine ({paths['medicine_model.npz']})")
+        model = NumpyModel.load(paths['medicine_model.npz'])
+    else:
+        # TensorFlow is only imported when the Keras engine is selected
+        try:
+            from tensorflow.keras.models import load_model
+        except ImportError as e:
+            raise Exception(f"TensorFlow not available: {e}")
+        print(f"[INFO] Using Keras inference engine ({paths['medicine_model.h5']})")
+        model = load_model(paths['medicine_model.h5'], compile=False)
+
+    vocabulary = load_vocabulary(paths['vocabulary.json'], paths['tokenizer.pkl'])
+    with open(paths['medicine_labels.pkl'], 'rb') as f:
+        medicine_list = pickle.load(f)
+
+    # O(1) lookups for every in-vocabulary input, when the table has been built
+    answer_table = None
+    if os.path.exists(paths['answer_table.npy']):
+        try:
+            answer_table = AnswerTable.load(paths['answer_table.npy'], vocabulary)
+            if answer_table is not None:
+                print(f"[INFO] Answer table loaded ({len(answer_table.probabilities)} sequences)")
+        except Exception as e:
+            print(f"[WARNING] Could not load answer table: {e}")
+
+    return ModelArtifacts(model, vocabulary, medicine_list, engine, answer_table, version)
+
+
+def list_versions(versions_dir):
+    """Complete model versions (those with a manifest), oldest first"""
+    if not versions_dir or not os.path.isdir(versions_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(versions_dir)
+        if os.path.isfile(os.path.join(versions_dir, name, MANIFEST_FILE))
+    )
+
+
+def set_active_version(versions_dir, version):
+    """Atomically point ACTIVE at a version so every worker's watcher follows"""
+    path = os.path.join(versions_dir, ACTIVE_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        f.write(version)
+    os.replace(tmp_path, path)
+
+
+class ModelRegistry:
+    """Process-aware holder for the active ModelArtifacts"""
+
+    def __init__(self, config, loader=load_artifacts, warmup=True):
+        self.config = config
+        self.loader = loader
+        self.warmup = warmup
+        self.versions_dir = getattr(config, 'MODEL_VERSIONS_DIR', None)
+        self.watch_interval = getattr(config, 'MODEL_WATCH_INTERVAL', 0)
+
+        self._lock = threading.Lock()
+        self._artifacts = None
+        self._pid = None
+        self._error = None
+        self._watcher = None
+        self._watcher_pid = None
+        self._retry_at = 0.0
+        self._retry_delay = LOAD_RETRY_MIN_DELAY
+
+        self.timings = {}
+        self.swaps = 0
+        self._swap_listeners = []
+
+    def select_version(self):
+        """(version, directory) that should be served right now"""
+        versions = list_versions(self.versions_dir)
+        if not versions:
+            return DEFAULT_VERSION, None
+
+        active_path = os.path.join(self.versions_dir, ACTIVE_FILE)
+        if os.path.exists(active_path):
+            with open(active_path, 'r', encoding='utf8') as f:
+                pinned = f.read().strip()
+            if pinned == DEFAULT_VERSION:
+                return DEFAULT_VERSION, None
+            if pinned in versions:
+                return pinned, os.path.join(self.versions_dir, pinned)
+            print(f"[WARNING] ACTIVE names unknown model version '{pinned}'; using newest")
+
+        return versions[-1], os.path.join(self.versions_dir, versions[-1])
+
+    def _warm_up(self, artifacts):
+        """Run canned inputs at batch size 1 and N so first requests are fast"""
+        padded = artifacts.vocabulary.encode(WARMUP_INPUTS)
+        artifacts.run_model(padded[:1])
+        artifacts.run_model(padded)
+
+    def _build(self, version, directory):
+        """Load and warm up one version without touching the active one"""
+        started = time.perf_counter()
+        artifacts = self.loader(self.config, directory, version)
+        loaded = time.perf_counter()
+
+        timings = {'model_load_seconds': round(loaded - started, 4)}
+        if self.warmup:
+            # The first call pays graph tracing / page faults; do it before traffic
+            self._warm_up(artifacts)
+            timings['first_inference_seconds'] = round(time.perf_counter() - loaded, 4)
+
+        artifacts.postprocessor = PostProcessor(
+            artifacts.medicine_list,
+            default_threshold=getattr(self.config, 'PREDICTION_THRESHOLD', 0.5),
+            thresholds=getattr(self.config, 'MEDICINE_THRESHOLDS', None),
+            top_k=getattr(self.config, 'PREDICTION_TOP_K', 0)
+        )
+        if getattr(self.config, 'PREDICT_BATCHING', False):
+            artifacts.enable_batching(self.config.PREDICT_BATCH_MAX_SIZE,
+                                      self.config.PREDICT_BATCH_MAX_WAIT_MS)
+        return artifacts, timings
+
+    def _load(self):
+        """Load the selected version in this process (caller holds the lock)"""
+        version, directory = self.select_version()
+        try:
+            artifacts, timings = self._build(version, directory)
+        except Exception as e:
+            # Unusable until the retry time; requests meanwhile get None without reloading
+            print(f"[ERROR] Error loading model: {e} (retrying in {self._retry_delay:.0f}s)")
+            self._error = str(e)
+            self._artifacts = None
+            self._pid = os.getpid()
+            self._retry_at = time.monotonic() + self._retry_delay
+            self._retry_delay = min(self._retry_delay * 2, LOAD_RETRY_MAX_DELAY)
+            return None
+
+        self.timings.update(timings)
+        self.timings['loaded_in_pid'] = os.getpid()
+        self.timings['engine'] = artifacts.engine
+        self._artifacts = artifacts
+        self._pid = os.getpid()
+        self._error = None
+        self._retry_delay = LOAD_RETRY_MIN_DELAY
+        self._notify_swap(artifacts)
+        print(f"[SUCCESS] Model version {version} loaded in pid {os.getpid()} "
+              f"(load {timings['model_load_seconds']}s, "
+              f"first inference {timings.get('first_inference_seconds', 'n/a')}s)")
+        return artifacts
+
+    def on_swap(self, listener):
+        """Call listener(artifacts) whenever this process starts serving new artifacts"""
+        self._swap_listeners.append(listener)
+
+    def _notify_swap(self, artifacts):
+        for listener in self._swap_listeners:
+            try:
+                listener(artifacts)
+            except Exception as e:
+                print(f"[WARNING] Model swap listener failed: {e}")
+
+    def _usable(self):
+        """Loaded state from this process, or fork-safe state from the parent"""
+        if self._artifacts is None:
+            return False
+        if self._pid == os.getpid():
+            return True
+        return self._artifacts.fork_safe
+
+    def _retry_pending(self):
+        """A load failed in this process and its retry time has not come yet"""
+        return self._pid == os.getpid() and self._error is not None and time.monotonic() < self._retry_at
+
+    def get(self, watch=True):
+        """Active artifacts, loading them on first use in this process"""
+        if watch:
+            self._ensure_watcher()
+        if self._usable():
+            return self._artifacts
+        if self._retry_pending():
+            return None
+        with self._lock:
+            if not self._usable() and not self._retry_pending():
+                self._load()
+            return self._artifacts
+
+    def preload(self):
+        """Load now if the engine can be shared with forked workers"""
+        _, directory = self.select_version()
+        if resolve_engine(self.config, directory) not in FORK_SAFE_ENGINES:
+            print("[INFO] Keras engine is not fork-safe; workers will load the model lazily")
+            return False
+        # No watcher thread in the master: it must not hold locks across fork()
+        return self.get(watch=False) is not None
+
+    def reload(self, version=None):
+        """Load, warm up and atomically swap in a version (default: the selected one)
+
+        Raises if the new version cannot be loaded; the active one keeps serving.
+        """
+        if version is None:
+            version, directory = self.select_version()
+        elif version == DEFAULT_VERSION:
+            directory = None
+        elif version in list_versions(self.versions_dir):
+            directory = os.path.join(self.versions_dir, version)
+        else:
+            raise ValueError(f"Unknown model version: {version}")
+
+        artifacts, timings = self._build(version, directory)
+        with self._lock:
+            previous = self._artifacts if self._pid == os.getpid() else None
+            self._artifacts = artifacts
+            self._pid = os.getpid()
+            self._error = None
+            self._retry_delay = LOAD_RETRY_MIN_DELAY
+            self.timings.update(timings)
+            self.timings['loaded_in_pid'] = os.getpid()
+            self.timings['engine'] = artifacts.engine
+            self.swaps += 1
+
+        self._notify_swap(artifacts)
+        if previous is not None and previous is not artifacts:
+            previous.retire()
+        print(f"[SUCCESS] Swapped in model version {version} "
+              f"(load {timings['model_load_seconds']}s, "
+              f"warm-up {timings.get('first_inference_seconds', 'n/a')}s)")
+        return artifacts
+
+    def _ensure_watcher(self):
+        """Start the versions-directory watcher, once per process"""
+        if not self.watch_interval or not self.versions_dir:
+            return
+        pid = os.getpid()
+        if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+            return
+        with self._lock:
+            if self._watcher_pid == pid and self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watcher_pid = pid
+            self._watcher = threading.Thread(target=self._watch, name='model-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch(self):
+        """Poll the versions directory and swap when the selection changes"""
+        while True:
+            time.sleep(self.watch_interval)
+            try:
+                if not self._usable():
+                    # Nothing served yet (a load failed): try the current selection
+                    with self._lock:
+                        if not self._usable():
+                            self._load()
+                    continue
+                version, _ = self.select_version()
+                if self._artifacts.version != version:
+                    self.reload(version)
+            except Exception as e:
+                print(f"[ERROR] Model hot reload failed: {e}")
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def active_version(self):
+        artifacts = self._artifacts if self._usable() else None
+        return artifacts.version if artifacts is not None else None
+
+    def report(self):
+        """Startup timings plus where the active artifacts came from"""
+        report = dict(self.timings)
+        report['pid'] = os.getpid()
+        report['loaded'] = self._artifacts is not None and self._usable()
+        report['inherited_from_master'] = (
+            report['loaded'] and self.timings.get('loaded_in_pid') != os.getpid()
+        )
+        report['version'] = self.active_version
+        report['available_versions'] = list_versions(self.versions_dir)
+        report['swaps'] = self.swaps
+        if self._error:
+            report['error'] = self._error
+        return report
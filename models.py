@@ -1,56 +1,249 @@
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING, InsertOne, MongoClient, ReturnDocument, monitoring
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from flask import g, has_request_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import random
 import string
+import threading
+import time
 from config import Config
+from indexes import ensure_indexes
 import certifi
+import copy
 import os
+from prediction_cache import PredictionCache
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts MongoDB commands sent while handling the current request"""
+    
+    def started(self, event):
+        if has_request_context():
+            g.db_round_trips = g.get('db_round_trips', 0) + 1
+    
+    def succeeded(self, event):
+        pass
+    
+    def failed(self, event):
+        pass
+
+# Must be registered before any MongoClient is created
+monitoring.register(RoundTripCounter())
+
+
+def db_round_trips():
+    """MongoDB commands sent so far in the current request"""
+    return g.get('db_round_trips', 0) if has_request_context() else 0
+
+
+def request_identity_map():
+    """Per-request {email: user document or None}, or None outside a request"""
+    if not has_request_context():
+        return None
+    if 'user_identity_map' not in g:
+        g.user_identity_map = {}
+    return g.user_identity_map
+
+
+# Optional cross-request cache of user documents. Only this process's writes
+# invalidate it, so keep USER_CACHE_TTL short when running several workers.
+user_cache = (PredictionCache(max_size=Config.USER_CACHE_SIZE, ttl=Config.USER_CACHE_TTL)
+              if Config.USER_CACHE_TTL > 0 else None)
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters for the current process's MongoClient"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'checkout_failures': 0,
+            'pool_clears': 0
+        }
+        self.checked_out = 0
+        self.open_connections = 0
+        self.max_checked_out = 0
+    
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+    
+    def pool_created(self, event):
+        pass
+    
+    def pool_ready(self, event):
+        pass
+    
+    def pool_cleared(self, event):
+        self._count('pool_clears')
+    
+    def pool_closed(self, event):
+        pass
+    
+    def connection_created(self, event):
+        with self._lock:
+            self.counters['connections_created'] += 1
+            self.open_connections += 1
+    
+    def connection_ready(self, event):
+        pass
+    
+    def connection_closed(self, event):
+        with self._lock:
+            self.counters['connections_closed'] += 1
+            self.open_connections -= 1
+    
+    def connection_check_out_started(self, event):
+        pass
+    
+    def connection_check_out_failed(self, event):
+        # Includes waitQueueTimeoutMS expiring while every connection is busy
+        self._count('checkout_failures')
+    
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.counters['checkouts'] += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+    
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+    
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, open_connections=self.open_connections,
+                        checked_out=self.checked_out, max_checked_out=self.max_checked_out)
 
 class Database:
-    """MongoDB Database handler"""
+    """MongoDB Database handler (one client per process)
+    
+    The client is created on first use in each process, so gunicorn workers
+    never share the master's sockets after fork. If the first connection
+    fails, a background thread keeps retrying with exponential backoff and
+    `db` stays None (database features degrade) until it succeeds.
+    """
     _instance = None
+    _lock = threading.Lock()
     
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Database, cls).__new__(cls)
-            try:
-                print(f"Attempting MongoDB connection...")
-                
-                # Check if using local MongoDB (no SSL) or Atlas (with SSL)
-                mongodb_uri = Config.MONGODB_URI
-                is_atlas = 'mongodb+srv://' in mongodb_uri or 'mongodb.net' in mongodb_uri
-                
-                if is_atlas:
-                    # MongoDB Atlas connection (with SSL)
-                    os.environ['SSL_CERT_FILE'] = certifi.where()
-                    cls._instance.client = MongoClient(
-                        mongodb_uri,
-                        tlsCAFile=certifi.where(),
-                        tls=True,
-                        serverSelectionTimeoutMS=5000,
-                        connectTimeoutMS=5000
-                    )
-                else:
-                    # Local MongoDB connection (without SSL)
-                    cls._instance.client = MongoClient(
-                        mongodb_uri,
-                        serverSelectionTimeoutMS=5000,
-                        connectTimeoutMS=5000
-                    )
-                
-                # Test connection
-                cls._instance.client.admin.command('ping')
-                cls._instance.db = cls._instance.client[Config.MONGODB_DB_NAME]
-                print("✓ MongoDB connected successfully!")
-                
-            except Exception as e:
-                print(f"✗ MongoDB connection error: {e}")
-                print("⚠️  Application will continue but database features may not work")
-                cls._instance.client = None
-                cls._instance.db = None
-                
-        return cls._instance
+        instance = cls._instance
+        if instance is None or instance.pid != os.getpid():
+            with cls._lock:
+                if cls._instance is None or cls._instance.pid != os.getpid():
+                    cls._instance = super(Database, cls).__new__(cls)
+                    cls._instance._setup()
+                instance = cls._instance
+        return instance
+    
+    @classmethod
+    def _after_fork(cls):
+        # The parent's lock may have been held by another thread at fork time
+        cls._lock = threading.Lock()
+    
+    def _setup(self):
+        self.pid = os.getpid()
+        self.client = None
+        self.db = None
+        self.pool = PoolStats()
+        self.connect_attempts = 0
+        self.connected_at = None
+        self.last_error = None
+        self._reconnect_thread = None
+        
+        if not Config.MONGODB_URI:
+            self.last_error = 'MONGODB_URI is not set'
+            print("✗ MongoDB connection error: MONGODB_URI is not set")
+            print("⚠️  Application will continue but database features may not work")
+            return
+        
+        if not self._connect():
+            print("⚠️  Application will continue but database features may not work")
+            self._reconnect_thread = threading.Thread(target=self._reconnect, name='mongodb-reconnect', daemon=True)
+            self._reconnect_thread.start()
+    
+    @staticmethod
+    def client_options():
+        """Pool and timeout options passed to MongoClient"""
+        options = {
+            'maxPoolSize': Config.MONGODB_MAX_POOL_SIZE,
+            'minPoolSize': Config.MONGODB_MIN_POOL_SIZE,
+            'serverSelectionTimeoutMS': Config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            'connectTimeoutMS': Config.MONGODB_CONNECT_TIMEOUT_MS
+        }
+        # 0 leaves pymongo's default (no idle limit / wait indefinitely)
+        if Config.MONGODB_MAX_IDLE_TIME_MS > 0:
+            options['maxIdleTimeMS'] = Config.MONGODB_MAX_IDLE_TIME_MS
+        if Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS > 0:
+            options['waitQueueTimeoutMS'] = Config.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+        return options
+    
+    def _connect(self):
+        """One connection attempt; returns True once `db` is usable"""
+        self.connect_attempts += 1
+        client = None
+        try:
+            print(f"Attempting MongoDB connection...")
+            
+            # Check if using local MongoDB (no SSL) or Atlas (with SSL)
+            mongodb_uri = Config.MONGODB_URI
+            is_atlas = 'mongodb+srv://' in mongodb_uri or 'mongodb.net' in mongodb_uri
+            options = self.client_options()
+            
+            if is_atlas:
+                # MongoDB Atlas connection (with SSL)
+                os.environ['SSL_CERT_FILE'] = certifi.where()
+                options.update(tlsCAFile=certifi.where(), tls=True)
+            
+            client = MongoClient(mongodb_uri, event_listeners=[self.pool], **options)
+            
+            # Test connection
+            client.admin.command('ping')
+            db = client[Config.MONGODB_DB_NAME]
+            
+            # Idempotent: existing indexes are left as they are
+            if Config.ENSURE_INDEXES:
+                ensure_indexes(db)
+            
+            self.client = client
+            self.db = db
+            self.connected_at = datetime.utcnow()
+            self.last_error = None
+            print("✓ MongoDB connected successfully!")
+            return True
+            
+        except Exception as e:
+            print(f"✗ MongoDB connection error: {e}")
+            self.last_error = str(e)
+            if client is not None:
+                client.close()
+            return False
+    
+    def _reconnect(self):
+        """Retry in the background with exponential backoff and jitter"""
+        delay = Config.MONGODB_RECONNECT_MIN_DELAY
+        while self.db is None and self.pid == os.getpid():
+            time.sleep(delay * random.uniform(0.5, 1.0))
+            if self._connect():
+                return
+            delay = min(delay * 2, Config.MONGODB_RECONNECT_MAX_DELAY)
+            print(f"[WARNING] MongoDB still unreachable; retrying in up to {delay:.1f}s")
+    
+    def stats(self):
+        """Connection state, pool options and pool counters"""
+        return {
+            'connected': self.db is not None,
+            'pid': self.pid,
+            'connect_attempts': self.connect_attempts,
+            'connected_at': self.connected_at.isoformat() if self.connected_at else None,
+            'reconnecting': self._reconnect_thread is not None and self._reconnect_thread.is_alive(),
+            'last_error': self.last_error,
+            'options': self.client_options(),
+            'pool': self.pool.stats()
+        }
     
     def get_collection(self, name):
         """Get a collection from the database"""
@@ -58,6 +251,8 @@ class Database:
             raise Exception("Database not connected")
         return self.db[name]
 
+os.register_at_fork(after_in_child=Database._after_fork)
+
 class User:
     """User model for authentication and profile management"""
     
@@ -86,15 +281,48 @@ class User:
     
     @staticmethod
     def find_by_email(email):
-        """Find user by email"""
-        try:
-            collection = User.get_collection()
-            if collection is None:
+        """Find user by email (at most one read per user per request)"""
+        identity_map = request_identity_map()
+        if identity_map is not None and email in identity_map:
+            return identity_map[email]
+        
+        user = user_cache.get(email) if user_cache is not None else None
+        if user is not None:
+            # Callers may modify what they get; the shared copy stays intact
+            user = copy.deepcopy(user)
+        else:
+            try:
+                collection = User.get_collection()
+                if collection is None:
+                    return None
+                user = collection.find_one({'email': email})
+            except Exception as e:
+                print(f"Warning: Database query failed: {e}")
                 return None
-            return collection.find_one({'email': email})
-        except Exception as e:
-            print(f"Warning: Database query failed: {e}")
-            return None
+            if user is not None and user_cache is not None:
+                user_cache.put(email, copy.deepcopy(user))
+        
+        if identity_map is not None:
+            identity_map[email] = user
+        return user
+    
+    @staticmethod
+    def remember(email, user):
+        """Record the current state of a user after this request wrote it"""
+        if user_cache is not None:
+            user_cache.discard(email)
+        identity_map = request_identity_map()
+        if identity_map is not None:
+            identity_map[email] = user
+    
+    @staticmethod
+    def forget(email):
+        """Drop cached copies of a user after an update"""
+        if user_cache is not None:
+            user_cache.discard(email)
+        identity_map = request_identity_map()
+        if identity_map is not None:
+            identity_map.pop(email, None)
     
     @staticmethod
     def find_by_google_id(google_id):
@@ -119,12 +347,8 @@ class User:
                 'email': email,
                 'name': name,
                 'password_hash': generate_password_hash(password) if password else None,
-                'google_id': google_id,
                 'created_at': datetime.utcnow(),
                 'verified': True if google_id else False,  # Google OAuth users are auto-verified
-                'otp': None,
-                'otp_expires': None,
-                'consultations': [],
                 'profile': {
                     'age': None,
                     'weight': None,
@@ -133,8 +357,13 @@ class User:
                 }
             }
             
+            # Only OAuth users carry google_id, keeping its sparse index small
+            if google_id:
+                user_data['google_id'] = google_id
+            
             result = collection.insert_one(user_data)
             user_data['_id'] = result.inserted_id
+            User.remember(email, user_data)
             return user_data
         except Exception as e:
             print(f"Error creating user: {e}")
@@ -153,43 +382,66 @@ class User:
         """Generate 6-digit OTP"""
         return ''.join(random.choices(string.digits, k=6))
     
+    @staticmethod
+    def get_otp_collection():
+        """Get otps collection (expired codes are removed by a TTL index)"""
+        try:
+            db = Database()
+            if db.db is None:
+                return None
+            return db.get_collection('otps')
+        except Exception as e:
+            print(f"Warning: Could not get otps collection: {e}")
+            return None
+    
     @staticmethod
     def set_otp(email, otp):
-        """Set OTP for email verification"""
+        """Set OTP for email verification; False when the database is unavailable"""
         from datetime import timedelta
-        collection = User.get_collection()
+        collection = User.get_otp_collection()
+        if collection is None:
+            return False
         
         otp_expires = datetime.utcnow() + timedelta(minutes=10)  # OTP valid for 10 minutes
         
+        # One active code per email; a resend replaces it
         collection.update_one(
             {'email': email},
             {'$set': {
                 'otp': otp,
-                'otp_expires': otp_expires
-            }}
+                'expires_at': otp_expires
+            }},
+            upsert=True
         )
+        return True
     
     @staticmethod
     def verify_otp(email, otp):
         """Verify OTP and mark user as verified"""
+        otps = User.get_otp_collection()
         collection = User.get_collection()
-        user = User.find_by_email(email)
+        if otps is None or collection is None:
+            return False
         
-        if not user:
+        # Consume the code only if it matches and has not expired (the TTL
+        # monitor runs about once a minute, so expiry is checked here too)
+        record = otps.find_one_and_delete({
+            'email': email,
+            'otp': otp,
+            'expires_at': {'$gt': datetime.utcnow()}
+        })
+        if not record:
             return False
         
-        # Check if OTP matches and not expired
-        if user.get('otp') == otp and user.get('otp_expires') > datetime.utcnow():
-            collection.update_one(
-                {'email': email},
-                {'$set': {
-                    'verified': True,
-                    'otp': None,
-                    'otp_expires': None
-                }}
-            )
-            return True
-        return False
+        user = collection.find_one_and_update(
+            {'email': email},
+            {'$set': {'verified': True}},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is None:
+            return False
+        User.remember(email, user)
+        return True
     
     @staticmethod
     def verify_user(email):
@@ -202,6 +454,7 @@ class User:
                 {'email': email},
                 {'$set': {'verified': True}}
             )
+            User.forget(email)
             return True
         except Exception as e:
             print(f"Error verifying user: {e}")
@@ -210,24 +463,24 @@ class User:
     @staticmethod
     def add_consultation(email, consultation_data):
         """Add a consultation to user's history"""
-        collection = User.get_collection()
-        consultation_data['timestamp'] = datetime.utcnow()
-        
-        collection.update_one(
-            {'email': email},
-            {'$push': {'consultations': consultation_data}}
-        )
+        Consultation.add(email, consultation_data)
+    
+    @staticmethod
+    def add_consultations(email, consultations):
+        """Add many consultations to user's history in one write"""
+        Consultation.add_many(email, consultations)
+    
+    @staticmethod
+    def iter_consultations(since=None, until=None, batch_size=1000):
+        """Stream every user's consultations logged in (since, until], oldest first"""
+        return Consultation.iter_range(since, until, batch_size)
     
     @staticmethod
     def get_consultations(email, limit=10):
-        """Get user's consultation history"""
-        user = User.find_by_email(email)
-        if user and 'consultations' in user:
-            consultations = user['consultations']
-            # Sort by timestamp descending and limit
-            consultations.sort(key=lambda x: x.get('timestamp', datetime.min), reverse=True)
-            return consultations[:limit]
-        return []
+        """Get user's most recent consultations"""
+        consultations, _, _ = Consultation.find_page(email, limit=limit,
+                                                     projection=Consultation.summary_fields)
+        return consultations
     
     @staticmethod
     def update_profile(email, profile_data):
@@ -237,15 +490,22 @@ class User:
             {'email': email},
             {'$set': {'profile': profile_data}}
         )
+        User.forget(email)
     
     @staticmethod
     def get_user_stats(email):
         """Get user statistics"""
-        user = User.find_by_email(email)
+        collection = User.get_collection()
+        if collection is None:
+            return None
+        user = collection.find_one(
+            {'email': email},
+            {'name': 1, 'email': 1, 'created_at': 1, 'verified': 1, 'profile': 1}
+        )
         if not user:
             return None
         
-        total_consultations = len(user.get('consultations', []))
+        total_consultations = Consultation.count(email)
         
         return {
             'name': user.get('name'),
@@ -258,31 +518,214 @@ class User:
     
     @staticmethod
     def add_reminder(email, reminder_data):
-        """Add medication reminder to user profile"""
-        collection = User.get_collection()
-        collection.update_one(
-            {'email': email},
-            {'$push': {'reminders': reminder_data}}
-        )
+        """Add medication reminder for a user"""
+        Reminder.add(email, reminder_data)
     
     @staticmethod
     def get_reminders(email):
-        """Get user's medication reminders"""
-        user = User.find_by_email(email)
-        return user.get('reminders', []) if user else []
+        """Get user's medication reminders, oldest first"""
+        return Reminder.find_all(email)
     
     @staticmethod
     def delete_reminder(email, reminder_index):
-        """Delete a specific reminder"""
-        user = User.find_by_email(email)
-        if user and 'reminders' in user:
-            reminders = user['reminders']
-            if 0 <= reminder_index < len(reminders):
-                reminders.pop(reminder_index)
-                collection = User.get_collection()
-                collection.update_one(
-                    {'email': email},
-                    {'$set': {'reminders': reminders}}
-                )
-                return True
-        return False
+        """Delete a specific reminder (by position, oldest first)"""
+        return Reminder.delete_at(email, reminder_index)
+
+
+def encode_cursor(document):
+    """Opaque page cursor for the (timestamp, _id) position of a document"""
+    return f"{document['timestamp'].isoformat()}|{document['_id']}"
+
+
+def decode_cursor(cursor):
+    """(timestamp, _id) from encode_cursor(); raises ValueError if malformed"""
+    timestamp, _, object_id = cursor.partition('|')
+    if not ObjectId.is_valid(object_id):
+        raise ValueError('Invalid page cursor')
+    return datetime.fromisoformat(timestamp), ObjectId(object_id)
+
+
+class HistoryCollection:
+    """Per-user, time-ordered documents kept outside the user document"""
+    name = None
+    
+    @classmethod
+    def get_collection(cls):
+        """Get the collection (indexes are declared in indexes.py)"""
+        try:
+            db = Database()
+            if db.db is None:
+                return None
+            return db.get_collection(cls.name)
+        except Exception as e:
+            print(f"Warning: Could not get {cls.name} collection: {e}")
+            return None
+    
+    @classmethod
+    def _require_collection(cls):
+        collection = cls.get_collection()
+        if collection is None:
+            raise Exception("Database not connected")
+        return collection
+    
+    @classmethod
+    def find_page(cls, email, limit=10, before=None, after=None, projection=None):
+        """One page of a user's documents, newest first
+        
+        before -- cursor: return documents older than it (next page)
+        after  -- cursor: return documents newer than it (previous page)
+        Returns (documents, older_cursor, newer_cursor); a cursor is None
+        when there is nothing further in that direction.
+        """
+        collection = cls.get_collection()
+        if collection is None:
+            return [], None, None
+        if projection is not None:
+            # Cursors are built from these fields
+            projection = dict(projection, timestamp=1, _id=1)
+        
+        query = {'email': email}
+        if before or after:
+            timestamp, object_id = decode_cursor(before or after)
+            compare = '$lt' if before else '$gt'
+            query['$or'] = [
+                {'timestamp': {compare: timestamp}},
+                {'timestamp': timestamp, '_id': {compare: object_id}}
+            ]
+        
+        # Walk away from the cursor, fetching one extra document to learn
+        # whether another page exists in that direction
+        direction = ASCENDING if after else DESCENDING
+        documents = list(
+            collection.find(query, projection)
+            .sort([('timestamp', direction), ('_id', direction)])
+            .limit(limit + 1)
+        )
+        more = len(documents) > limit
+        documents = documents[:limit]
+        if after:
+            documents.reverse()
+        
+        if not documents:
+            return [], None, None
+        older = more if not after else True
+        newer = more if after else bool(before)
+        return (documents,
+                encode_cursor(documents[-1]) if older else None,
+                encode_cursor(documents[0]) if newer else None)
+    
+    @classmethod
+    def count(cls, email):
+        """Number of documents for a user (answered from the index)"""
+        collection = cls.get_collection()
+        if collection is None:
+            return 0
+        return collection.count_documents({'email': email})
+
+
+class Consultation(HistoryCollection):
+    """Consultation history, one document per consultation"""
+    name = 'consultations'
+    
+    # What history views need; everything else stays on the server
+    summary_fields = {'symptoms': 1, 'medicines': 1, 'severity': 1, 'timestamp': 1}
+    
+    @staticmethod
+    def document(email, consultation_data):
+        """The document stored for one consultation, stamped with the current time"""
+        consultation_data['timestamp'] = datetime.utcnow()
+        return dict(consultation_data, email=email)
+    
+    @staticmethod
+    def add(email, consultation_data):
+        """Record one consultation"""
+        collection = Consultation._require_collection()
+        collection.insert_one(Consultation.document(email, consultation_data))
+    
+    @staticmethod
+    def insert_documents(documents):
+        """Write prepared documents (possibly from many users) in one bulk_write
+        
+        Safe to repeat: documents a failed earlier attempt already inserted
+        keep their _id and are skipped as duplicates.
+        """
+        if not documents:
+            return
+        collection = Consultation._require_collection()
+        try:
+            collection.bulk_write([InsertOne(document) for document in documents], ordered=False)
+        except BulkWriteError as e:
+            if any(error.get('code') != 11000 for error in e.details.get('writeErrors', [])):
+                raise
+            if e.details.get('writeConcernErrors'):
+                raise
+    
+    @staticmethod
+    def add_many(email, consultations):
+        """Record many consultations in one write"""
+        if not consultations:
+            return
+        collection = Consultation._require_collection()
+        now = datetime.utcnow()
+        documents = []
+        for consultation_data in consultations:
+            consultation_data['timestamp'] = now
+            documents.append(dict(consultation_data, email=email))
+        collection.insert_many(documents, ordered=False)
+    
+    @staticmethod
+    def iter_range(since=None, until=None, batch_size=1000):
+        """Every user's consultations logged in (since, until], oldest first"""
+        collection = Consultation._require_collection()
+        window = {}
+        if since is not None:
+            window['$gt'] = since
+        if until is not None:
+            window['$lte'] = until
+        
+        return (
+            collection.find({'timestamp': window} if window else {},
+                            {'_id': 0, 'symptoms': 1, 'medicines': 1, 'timestamp': 1})
+            .sort('timestamp', ASCENDING)
+            .batch_size(batch_size)
+        )
+
+
+class Reminder(HistoryCollection):
+    """Medication reminders, one document per reminder"""
+    name = 'reminders'
+    
+    @staticmethod
+    def add(email, reminder_data):
+        """Record one reminder"""
+        collection = Reminder._require_collection()
+        document = dict(reminder_data, email=email, timestamp=datetime.utcnow())
+        collection.insert_one(document)
+    
+    @staticmethod
+    def find_all(email):
+        """All of a user's reminders, oldest first, without internal fields"""
+        collection = Reminder.get_collection()
+        if collection is None:
+            return []
+        return list(
+            collection.find({'email': email}, {'_id': 0, 'email': 0, 'timestamp': 0})
+            .sort([('timestamp', ASCENDING), ('_id', ASCENDING)])
+        )
+    
+    @staticmethod
+    def delete_at(email, reminder_index):
+        """Delete the reminder at a position of find_all()"""
+        collection = Reminder.get_collection()
+        if collection is None or reminder_index < 0:
+            return False
+        documents = list(
+            collection.find({'email': email}, {'_id': 1})
+            .sort([('timestamp', ASCENDING), ('_id', ASCENDING)])
+            .skip(reminder_index)
+            .limit(1)
+        )
+        if not documents:
+            return False
+        collection.delete_one({'_id': documents[0]['_id']})
+        return True
@@ -0,0 +1,204 @@
+"""
+Pure-NumPy inference engine for medicine_model.h5
+
+The exporter pulls the layer configuration and weights out of the Keras HDF5
+file into a compact .npz archive. NumpyModel replays the forward pass with
+plain array operations, so serving needs neither TensorFlow nor h5py.
+
+Usage:
+    python numpy_engine.py export          # medicine_model.h5 -> medicine_model.npz
+    python numpy_engine.py check           # parity against Keras on medicines.csv
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+# Layers that only matter during training
+PASSTHROUGH_LAYERS = {'InputLayer', 'Dropout', 'SpatialDropout1D', 'GaussianNoise'}
+
+SUPPORTED_LAYERS = {'Embedding', 'Conv1D', 'GlobalMaxPooling1D', 'GlobalAveragePooling1D',
+                    'Flatten', 'Dense'} | PASSTHROUGH_LAYERS
+
+
+def _relu(x):
+    return np.maximum(x, 0.0)
+
+
+def _sigmoid(x):
+    # Split by sign so large magnitudes never overflow exp()
+    out = np.empty_like(x)
+    positive = x >= 0
+    out[positive] = 1.0 / (1.0 + np.exp(-x[positive]))
+    exp_x = np.exp(x[~positive])
+    out[~positive] = exp_x / (1.0 + exp_x)
+    return out
+
+
+def _softmax(x):
+    shifted = np.exp(x - x.max(axis=-1, keepdims=True))
+    return shifted / shifted.sum(axis=-1, keepdims=True)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+    'tanh': np.tanh,
+}
+
+
+def export_weights(h5_path='medicine_model.h5', out_path='medicine_model.npz'):
+    """Extract layer specs and weights from a Keras Sequential HDF5 model"""
+    import h5py
+
+    with h5py.File(h5_path, 'r') as f:
+        config = json.loads(f.attrs['model_config'])
+        if config.get('class_name') != 'Sequential':
+            raise ValueError(f"Only Sequential models are supported, got {config.get('class_name')}")
+
+        weights_group = f['model_weights']
+        layers = []
+        arrays = {}
+
+        for layer in config['config']['layers']:
+            class_name = layer['class_name']
+            layer_config = layer['config']
+            if class_name not in SUPPORTED_LAYERS:
+                raise ValueError(f"Unsupported layer type: {class_name}")
+            if class_name in PASSTHROUGH_LAYERS:
+                continue
+
+            if class_name == 'Conv1D':
+                if (tuple(layer_config.get('strides', [1])) != (1,)
+                        or tuple(layer_config.get('dilation_rate', [1])) != (1,)
+                        or layer_config.get('padding', 'valid') != 'valid'
+                        or layer_config.get('groups', 1) != 1):
+                    raise ValueError("Only stride-1, undilated, 'valid' Conv1D layers are supported")
+
+            spec = {
+                'type': class_name,
+                'name': layer_config['name'],
+                'activation': layer_config.get('activation', 'linear'),
+                'weights': []
+            }
+
+            # Weights are stored in the order Keras declares them per layer
+            if layer_config['name'] in weights_group:
+                group = weights_group[layer_config['name']]
+                for weight_name in group.attrs['weight_names']:
+                    if isinstance(weight_name, bytes):
+                        weight_name = weight_name.decode('utf8')
+                    key = f"{len(layers)}_{weight_name.split('/')[-1].split(':')[0]}"
+                    arrays[key] = np.asarray(group[weight_name], dtype=np.float32)
+                    spec['weights'].append(key)
+
+            layers.append(spec)
+
+    np.savez(out_path, __layers__=np.array(json.dumps(layers)), **arrays)
+    return out_path
+
+
+class NumpyModel:
+    """Forward pass of an exported Sequential model using NumPy only"""
+
+    def __init__(self, layers, arrays):
+        self.layers = layers
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, path='medicine_model.npz'):
+        """Load an archive written by export_weights()"""
+        with np.load(path, allow_pickle=False) as data:
+            layers = json.loads(str(data['__layers__']))
+            arrays = {key: data[key] for key in data.files if key != '__layers__'}
+        return cls(layers, arrays)
+
+    @property
+    def output_size(self):
+        last_dense = [layer for layer in self.layers if layer['type'] == 'Dense'][-1]
+        return self.arrays[last_dense['weights'][1]].shape[0]
+
+    def _apply(self, layer, x):
+        weights = [self.arrays[key] for key in layer['weights']]
+        layer_type = layer['type']
+
+        if layer_type == 'Embedding':
+            return weights[0][x.astype(np.intp)]
+
+        if layer_type == 'Conv1D':
+            kernel, bias = weights
+            width = kernel.shape[0]
+            # (n, steps, channels) -> (n, steps - width + 1, channels, width)
+            windows = np.lib.stride_tricks.sliding_window_view(x, width, axis=1)
+            out = np.einsum('nscw,wcf->nsf', windows, kernel, optimize=True) + bias
+            return ACTIVATIONS[layer['activation']](out)
+
+        if layer_type == 'GlobalMaxPooling1D':
+            return x.max(axis=1)
+
+        if layer_type == 'GlobalAveragePooling1D':
+            return x.mean(axis=1)
+
+        if layer_type == 'Flatten':
+            return x.reshape(len(x), -1)
+
+        if layer_type == 'Dense':
+            kernel, bias = weights
+            return ACTIVATIONS[layer['activation']](x @ kernel + bias)
+
+        raise ValueError(f"Unsupported layer type: {layer_type}")
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """Mirror keras Model.predict for the arguments app.py uses"""
+        x = np.asarray(x)
+        if len(x) == 0:
+            return np.empty((0, self.output_size), dtype=np.float32)
+        for layer in self.layers:
+            x = self._apply(layer, x)
+        return x.astype(np.float32, copy=False)
+
+
+def check_parity(h5_path='medicine_model.h5', npz_path='medicine_model.npz',
+                 csv_paths=('medicines.csv',), tolerance=1e-5):
+    """Compare NumpyModel against Keras on every symptom string in the CSVs"""
+    import pandas as pd
+    from tensorflow.keras.models import load_model
+    from vocabulary import load_vocabulary
+
+    symptoms = []
+    for csv_path in csv_paths:
+        symptoms.extend(pd.read_csv(csv_path)['Symptoms'].astype(str).str.lower().str.strip())
+
+    padded = load_vocabulary().encode(symptoms)
+    expected = load_model(h5_path, compile=False).predict(padded, batch_size=1024, verbose=0)
+    actual = NumpyModel.load(npz_path).predict(padded)
+
+    max_error = float(np.abs(expected - actual).max())
+    print(f"Compared {len(padded)} rows, max abs difference {max_error:.2e}")
+    return max_error <= tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and verify the NumPy inference engine')
+    parser.add_argument('command', choices=['export', 'check'])
+    parser.add_argument('--model', default='medicine_model.h5')
+    parser.add_argument('--output', default='medicine_model.npz')
+    parser.add_argument('--csv', nargs='+', default=['medicines.csv'])
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        path = export_weights(args.model, args.output)
+        print(f"[SUCCESS] Exported weights to {path}")
+    else:
+        if not check_parity(args.model, args.output, args.csv):
+            print("[ERROR] NumPy engine does not match Keras outputs")
+            sys.exit(1)
+        print("[SUCCESS] NumPy engine matches Keras outputs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Vectorized post-processing of model outputs
+
+Turns a batch of per-medicine probabilities into ranked recommendations
+with NumPy: per-medicine thresholds are a broadcast comparison and top-k is
+an argpartition, so the cost per row stays flat as the label set grows.
+"""
+
+import numpy as np
+
+
+class PostProcessor:
+    """Thresholding and top-k ranking over (rows, medicines) probabilities"""
+
+    def __init__(self, medicine_list, default_threshold=0.5, thresholds=None, top_k=None):
+        """
+        medicine_list     -- label names in model output order
+        default_threshold -- probability a medicine must exceed to be recommended
+        thresholds        -- optional {medicine name: threshold} overrides
+        top_k             -- optional cap on recommendations per row
+        """
+        self.names = [str(name).lower() for name in medicine_list]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.default_threshold = default_threshold
+        self.thresholds = self.threshold_vector(thresholds)
+        self.top_k = top_k
+
+    def threshold_vector(self, thresholds=None, base=None):
+        """Per-medicine threshold array: base (default everywhere) plus name overrides"""
+        if base is None:
+            vector = np.full(len(self.names), self.default_threshold, dtype=np.float32)
+        else:
+            vector = base.copy()
+        for name, value in (thresholds or {}).items():
+            i = self.index.get(str(name).lower())
+            if i is None:
+                raise ValueError(f"Unknown medicine in thresholds: {name}")
+            vector[i] = float(value)
+        return vector
+
+    def _scores(self, probabilities, threshold, top_k):
+        """Probabilities with unselected medicines set to -inf, plus the per-row cap"""
+        probabilities = np.atleast_2d(np.asarray(probabilities, dtype=np.float32))
+        labels = probabilities.shape[1]
+
+        if threshold is None:
+            thresholds = self.thresholds
+        elif isinstance(threshold, dict):
+            thresholds = self.threshold_vector(threshold, base=self.thresholds)
+        elif isinstance(threshold, np.ndarray):
+            thresholds = threshold
+        else:
+            thresholds = np.float32(threshold)
+
+        top_k = self.top_k if top_k is None else top_k
+        k = labels if not top_k else min(int(top_k), labels)
+
+        # Medicines below threshold sort last and are dropped below
+        return np.where(probabilities > thresholds, probabilities, -np.inf), k
+
+    def multi_hot(self, probabilities, threshold=None, top_k=None):
+        """Boolean (rows, medicines) matrix of what select() would recommend"""
+        scores, k = self._scores(probabilities, threshold, top_k)
+        selected = np.isfinite(scores)
+        if k < scores.shape[1]:
+            top = np.zeros_like(selected)
+            np.put_along_axis(top, np.argpartition(-scores, k - 1, axis=1)[:, :k], True, axis=1)
+            selected &= top
+        return selected
+
+    def select(self, probabilities, threshold=None, top_k=None):
+        """Ranked (name, confidence %) lists, one per row of probabilities
+
+        threshold -- None for the configured thresholds, a float for one
+                     threshold across medicines, a {name: threshold} dict
+                     overriding the configured ones, or a threshold_vector()
+        top_k     -- None for the configured cap, 0 for no cap
+        """
+        scores, k = self._scores(probabilities, threshold, top_k)
+        rows, labels = scores.shape
+
+        if k < labels:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(labels), (rows, labels))
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        ranked = np.take_along_axis(candidates, order, axis=1)
+        ranked_scores = np.take_along_axis(candidate_scores, order, axis=1)
+        selected = np.isfinite(ranked_scores)
+        confidences = ranked_scores * np.float32(100)
+
+        names = self.names
+        results = []
+        for row in range(rows):
+            count = int(selected[row].sum())
+            results.append([
+                (names[i], c) for i, c in zip(ranked[row, :count].tolist(),
+                                              confidences[row, :count].tolist())
+            ])
+        return results
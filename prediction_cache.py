@@ -0,0 +1,130 @@
+"""
+Memoizing cache for model predictions
+
+The symptom vocabulary is small, so /predict sees the same padded token
+sequences over and over. Predictions are cached per canonical token key in
+a bounded LRU with a TTL. The app keys entries on the served model load and
+clears the cache when the model registry swaps models; watch_paths can
+additionally drop it when files change on disk.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU/TTL cache keyed on padded token sequences"""
+
+    def __init__(self, max_size=4096, ttl=3600, watch_paths=(), check_interval=1.0,
+                 order_insensitive=False):
+        """
+        max_size          -- maximum number of cached sequences
+        ttl               -- seconds an entry stays valid (0 disables expiry)
+        watch_paths       -- artifact files whose change invalidates the cache
+        check_interval    -- minimum seconds between stat() checks of watch_paths
+        order_insensitive -- key on the sorted token multiset; only correct for
+                             models that ignore token order (the Conv1D model does not)
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl
+        self.watch_paths = tuple(watch_paths)
+        self.check_interval = check_interval
+        self.order_insensitive = order_insensitive
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint = self._artifact_fingerprint()
+        self._last_check = time.monotonic()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, sequence):
+        """Canonical cache key for one padded token sequence"""
+        tokens = [int(t) for t in sequence if t]
+        if self.order_insensitive:
+            tokens.sort()
+        return tuple(tokens)
+
+    def _artifact_fingerprint(self):
+        fingerprint = []
+        for path in self.watch_paths:
+            try:
+                stat = os.stat(path)
+                fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                fingerprint.append((path, None, None))
+        return tuple(fingerprint)
+
+    def _check_artifacts(self):
+        """Clear the cache if a watched artifact changed (caller holds the lock)"""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        fingerprint = self._artifact_fingerprint()
+        if fingerprint != self._fingerprint:
+            self._fingerprint = fingerprint
+            self._entries.clear()
+            self.invalidations += 1
+
+    def get(self, key):
+        """Cached value for key, or None on a miss"""
+        with self._lock:
+            self._check_artifacts()
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        """Remove one entry, if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        """Cache statistics for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,291 @@
+"""
+Incremental retraining from logged consultations
+
+Streams consultations logged since the last published retrain (the
+watermark), labels their symptoms with the rule engine, and fine-tunes the
+active model version on them plus a replay sample of medicines.csv so it
+does not forget the original data. The result is evaluated against a fixed
+held-out slice of medicines.csv next to the current model and published as
+a new model_versions/<version>/ only if it does not regress; running
+workers then pick it up through the registry watcher.
+
+    model_versions/
+        WATERMARK               # JSON: consultations up to 'until' are consumed
+        20261017-213000/
+            manifest.json       # metrics, base version, watermark (written last)
+            medicine_model.h5
+            medicine_model.npz
+            vocabulary.json
+            medicine_labels.pkl
+
+Usage:
+    python retrain.py                       # stream from MongoDB, publish if no regression
+    python retrain.py --dry-run             # train and evaluate only
+    python retrain.py --consultations consultations.jsonl
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from columnar_dataset import ColumnarDataset, load_label_names
+from config import Config
+from model_registry import MANIFEST_FILE, ModelRegistry, list_versions, set_active_version
+from numpy_engine import NumpyModel, export_weights
+from postprocessing import PostProcessor
+from rules import MEDICINE_BITS, rule_set, text_mask
+from vocabulary import load_vocabulary
+
+WATERMARK_FILE = 'WATERMARK'
+
+# Exit codes for schedulers
+PUBLISHED, NOTHING_TO_DO, REGRESSED = 0, 3, 4
+
+
+def settle_seconds(config):
+    """How far behind now the watermark stays
+
+    Consultations are stamped when /predict queues them but inserted by the
+    write-behind flusher later, so the newest ones may still be in flight.
+    """
+    in_flight = config.WRITE_BEHIND_FLUSH_INTERVAL_MS / 1000.0 + config.WRITE_BEHIND_DRAIN_TIMEOUT
+    return max(config.RETRAIN_SETTLE_SECONDS, in_flight)
+
+
+def read_watermark(versions_dir):
+    """Timestamp of the newest consultation already trained on, or None"""
+    path = os.path.join(versions_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf8') as f:
+        return datetime.fromisoformat(json.load(f)['until'])
+
+
+def write_watermark(versions_dir, until, version):
+    path = os.path.join(versions_dir, WATERMARK_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf8') as f:
+        json.dump({'until': until.isoformat(), 'version': version}, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_consultations_file(path, since=None, until=None):
+    """Consultations from a JSONL export, filtered to (since, until]"""
+    with open(path, 'r', encoding='utf8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            consultation = json.loads(line)
+            timestamp = consultation.get('timestamp')
+            if timestamp is not None:
+                timestamp = datetime.fromisoformat(str(timestamp))
+                if (since is not None and timestamp <= since) or (until is not None and timestamp > until):
+                    continue
+            yield consultation
+
+
+def rule_labels(texts, label_names):
+    """Symptom masks and rule-engine multi-hot labels in label_names order"""
+    masks = np.array([text_mask(text) for text in texts], dtype=np.int64)
+    bits = {medicine.lower(): bit for medicine, bit in MEDICINE_BITS.items()}
+    column_bits = np.array([bits[name] for name in label_names], dtype=np.int64)
+    codes = rule_set.evaluate_masks(masks)
+    return masks, ((codes[:, None] & column_bits) != 0).astype(np.float32)
+
+
+def build_batches(consultations, vocabulary, label_names, chunk_size=10000):
+    """Token / label arrays for streamed consultations, encoded chunk by chunk
+
+    Consultations with no known symptom are skipped: the rules cannot label
+    them and the model would only learn to predict nothing.
+    """
+    tokens, labels = [], []
+    seen = 0
+
+    def flush(texts):
+        masks, multi_hot = rule_labels(texts, label_names)
+        padded = vocabulary.encode(texts)
+        usable = (masks != 0) & (padded != 0).any(axis=1)
+        tokens.append(padded[usable])
+        labels.append(multi_hot[usable])
+
+    texts = []
+    for consultation in consultations:
+        texts.append(str(consultation.get('symptoms') or '').lower().strip())
+        seen += 1
+        if len(texts) >= chunk_size:
+            flush(texts)
+            texts = []
+    if texts:
+        flush(texts)
+
+    if not tokens:
+        return seen, np.zeros((0, vocabulary.maxlen), np.int32), np.zeros((0, len(label_names)), np.float32)
+    return seen, np.concatenate(tokens), np.concatenate(labels)
+
+
+def evaluate(model, dataset, postprocessor):
+    """Micro precision / recall / F1 and exact match on a labeled dataset"""
+    probabilities = model.predict(np.asarray(dataset.tokens), batch_size=4096, verbose=0)
+    predicted = postprocessor.multi_hot(probabilities)
+    expected = np.asarray(dataset.labels, dtype=bool)
+
+    tp = int((predicted & expected).sum())
+    fp = int((predicted & ~expected).sum())
+    fn = int((~predicted & expected).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'micro_precision': round(precision, 6),
+        'micro_recall': round(recall, 6),
+        'micro_f1': round(2 * precision * recall / (precision + recall), 6) if precision + recall else 0.0,
+        'exact_match': round(float((predicted == expected).all(axis=1).mean()), 6)
+    }
+
+
+def publish(model, base_directory, versions_dir, version, manifest):
+    """Write a complete version directory; manifest.json goes last"""
+    directory = os.path.join(versions_dir, version)
+    os.makedirs(directory)
+
+    h5_path = os.path.join(directory, 'medicine_model.h5')
+    model.save(h5_path)
+    npz_path = export_weights(h5_path, os.path.join(directory, 'medicine_model.npz'))
+
+    # The NumPy engine serves by default, so it must match what was evaluated
+    probe = np.random.default_rng(0).integers(0, model.layers[0].input_dim, (2048, manifest['maxlen']))
+    max_error = float(np.abs(NumpyModel.load(npz_path).predict(probe)
+                             - model.predict(probe, verbose=0)).max())
+    if max_error > 1e-4:
+        raise ValueError(f"Exported weights differ from the trained model by {max_error:.2e}")
+
+    sources = {
+        'vocabulary.json': os.path.join(base_directory, 'vocabulary.json') if base_directory else Config.VOCABULARY_PATH,
+        'tokenizer.pkl': os.path.join(base_directory, 'tokenizer.pkl') if base_directory else 'tokenizer.pkl',
+        'medicine_labels.pkl': os.path.join(base_directory, 'medicine_labels.pkl') if base_directory else 'medicine_labels.pkl'
+    }
+    for name, source in sources.items():
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(directory, name))
+
+    with open(os.path.join(directory, MANIFEST_FILE), 'w', encoding='utf8') as f:
+        json.dump(manifest, f, indent=2)
+    return directory
+
+
+def retrain(config=Config, consultations_path=None, dry_run=False, activate=False):
+    """Run one retraining round; returns PUBLISHED, NOTHING_TO_DO or REGRESSED"""
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.optimizers import Adam
+
+    versions_dir = config.MODEL_VERSIONS_DIR
+    since = read_watermark(versions_dir)
+    # Leave recent consultations for the next run; they may not be inserted yet
+    until = datetime.utcnow() - timedelta(seconds=settle_seconds(config))
+
+    base_version, base_directory = ModelRegistry(config, warmup=False).select_version()
+    base_h5 = os.path.join(base_directory, 'medicine_model.h5') if base_directory else 'medicine_model.h5'
+    vocabulary = load_vocabulary(
+        os.path.join(base_directory, 'vocabulary.json') if base_directory else config.VOCABULARY_PATH,
+        os.path.join(base_directory, 'tokenizer.pkl') if base_directory else 'tokenizer.pkl'
+    )
+    label_names = load_label_names(
+        os.path.join(base_directory, 'medicine_labels.pkl') if base_directory else 'medicine_labels.pkl'
+    )
+    print(f"[INFO] Retraining from version {base_version} on consultations after {since or 'the beginning'}")
+
+    # 1. Stream new consultations and label them
+    if consultations_path:
+        consultations = read_consultations_file(consultations_path, since, until)
+    else:
+        from models import User
+        consultations = User.iter_consultations(since, until)
+    seen, tokens, labels = build_batches(consultations, vocabulary, label_names)
+    print(f"[INFO] {seen} new consultations, {len(tokens)} usable for training")
+    if len(tokens) < config.RETRAIN_MIN_CONSULTATIONS:
+        print(f"[INFO] Fewer than {config.RETRAIN_MIN_CONSULTATIONS} usable consultations; nothing to do")
+        return NOTHING_TO_DO
+
+    # 2. Fixed held-out slice for evaluation, replay sample from the rest
+    dataset = ColumnarDataset.load(config.RETRAIN_HOLDOUT_DATASET, vocabulary, label_names)
+    train, holdout = dataset.split(config.RETRAIN_HOLDOUT_FRACTION)
+    replay = train.take(np.random.default_rng().choice(
+        len(train), min(config.RETRAIN_REPLAY_ROWS, len(train)), replace=False))
+    x = np.concatenate([tokens, replay.tokens])
+    y = np.concatenate([labels, np.asarray(replay.labels, dtype=np.float32)])
+
+    # 3. Fine-tune a copy of the active model
+    postprocessor = PostProcessor(label_names, config.PREDICTION_THRESHOLD,
+                                  config.MEDICINE_THRESHOLDS, config.PREDICTION_TOP_K)
+    base_metrics = evaluate(load_model(base_h5, compile=False), holdout, postprocessor)
+
+    started = time.perf_counter()
+    model = load_model(base_h5, compile=False)
+    model.compile(optimizer=Adam(learning_rate=config.RETRAIN_LEARNING_RATE),
+                  loss='binary_crossentropy')
+    model.fit(x, y, epochs=config.RETRAIN_EPOCHS, batch_size=config.RETRAIN_BATCH_SIZE,
+              shuffle=True, verbose=2)
+    train_seconds = time.perf_counter() - started
+    metrics = evaluate(model, holdout, postprocessor)
+
+    print(f"[INFO] Held-out micro F1: base {base_metrics['micro_f1']} -> candidate {metrics['micro_f1']} "
+          f"(exact match {base_metrics['exact_match']} -> {metrics['exact_match']})")
+
+    # 4. Publish only if the candidate does not regress
+    if metrics['micro_f1'] < base_metrics['micro_f1'] - config.RETRAIN_MAX_REGRESSION:
+        print("[WARNING] Candidate regressed on the held-out slice; not publishing")
+        return REGRESSED
+    if dry_run:
+        print("[INFO] Dry run; not publishing")
+        return PUBLISHED
+
+    version = until.strftime('%Y%m%d-%H%M%S')
+    if version in list_versions(versions_dir):
+        raise ValueError(f"Model version {version} already exists")
+    manifest = {
+        'version': version,
+        'base_version': base_version,
+        'created_at': datetime.utcnow().isoformat(),
+        'consultations_since': since.isoformat() if since else None,
+        'consultations_until': until.isoformat(),
+        'consultations': seen,
+        'training_rows': len(x),
+        'train_seconds': round(train_seconds, 2),
+        'maxlen': vocabulary.maxlen,
+        'holdout': {
+            'dataset': config.RETRAIN_HOLDOUT_DATASET,
+            'rows': len(holdout),
+            'base': base_metrics,
+            'candidate': metrics
+        }
+    }
+    os.makedirs(versions_dir, exist_ok=True)
+    directory = publish(model, base_directory, versions_dir, version, manifest)
+    write_watermark(versions_dir, until, version)
+    if activate:
+        set_active_version(versions_dir, version)
+
+    print(f"[SUCCESS] Published model version {version} -> {directory}")
+    return PUBLISHED
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fine-tune the active model on new consultations')
+    parser.add_argument('--consultations', help='JSONL export to read instead of MongoDB')
+    parser.add_argument('--dry-run', action='store_true', help='Train and evaluate without publishing')
+    parser.add_argument('--activate', action='store_true',
+                        help='Pin the new version in ACTIVE (otherwise newest-wins applies)')
+    args = parser.parse_args()
+
+    sys.exit(retrain(consultations_path=args.consultations, dry_run=args.dry_run,
+                     activate=args.activate))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Declarative medicine rules compiled to bitmask predicates
+
+Each known symptom is one bit of an integer mask, and each rule is three
+masks (all / any / none) plus the medicine it recommends. A symptom set is
+evaluated with a few integer ANDs per rule, and a whole column of masks
+with the same ops as NumPy array expressions, so labeling and the
+model-free fallback in app.py never touch TensorFlow.
+
+Usage:
+    python rules.py check      # compiled rules vs. direct set evaluation
+"""
+
+import argparse
+import re
+import sys
+from itertools import combinations
+
+import numpy as np
+
+SYMPTOMS = [
+    "fever", "headache", "body pain", "cold", "allergy", "sneezing", "runny nose",
+    "cough", "sore throat", "bacterial infection", "inflammation", "swelling", "stomach pain", "acidity"
+]
+
+# Output order of recommended medicines
+MEDICINES = ["Paracetamol", "Cetirizine", "Azithromycin", "Diclofenac", "Aciloc"]
+
+# A rule fires when the symptoms include every 'all' symptom, at least one
+# 'any' symptom (if given) and no 'none' symptom
+RULES = [
+    {"medicine": "Paracetamol", "any": ["fever"]},
+    {"medicine": "Diclofenac", "all": ["fever"], "any": ["inflammation", "swelling"]},
+    {"medicine": "Diclofenac", "none": ["fever"],
+     "any": ["body pain", "headache", "inflammation", "swelling"]},
+    {"medicine": "Cetirizine", "any": ["cold", "allergy", "sneezing", "runny nose"]},
+    {"medicine": "Aciloc", "any": ["stomach pain", "acidity"]},
+    {"medicine": "Azithromycin", "any": ["cough", "sore throat", "bacterial infection"]},
+]
+
+SYMPTOM_BITS = {symptom: 1 << i for i, symptom in enumerate(SYMPTOMS)}
+MEDICINE_BITS = {medicine: 1 << i for i, medicine in enumerate(MEDICINES)}
+
+# Longest phrases first so "body pain" wins over a shorter overlapping match
+_SYMPTOM_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(s) for s in sorted(SYMPTOMS, key=len, reverse=True)) + r")\b"
+)
+
+
+def symptom_mask(symptoms):
+    """Mask for an iterable of symptom names; unknown names are ignored"""
+    mask = 0
+    for symptom in symptoms:
+        mask |= SYMPTOM_BITS.get(symptom, 0)
+    return mask
+
+
+def text_mask(text):
+    """Mask for free text, matching known symptoms as whole words"""
+    return symptom_mask(_SYMPTOM_PATTERN.findall(str(text).lower()))
+
+
+def medicine_names(code):
+    """Medicine names for a medicine mask, in MEDICINES order"""
+    return [medicine for medicine in MEDICINES if code & MEDICINE_BITS[medicine]]
+
+
+class RuleSet:
+    """RULES compiled to (all_mask, any_mask, none_mask, medicine_bit) tuples"""
+
+    def __init__(self, rules=RULES):
+        self.rules = rules
+        self.compiled = []
+        for rule in rules:
+            unknown = (set(rule.get("all", [])) | set(rule.get("any", []))
+                       | set(rule.get("none", []))) - set(SYMPTOMS)
+            if unknown or rule["medicine"] not in MEDICINE_BITS:
+                raise ValueError(f"Rule for {rule['medicine']} uses unknown names: {sorted(unknown)}")
+            self.compiled.append((
+                symptom_mask(rule.get("all", [])),
+                symptom_mask(rule.get("any", [])),
+                symptom_mask(rule.get("none", [])),
+                MEDICINE_BITS[rule["medicine"]]
+            ))
+
+        # Output strings for every medicine mask, so a column maps with one take()
+        self.strings = np.array(
+            [", ".join(medicine_names(code)) for code in range(1 << len(MEDICINES))],
+            dtype=object
+        )
+
+    def evaluate(self, mask):
+        """Medicine mask for one symptom mask"""
+        code = 0
+        for all_mask, any_mask, none_mask, bit in self.compiled:
+            if (mask & all_mask == all_mask and (not any_mask or mask & any_mask)
+                    and not mask & none_mask):
+                code |= bit
+        return code
+
+    def evaluate_masks(self, masks):
+        """Medicine masks for an array of symptom masks"""
+        masks = np.asarray(masks, dtype=np.int64)
+        codes = np.zeros(masks.shape, dtype=np.int64)
+        for all_mask, any_mask, none_mask, bit in self.compiled:
+            fires = (masks & all_mask) == all_mask
+            if any_mask:
+                fires &= (masks & any_mask) != 0
+            if none_mask:
+                fires &= (masks & none_mask) == 0
+            codes |= np.where(fires, bit, 0)
+        return codes
+
+    def recommend(self, symptoms):
+        """Medicine names for an iterable of symptom names"""
+        return medicine_names(self.evaluate(symptom_mask(symptoms)))
+
+    def recommend_text(self, text):
+        """Medicine names for free-text symptoms"""
+        return medicine_names(self.evaluate(text_mask(text)))
+
+    def recommend_texts(self, texts):
+        """Medicine names for many free-text symptom strings"""
+        codes = self.evaluate_masks([text_mask(text) for text in texts])
+        return [medicine_names(code) for code in codes.tolist()]
+
+
+def interpret(rules, symptoms):
+    """Evaluate RULES straight from their symptom lists, without bitmasks"""
+    symptoms = set(symptoms)
+    recommended = set()
+    for rule in rules:
+        if (set(rule.get("all", [])) <= symptoms
+                and (not rule.get("any") or symptoms & set(rule["any"]))
+                and not symptoms & set(rule.get("none", []))):
+            recommended.add(rule["medicine"])
+    return recommended
+
+
+def check(rules=RULES, max_size=None):
+    """Compare compiled evaluation with direct interpretation for every symptom subset"""
+    rule_set = RuleSet(rules)
+    max_size = len(SYMPTOMS) if max_size is None else max_size
+
+    subsets = [combo for size in range(max_size + 1) for combo in combinations(SYMPTOMS, size)]
+    masks = np.array([symptom_mask(combo) for combo in subsets], dtype=np.int64)
+    vectorized = rule_set.evaluate_masks(masks)
+
+    mismatches = 0
+    for combo, mask, code in zip(subsets, masks.tolist(), vectorized.tolist()):
+        expected = interpret(rules, combo)
+        if set(medicine_names(rule_set.evaluate(mask))) != expected or set(medicine_names(code)) != expected:
+            mismatches += 1
+    print(f"Compared {len(subsets)} symptom sets, {mismatches} mismatches")
+    return mismatches == 0
+
+
+# Shared compiled rules
+rule_set = RuleSet()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify the compiled medicine rules')
+    parser.add_argument('command', choices=['check'])
+    parser.parse_args()
+
+    if not check():
+        print("[ERROR] Compiled rules disagree with the rule definitions")
+        sys.exit(1)
+    print("[SUCCESS] Compiled rules match the rule definitions")
+
+
+if __name__ == '__main__':
+    main()
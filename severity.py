@@ -0,0 +1,209 @@
+"""
+Severity keyword matching
+
+SeverityMatcher compiles every tier's keywords into one Aho-Corasick
+automaton, so assessing a text is a single left-to-right pass whose cost
+grows with the text length and the number of matches, not with the number of
+keywords.
+
+The automaton runs over word tokens rather than characters: the text is
+split into words and punctuation marks (one regex pass in C), and each
+keyword is a sequence of such tokens. Matches therefore fall on word
+boundaries ('fever' does not match inside 'feverish'), whitespace between
+words does not matter, and punctuation ends a phrase ('chest, pain' is not
+'chest pain'). The last word of a keyword may carry an inflectional suffix
+(INFLECTIONS), so 'chest pain' matches 'chest pains' and 'sneeze' matches
+'sneezes'.
+
+This is stricter than the old substring scan, which also matched inside
+longer words ('confusion' in 'nonconfusional') and across word boundaries.
+
+Usage:
+    python severity.py "High fever and chest pain since morning"
+    python severity.py --check              # regression check of the bundled keywords
+"""
+
+import argparse
+import json
+import re
+import sys
+
+_TOKENS = re.compile(r'\w+|[^\w\s]')
+
+# Suffixes allowed on the last word of a keyword
+INFLECTIONS = ('s', 'es', 'ing')
+
+
+def tokenize(text):
+    """Lowercase words and punctuation marks"""
+    return _TOKENS.findall(text.lower())
+
+
+def uninflected(token):
+    """The token with each suffix in INFLECTIONS removed, where one applies"""
+    return [token[:-len(suffix)] for suffix in INFLECTIONS
+            if token.endswith(suffix) and len(token) - len(suffix) >= 2]
+
+
+class SeverityMatcher:
+    """Single-pass multi-keyword matcher returning per-tier keyword counts"""
+
+    def __init__(self, indicators):
+        """indicators -- {tier: [keyword, ...]}; tier order is kept in scores"""
+        self.tiers = list(indicators)
+        self.keywords = []          # keyword text for each keyword id
+        self.keyword_tokens = []    # token sequence for each keyword id
+        self.keyword_tiers = []     # tiers each keyword id counts towards
+
+        keyword_ids = {}
+        for tier, keywords in indicators.items():
+            for keyword in keywords:
+                tokens = tuple(tokenize(keyword))
+                if not tokens:
+                    continue
+                if tokens not in keyword_ids:
+                    keyword_ids[tokens] = len(self.keywords)
+                    self.keywords.append(' '.join(tokens))
+                    self.keyword_tokens.append(tokens)
+                    self.keyword_tiers.append([])
+                if tier not in self.keyword_tiers[keyword_ids[tokens]]:
+                    self.keyword_tiers[keyword_ids[tokens]].append(tier)
+
+        self._build()
+
+    def _build(self):
+        """Token trie of the keywords plus failure links (breadth first)"""
+        goto = [{}]
+        outputs = [[]]
+        for keyword_id, tokens in enumerate(self.keyword_tokens):
+            state = 0
+            for token in tokens:
+                next_state = goto[state].get(token)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][token] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword_id)
+
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            for token, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and token not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(token, 0)
+                # A state also emits every keyword that ends at its failure state
+                outputs[next_state] = outputs[next_state] + outputs[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._outputs = [tuple(output) for output in outputs]
+        self._last_tokens = frozenset(tokens[-1] for tokens in self.keyword_tokens)
+        self._suffix_ends = frozenset(suffix[-1] for suffix in INFLECTIONS)
+
+    def find(self, text):
+        """Ids of the keywords that occur in text"""
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        last_tokens, suffix_ends = self._last_tokens, self._suffix_ends
+        found = set()
+        state = 0
+
+        for token in tokenize(text):
+            # An inflected token can only end a keyword, never continue one
+            if token[-1] in suffix_ends:
+                for stem in uninflected(token):
+                    if stem not in last_tokens:
+                        continue
+                    previous = state
+                    while previous and stem not in goto[previous]:
+                        previous = fail[previous]
+                    if stem in goto[previous]:
+                        found.update(outputs[goto[previous][stem]])
+
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+    def matches(self, text):
+        """Matched keywords per tier"""
+        matched = {tier: [] for tier in self.tiers}
+        for keyword_id in sorted(self.find(text)):
+            for tier in self.keyword_tiers[keyword_id]:
+                matched[tier].append(self.keywords[keyword_id])
+        return matched
+
+    def score(self, text):
+        """{tier: number of distinct tier keywords found}, like the old per-keyword scan"""
+        scores = {tier: 0 for tier in self.tiers}
+        for keyword_id in self.find(text):
+            for tier in self.keyword_tiers[keyword_id]:
+                scores[tier] += 1
+        return scores
+
+    def stats(self):
+        return {
+            'tiers': len(self.tiers),
+            'keywords': len(self.keywords),
+            'states': len(self._goto)
+        }
+
+
+# Notes the bundled keywords must rate, with the tier each must score in
+REGRESSION_CASES = [
+    ('crushing chest pains', 'severe'),
+    ('severe pains in abdomen', 'severe'),
+    ('High Fever since morning', 'severe'),
+    ('difficulty breathing, persistent vomiting', 'severe'),
+    ('persistent coughing at night', 'moderate'),
+    ('stomach pains after meals', 'moderate'),
+    ('runny nose and sneezing', 'mild'),
+]
+
+
+def check(matcher):
+    """Failures of the regression check: every keyword, inflected and in context, plus REGRESSION_CASES"""
+    cases = list(REGRESSION_CASES)
+    for keyword_id, keyword in enumerate(matcher.keywords):
+        tier = matcher.keyword_tiers[keyword_id][0]
+        cases.append((keyword.upper(), tier))
+        for suffix in INFLECTIONS:
+            cases.append((f'patient reports {keyword}{suffix} today.', tier))
+    return [(text, tier) for text, tier in cases if tier in matcher.tiers and not matcher.score(text)[tier]]
+
+
+def main():
+    from knowledge_base import data_path
+
+    parser = argparse.ArgumentParser(description='Show the severity keywords found in a text')
+    parser.add_argument('text', nargs='?')
+    parser.add_argument('--check', action='store_true', help='Run the regression check on the keywords')
+    parser.add_argument('--data', help='Severity keywords file (default: from the knowledge base manifest)')
+    args = parser.parse_args()
+    if not args.check and args.text is None:
+        parser.error('a text or --check is required')
+
+    with open(args.data or data_path('severity'), 'r', encoding='utf8') as f:
+        matcher = SeverityMatcher(json.load(f)['tiers'])
+    print(f"[INFO] {matcher.stats()}")
+
+    if args.check:
+        failures = check(matcher)
+        for text, tier in failures:
+            print(f"[ERROR] No {tier} keyword found in {text!r}")
+        if failures:
+            sys.exit(1)
+        print("[SUCCESS] Severity keywords pass the regression check")
+        return
+    for tier, keywords in matcher.matches(args.text).items():
+        print(f"{tier:<10}{len(keywords):>3}  {', '.join(keywords)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+NumPy engine parity with the Keras model
+
+Runs numpy_engine.check_parity() on medicine_model.h5 / medicine_model.npz
+so a stale export fails the suite. Skipped when TensorFlow or the model
+artifacts are not available.
+
+Usage:
+    python -m pytest tests
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from numpy_engine import NumpyModel, check_parity  # noqa: E402
+
+H5_PATH = os.path.join(ROOT, 'medicine_model.h5')
+NPZ_PATH = os.path.join(ROOT, 'medicine_model.npz')
+CSV_PATHS = [os.path.join(ROOT, 'medicines.csv')]
+
+
+@unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'TensorFlow is not installed')
+@unittest.skipUnless(os.path.exists(H5_PATH) and os.path.exists(NPZ_PATH), 'model artifacts are missing')
+class NumpyEngineParityTest(unittest.TestCase):
+
+    def setUp(self):
+        # load_vocabulary() reads vocabulary.json / tokenizer.pkl from the working directory
+        self.cwd = os.getcwd()
+        os.chdir(ROOT)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+
+    def test_matches_keras_on_dataset(self):
+        self.assertTrue(check_parity(H5_PATH, NPZ_PATH, CSV_PATHS))
+
+    def test_matches_keras_on_random_tokens(self):
+        from tensorflow.keras.models import load_model
+
+        keras_model = load_model(H5_PATH, compile=False)
+        tokens = np.random.default_rng(0).integers(
+            0, keras_model.layers[0].input_dim, (512, keras_model.input_shape[1]))
+        expected = keras_model.predict(tokens, verbose=0)
+        actual = NumpyModel.load(NPZ_PATH).predict(tokens)
+        self.assertEqual(actual.shape, expected.shape)
+        self.assertLessEqual(float(np.abs(expected - actual).max()), 1e-5)
+
+    def test_empty_batch(self):
+        model = NumpyModel.load(NPZ_PATH)
+        self.assertEqual(model.predict(np.zeros((0, 10), np.int32)).shape, (0, model.output_size))
+
+
+if __name__ == '__main__':
+    unittest.main()
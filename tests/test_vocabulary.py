@@ -0,0 +1,64 @@
+"""
+Vocabulary parity with the original Keras tokenizer
+
+Runs vocabulary.check_parity() against tokenizer.pkl on both CSVs so a
+vocabulary.json that drifts from the tokenizer fails the suite. The
+padding and truncation tests need no TensorFlow; the parity test is
+skipped without it.
+
+Usage:
+    python -m pytest tests
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+
+from vocabulary import Vocabulary, check_parity  # noqa: E402
+
+JSON_PATH = os.path.join(ROOT, 'vocabulary.json')
+TOKENIZER_PATH = os.path.join(ROOT, 'tokenizer.pkl')
+CSV_PATHS = [os.path.join(ROOT, 'medicines.csv'), os.path.join(ROOT, 'medicines - modified.csv')]
+
+
+@unittest.skipUnless(os.path.exists(JSON_PATH) and os.path.exists(TOKENIZER_PATH),
+                     'vocabulary.json or tokenizer.pkl is missing')
+class VocabularyParityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = Vocabulary.load(JSON_PATH)
+
+    @unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'TensorFlow is not installed')
+    def test_matches_keras_tokenizer(self):
+        self.assertTrue(check_parity(self.vocabulary, TOKENIZER_PATH, CSV_PATHS))
+
+    def test_json_matches_tokenizer_pickle(self):
+        from_pickle = Vocabulary.from_tokenizer_pickle(TOKENIZER_PATH, maxlen=self.vocabulary.maxlen)
+        self.assertEqual(dict(from_pickle.word_index), dict(self.vocabulary.word_index))
+        self.assertEqual(from_pickle.filters, self.vocabulary.filters)
+        self.assertEqual(from_pickle.oov_token, self.vocabulary.oov_token)
+
+
+class VocabularyEncodeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vocabulary = Vocabulary({'fever': 1, 'headache': 2, 'cough': 3}, filters='!,.', maxlen=2)
+
+    def test_pre_padding(self):
+        np.testing.assert_array_equal(self.vocabulary.encode(['Fever!', '']), [[0, 1], [0, 0]])
+
+    def test_pre_truncation_keeps_last_words(self):
+        np.testing.assert_array_equal(self.vocabulary.encode_one('fever, headache, cough'), [[2, 3]])
+
+    def test_unknown_words_are_dropped(self):
+        np.testing.assert_array_equal(self.vocabulary.encode_one('rash cough'), [[0, 3]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+"""
+Frozen vocabulary for symptom preprocessing
+
+Replaces the pickled Keras Tokenizer and pad_sequences on the request path.
+The word index and text-cleaning rules are read once from tokenizer.pkl (or
+the vocabulary.json built from it) and sequences are written straight into
+a preallocated int32 array, matching Keras' 'pre' padding and truncation.
+
+Usage:
+    python vocabulary.py build             # tokenizer.pkl -> vocabulary.json
+    python vocabulary.py check             # parity against Keras on both CSVs
+"""
+
+import argparse
+import json
+import pickle
+import sys
+from types import MappingProxyType
+
+import numpy as np
+
+DEFAULT_MAXLEN = 5
+
+
+class _TokenizerState:
+    """Stand-in for keras Tokenizer so its pickle loads without Keras"""
+
+
+class _TokenizerUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if name == 'Tokenizer' and 'preprocessing' in module:
+            return _TokenizerState
+        return super().find_class(module, name)
+
+
+class Vocabulary:
+    """Immutable word index plus the Keras Tokenizer text rules"""
+
+    def __init__(self, word_index, filters, lower=True, split=' ',
+                 num_words=None, oov_token=None, maxlen=DEFAULT_MAXLEN):
+        self.word_index = MappingProxyType(dict(word_index))
+        self.filters = filters
+        self.lower = lower
+        self.split = split
+        self.num_words = num_words
+        self.oov_token = oov_token
+        self.maxlen = maxlen
+
+        # Keras replaces every filter character with the split string
+        self._translate = str.maketrans({c: split for c in filters})
+        self._oov_index = self.word_index.get(oov_token) if oov_token is not None else None
+
+    @classmethod
+    def from_tokenizer_pickle(cls, path='tokenizer.pkl', maxlen=DEFAULT_MAXLEN):
+        """Read the word index and rules out of a pickled Keras Tokenizer"""
+        with open(path, 'rb') as f:
+            state = vars(_TokenizerUnpickler(f).load())
+        if state.get('char_level'):
+            raise ValueError("Character-level tokenizers are not supported")
+        if state.get('analyzer') is not None:
+            raise ValueError("Tokenizers with a custom analyzer are not supported")
+        return cls(
+            state['word_index'],
+            filters=state['filters'],
+            lower=state['lower'],
+            split=state['split'],
+            num_words=state.get('num_words'),
+            oov_token=state.get('oov_token'),
+            maxlen=maxlen
+        )
+
+    @classmethod
+    def load(cls, path='vocabulary.json'):
+        """Load a vocabulary written by save()"""
+        with open(path, 'r', encoding='utf8') as f:
+            data = json.load(f)
+        return cls(**data)
+
+    def save(self, path='vocabulary.json'):
+        data = {
+            'word_index': dict(self.word_index),
+            'filters': self.filters,
+            'lower': self.lower,
+            'split': self.split,
+            'num_words': self.num_words,
+            'oov_token': self.oov_token,
+            'maxlen': self.maxlen
+        }
+        with open(path, 'w', encoding='utf8') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        return path
+
+    @property
+    def size(self):
+        """Number of embedding rows the ids can address (including padding 0)"""
+        if self.num_words:
+            return self.num_words
+        return max(self.word_index.values(), default=0) + 1
+
+    def words(self, text):
+        """Split text into words exactly like keras text_to_word_sequence"""
+        if self.lower:
+            text = text.lower()
+        return [w for w in text.translate(self._translate).split(self.split) if w]
+
+    def ids(self, text):
+        """Token ids for one text, unpadded"""
+        word_index = self.word_index
+        num_words = self.num_words
+        oov_index = self._oov_index
+        ids = []
+        for word in self.words(text):
+            i = word_index.get(word)
+            if i is not None:
+                if num_words and i >= num_words:
+                    if oov_index is not None:
+                        ids.append(oov_index)
+                else:
+                    ids.append(i)
+            elif oov_index is not None:
+                ids.append(oov_index)
+        return ids
+
+    def encode(self, texts, out=None):
+        """Tokenize and pre-pad texts into an (n, maxlen) int32 array"""
+        maxlen = self.maxlen
+        if out is None:
+            out = np.zeros((len(texts), maxlen), dtype=np.int32)
+        else:
+            out[:len(texts)] = 0
+
+        for row, text in enumerate(texts):
+            ids = self.ids(text)
+            if ids:
+                # Keep the last maxlen ids, right-aligned ('pre' padding/truncation)
+                ids = ids[-maxlen:]
+                out[row, maxlen - len(ids):] = ids
+        return out
+
+    def encode_one(self, text):
+        return self.encode([text])
+
+
+def load_vocabulary(json_path='vocabulary.json', tokenizer_path='tokenizer.pkl'):
+    """Prefer the frozen JSON index, falling back to reading tokenizer.pkl"""
+    try:
+        return Vocabulary.load(json_path)
+    except FileNotFoundError:
+        return Vocabulary.from_tokenizer_pickle(tokenizer_path)
+
+
+def check_parity(vocabulary, tokenizer_path='tokenizer.pkl', csv_paths=('medicines.csv',)):
+    """Compare encode() with Keras texts_to_sequences + pad_sequences"""
+    import pandas as pd
+    from tensorflow.keras.preprocessing.sequence import pad_sequences
+
+    with open(tokenizer_path, 'rb') as f:
+        tokenizer = pickle.load(f)
+
+    texts = []
+    for csv_path in csv_paths:
+        texts.extend(pd.read_csv(csv_path)['Symptoms'].astype(str))
+    # Exercise casing, punctuation and truncation as well as the raw rows
+    texts += [t.upper() + '!!' for t in texts[:1000]]
+    texts += [', '.join(texts[i:i + 3]) for i in range(0, 300, 3)]
+
+    expected = pad_sequences(tokenizer.texts_to_sequences(texts), maxlen=vocabulary.maxlen)
+    actual = vocabulary.encode(texts)
+
+    mismatches = int((expected != actual).any(axis=1).sum())
+    print(f"Compared {len(texts)} texts, {mismatches} mismatching rows")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and verify the frozen vocabulary')
+    parser.add_argument('command', choices=['build', 'check'])
+    parser.add_argument('--tokenizer', default='tokenizer.pkl')
+    parser.add_argument('--output', default='vocabulary.json')
+    parser.add_argument('--csv', nargs='+', default=['medicines.csv', 'medicines - modified.csv'])
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        path = Vocabulary.from_tokenizer_pickle(args.tokenizer).save(args.output)
+        print(f"[SUCCESS] Wrote vocabulary to {path}")
+    else:
+        vocabulary = Vocabulary.load(args.output)
+        if not check_parity(vocabulary, args.tokenizer, args.csv):
+            print("[ERROR] Vocabulary does not match the Keras tokenizer")
+            sys.exit(1)
+        print("[SUCCESS] Vocabulary matches the Keras tokenizer")
+
+
+if __name__ == '__main__':
+    main()
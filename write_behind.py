@@ -0,0 +1,262 @@
+"""
+Write-behind queue for consultation logging
+
+/predict used to insert each consultation before responding, so MongoDB
+latency landed in every prediction. Documents are now queued in process and
+a background thread writes them in batches (one bulk_write per batch),
+flushing when a batch is full or the flush interval has passed.
+
+The queue is bounded. When it is full the configured policy applies:
+'sync' writes the document in the caller (old latency, nothing lost),
+'block' waits up to block_ms for space and then drops, 'drop' drops
+immediately. stop() drains whatever is queued; the app calls it at exit and
+gunicorn's worker_exit hook calls it when a worker shuts down. Once stopped,
+submit() writes in the caller.
+
+A batch that still fails after its retries is appended to the spill file
+(one serialized document per line) instead of being lost. Once a batch
+writes successfully again, the spill file is replayed.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+FULL_POLICIES = ('sync', 'block', 'drop')
+
+
+class WriteBehindQueue:
+    """Batch document writes on a background thread"""
+
+    def __init__(self, write_fn, max_size=10000, flush_size=500, flush_interval_ms=200.0,
+                 full_policy='sync', block_ms=50.0, max_retries=2, drain_timeout=10.0,
+                 spill_path=None, dumps=json.dumps, loads=json.loads):
+        """
+        write_fn          -- callable taking a list of documents, writing them in one call
+        max_size          -- documents held in memory before full_policy applies
+        flush_size        -- largest batch passed to write_fn
+        flush_interval_ms -- longest a queued document waits for its batch to fill
+        full_policy       -- 'sync', 'block' or 'drop' when the queue is full
+        block_ms          -- how long 'block' waits for space
+        max_retries       -- extra attempts for a failed batch before it is spilled
+        drain_timeout     -- seconds stop() waits for the queue to drain
+        spill_path        -- file failed batches are appended to (None: they are dropped)
+        dumps, loads      -- serialize a document to one line of the spill file and back
+        """
+        if full_policy not in FULL_POLICIES:
+            raise ValueError(f"full_policy must be one of {', '.join(FULL_POLICIES)}")
+        self.write_fn = write_fn
+        self.max_size = max(1, int(max_size))
+        self.flush_size = max(1, int(flush_size))
+        self.flush_interval = max(0.0, float(flush_interval_ms)) / 1000.0
+        self.full_policy = full_policy
+        self.block = max(0.0, float(block_ms)) / 1000.0
+        self.max_retries = max(0, int(max_retries))
+        self.drain_timeout = drain_timeout
+        self.spill_path = spill_path
+        self.dumps = dumps
+        self.loads = loads
+
+        self._lock = threading.Lock()
+        self._queue = None
+        self._worker = None
+        self._pid = None
+        self._closed_pid = None
+
+        # Counters for monitoring
+        self.counters = {
+            'queued': 0,
+            'written': 0,
+            'batches': 0,
+            'written_inline': 0,
+            'dropped': 0,
+            'failed': 0,
+            'failed_batches': 0,
+            'spilled': 0,
+            'replayed': 0,
+            'retries': 0
+        }
+
+    def _ensure_worker(self):
+        """Start the flusher thread, restarting it after a fork (caller holds the lock)"""
+        pid = os.getpid()
+        if self._worker is not None and self._pid == pid and self._worker.is_alive():
+            return
+        # Threads do not survive fork(), so each process gets its own queue
+        self._queue = queue.Queue(maxsize=self.max_size)
+        self._pid = pid
+        self._worker = threading.Thread(
+            target=self._run, args=(self._queue,),
+            name='write-behind', daemon=True
+        )
+        self._worker.start()
+
+    def _offer(self, document):
+        """Queue a document unless stopped (None) or full (False)
+
+        Runs under the lock stop() takes to close the queue, so nothing is
+        queued behind the shutdown marker.
+        """
+        with self._lock:
+            if self._closed_pid == os.getpid():
+                return None
+            self._ensure_worker()
+            try:
+                self._queue.put_nowait(document)
+            except queue.Full:
+                return False
+            self.counters['queued'] += 1
+            return True
+
+    def submit(self, document):
+        """Queue one document; returns immediately unless the queue is full"""
+        queued = self._offer(document)
+        if queued is None:
+            # Stopped: nothing will flush the queue any more
+            self._write_inline(document)
+            return
+        if not queued and self.full_policy == 'block':
+            deadline = time.perf_counter() + self.block
+            while not queued and time.perf_counter() < deadline:
+                time.sleep(min(0.001, self.block))
+                queued = self._offer(document)
+            if queued is None:
+                self._write_inline(document)
+                return
+        if queued:
+            return
+
+        if self.full_policy == 'sync':
+            self._write_inline(document)
+        else:
+            self.counters['dropped'] += 1
+            print(f"[WARNING] Write-behind queue full ({self.max_size}); dropped a document")
+
+    def _write_inline(self, document):
+        self.write_fn([document])
+        self.counters['written_inline'] += 1
+
+    def _collect(self, pending):
+        """Gather queued documents until the batch is full or the interval passes"""
+        first = pending.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.perf_counter() + self.flush_interval
+
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown requested; write this batch first
+                pending.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def _flush(self, batch):
+        """Write one batch, retrying transient failures and spilling it if they persist"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.write_fn(batch)
+                self.counters['batches'] += 1
+                self.counters['written'] += len(batch)
+                break
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self.counters['failed_batches'] += 1
+                    print(f"[ERROR] Write-behind batch of {len(batch)} failed: {e}")
+                    self._spill(batch)
+                    return
+                self.counters['retries'] += 1
+                time.sleep(self.flush_interval * (attempt + 1))
+        # Writes work again: bring back anything spilled earlier
+        self._replay()
+
+    def _spill(self, batch):
+        """Append a failed batch to the spill file so it can be replayed"""
+        if not self.spill_path:
+            self.counters['failed'] += len(batch)
+            return
+        try:
+            with open(self.spill_path, 'a', encoding='utf8') as f:
+                f.write(''.join(self.dumps(document) + '\n' for document in batch))
+            self.counters['spilled'] += len(batch)
+            print(f"[WARNING] Spilled {len(batch)} documents to {self.spill_path}")
+        except Exception as e:
+            self.counters['failed'] += len(batch)
+            print(f"[ERROR] Could not spill {len(batch)} documents to {self.spill_path}: {e}")
+
+    def _replay(self):
+        """Write the spill file's documents, spilling again whatever still fails"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return
+        # Claim the file so other processes sharing it do not replay it too
+        replaying = f"{self.spill_path}.{os.getpid()}.replay"
+        try:
+            os.replace(self.spill_path, replaying)
+        except OSError:
+            return
+        with open(replaying, 'r', encoding='utf8') as f:
+            documents = [self.loads(line) for line in f if line.strip()]
+        for start in range(0, len(documents), self.flush_size):
+            batch = documents[start:start + self.flush_size]
+            try:
+                self.write_fn(batch)
+                self.counters['replayed'] += len(batch)
+            except Exception as e:
+                print(f"[ERROR] Write-behind replay failed: {e}")
+                self._spill(documents[start:])
+                break
+        os.remove(replaying)
+        if self.counters['replayed']:
+            print(f"[INFO] Replayed spilled documents ({self.counters['replayed']} so far)")
+
+    def _run(self, pending):
+        """Flusher loop: one write_fn call per collected batch"""
+        while True:
+            batch = self._collect(pending)
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def stop(self):
+        """Write everything queued, then stop the flusher thread"""
+        pid = os.getpid()
+        with self._lock:
+            # Later submits write inline; nothing can be queued behind the marker
+            self._closed_pid = pid
+            worker = self._worker if self._pid == pid else None
+            self._worker = None
+        if worker is None:
+            return
+        started = time.perf_counter()
+        try:
+            self._queue.put(None, timeout=self.drain_timeout)
+        except queue.Full:
+            pass
+        worker.join(timeout=max(0.0, self.drain_timeout - (time.perf_counter() - started)))
+        if worker.is_alive():
+            print(f"[WARNING] Write-behind drain timed out with {self._queue.qsize()} documents queued")
+        else:
+            print(f"[INFO] Write-behind queue drained ({self.counters['written']} documents written)")
+
+    def stats(self):
+        """Queue statistics for monitoring"""
+        batches = self.counters['batches']
+        return dict(
+            self.counters,
+            pending=self._queue.qsize() if self._queue is not None else 0,
+            avg_batch_size=(self.counters['written'] / batches) if batches else 0.0,
+            max_size=self.max_size,
+            flush_size=self.flush_size,
+            flush_interval_ms=self.flush_interval * 1000.0,
+            full_policy=self.full_policy
+        )